@@ -1,12 +1,9 @@
 import os
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from MainWindow import MainWindow
-from GameManager import GameManagementWindow
-from PluginManager import PluginManager
-from Config import ConfigEditor
-from Installer import Installer
-from InstallHelper import InstallHelper
+from single_instance import SingleInstance
 
 def resource_path(relative_path):
     try:
@@ -17,7 +14,38 @@ def resource_path(relative_path):
 
 
 if __name__ == "__main__":
+    # Worker processes of the Harmony analysis start here in a frozen build
+    multiprocessing.freeze_support()
+
+    # Headless modpack commands, e.g. "BepInEx_Mod_Manager modpack apply pack/modpack.json <game>"
+    if sys.argv[1:2] == ["modpack"]:
+        from modpack import main
+        sys.exit(main(sys.argv[2:]))
+
+    # Headless agent, e.g. "BepInEx_Mod_Manager daemon serve --port 8731"
+    if sys.argv[1:2] == ["daemon"]:
+        from daemon import main
+        sys.exit(main(sys.argv[2:]))
+
+    # A second launch (e.g. "Open with" on a plugin) hands its arguments to
+    # the running manager and exits before creating any UI
+    instance = SingleInstance()
+    is_primary = instance.acquire()
+    if not is_primary and instance.forward(sys.argv[1:]):
+        sys.exit(0)
+
     app = QApplication(sys.argv)
     window = MainWindow()
+    if is_primary:
+        instance.listen()
+        instance.arguments_received.connect(window.handle_arguments)
     window.show()
-    sys.exit(app.exec_())
+    if sys.argv[1:]:
+        window.handle_arguments(sys.argv[1:])
+    exit_code = app.exec_()
+    if is_primary:
+        instance.release()
+    # Only stop the async runtime if something started it
+    if "async_runtime" in sys.modules:
+        sys.modules["async_runtime"].shutdown_runtime()
+    sys.exit(exit_code)
@@ -0,0 +1,123 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTreeWidget, QTreeWidgetItem, QHeaderView, QMessageBox)
+from PyQt5.QtCore import Qt
+from cache_manager import CacheJobThread, VALID, STALE
+from disk_usage import format_size
+
+
+STATUS_LABELS = {
+    VALID: "Up to date",
+    STALE: "Stale",
+}
+
+LAUNCH_LABELS = {
+    "hit": "Used",
+    "rebuilt": "Rebuilt",
+}
+
+
+class CacheView(QWidget):
+    """BepInEx/cache entries with their size and whether they still match the plugins"""
+
+    def __init__(self, game_path):
+        super().__init__()
+        self.game_path = game_path
+        self.job = None
+        self.refresh_pending = False
+
+        layout = QVBoxLayout()
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Entry", "Size", "Status", "Last Launch"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+
+        button_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        self.clear_stale_btn = QPushButton("Clear Stale Entries")
+        self.clear_stale_btn.clicked.connect(self.clear_stale)
+        self.clear_all_btn = QPushButton("Clear All")
+        self.clear_all_btn.clicked.connect(self.clear_all)
+        button_layout.addWidget(refresh_btn)
+        button_layout.addStretch()
+        button_layout.addWidget(self.clear_stale_btn)
+        button_layout.addWidget(self.clear_all_btn)
+
+        hint = QLabel("Entries are cleared automatically when the plugins they were built from change. "
+                      "What they were built from is recorded after each launch from this window.")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #888888;")
+
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.tree)
+        layout.addWidget(hint)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def run_job(self, method, on_done):
+        """Run a CacheManager method on a worker; comparing entries may hash every plugin"""
+        self.job = CacheJobThread(self.game_path, method, parent=self)
+        self.job.done.connect(on_done)
+        self.job.failed.connect(lambda message: QMessageBox.warning(self, "BepInEx Cache", message))
+        self.job.finished.connect(self.on_job_finished)
+        self.clear_stale_btn.setEnabled(False)
+        self.clear_all_btn.setEnabled(False)
+        self.job.start()
+
+    def busy(self):
+        return self.job is not None and self.job.isRunning()
+
+    def on_job_finished(self):
+        self.clear_stale_btn.setEnabled(True)
+        self.clear_all_btn.setEnabled(True)
+        if self.refresh_pending:
+            self.refresh()
+
+    def refresh(self):
+        if self.busy():
+            self.refresh_pending = True
+            return
+        self.refresh_pending = False
+        self.run_job("status", self.show_entries)
+
+    def show_entries(self, entries):
+        self.tree.clear()
+        for entry in entries:
+            item = QTreeWidgetItem(self.tree, [entry.name, format_size(entry.size),
+                                               STATUS_LABELS.get(entry.status, "Untracked"),
+                                               LAUNCH_LABELS.get(entry.last_launch, "")])
+            item.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+            for relative in entry.changed:
+                QTreeWidgetItem(item, [f"changed: {relative}"])
+
+        total = sum(entry.size for entry in entries)
+        stale = sum(1 for entry in entries if entry.status == STALE)
+        self.summary_label.setText(f"{len(entries)} cache entr{'y' if len(entries) == 1 else 'ies'} using "
+                                   f"{format_size(total)}, {stale} stale")
+
+    def clear_stale(self):
+        if not self.busy():
+            self.run_job("invalidate", self.on_stale_cleared)
+
+    def on_stale_cleared(self, removed):
+        self.refresh_pending = True
+        QMessageBox.information(self, "BepInEx Cache", f"Removed {len(removed)} stale entr{'y' if len(removed) == 1 else 'ies'}")
+
+    def clear_all(self):
+        reply = QMessageBox.question(self, "BepInEx Cache",
+                                     "Remove the whole BepInEx cache? The next game start will rebuild it and be slower.",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes and not self.busy():
+            self.run_job("clear", lambda removed: setattr(self, "refresh_pending", True))
+
+    def wait(self):
+        self.refresh_pending = False
+        if self.job is not None:
+            self.job.wait()
@@ -3,8 +3,14 @@ import sys
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QLabel, QPushButton, QListWidget, QListWidgetItem,
                            QCheckBox, QComboBox, QMessageBox, QFileDialog,
-                           QPlainTextEdit)
-from PyQt5.QtCore import Qt
+                           QPlainTextEdit, QTreeWidget, QTreeWidgetItem, QStackedWidget,
+                           QLineEdit, QSpinBox, QMenu, QHeaderView)
+from PyQt5.QtCore import Qt, QThread
+from PyQt5.QtGui import QIntValidator, QDoubleValidator
+import cfg_parser
+from config_index import ConfigSearchIndex
+from SnapshotDialog import SnapshotDialog
+from file_utils import atomic_write_text
 
 def resource_path(relative_path):
     try:
@@ -14,69 +20,334 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+INT_TYPES = {"Byte": (0, 255), "SByte": (-128, 127), "Int16": (-32768, 32767), "UInt16": (0, 65535),
+             "Int32": (-2147483648, 2147483647)}
+LONG_TYPES = {"UInt32", "Int64", "UInt64"}
+FLOAT_TYPES = {"Single", "Double", "Decimal"}
+
+
+class FlagsEditor(QPushButton):
+    """Button with a checkable menu for enum settings that accept several values"""
+
+    def __init__(self, entry, on_change):
+        super().__init__()
+        self.on_change = on_change
+        self.menu = QMenu(self)
+        selected = {v.strip() for v in entry.value.split(",")}
+        for value in entry.acceptable_values:
+            action = self.menu.addAction(value)
+            action.setCheckable(True)
+            action.setChecked(value in selected)
+            action.toggled.connect(self.update_value)
+        self.setMenu(self.menu)
+        self.setText(entry.value)
+
+    def update_value(self):
+        checked = [a.text() for a in self.menu.actions() if a.isChecked()]
+        value = ", ".join(checked) if checked else "None"
+        self.setText(value)
+        self.on_change(value)
+
+
+class IndexThread(QThread):
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+        self.changed = False
+
+    def run(self):
+        self.changed = self.index.update()
+
+
 class ConfigEditor(QWidget):
     def __init__(self, game_path):
         super().__init__()
         self.game_path = game_path
         self.config_path = os.path.join(game_path, "BepInEx", "config")
-        
+        self.config = None
+        self.current_file = None
+
         # Create layout
         layout = QVBoxLayout()
-        
+
+        # Search across every config file of the game
+        self.search_index = ConfigSearchIndex(self.config_path)
+        self.index_thread = None
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search all settings...")
+        self.search_box.textChanged.connect(self.on_search_changed)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(150)
+        self.search_results.itemActivated.connect(self.on_search_result_selected)
+        self.search_results.itemClicked.connect(self.on_search_result_selected)
+        self.search_results.hide()
+
         # Config file selector
         self.config_selector = QComboBox()
         self.config_selector.currentIndexChanged.connect(self.load_selected_config)
-        
-        # Config editor
+
+        self.raw_mode = QCheckBox("Edit as text")
+        self.raw_mode.toggled.connect(self.toggle_raw_mode)
+
+        selector_layout = QHBoxLayout()
+        selector_layout.addWidget(self.config_selector, 1)
+        selector_layout.addWidget(self.raw_mode)
+
+        # Structured editor: one row per setting with a widget matching its type
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(2)
+        self.tree.setHeaderLabels(["Setting", "Value"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+
+        # Plain text editor
         self.editor = QPlainTextEdit()
         self.editor.setLineWrapMode(QPlainTextEdit.NoWrap)
-        
+
+        self.stack = QStackedWidget()
+        self.stack.addWidget(self.tree)
+        self.stack.addWidget(self.editor)
+
         # Save button
         save_btn = QPushButton("Save Changes")
         save_btn.clicked.connect(self.save_config)
-        
+
+        snapshots_btn = QPushButton("Snapshots...")
+        snapshots_btn.clicked.connect(self.open_snapshots)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(save_btn, 1)
+        button_layout.addWidget(snapshots_btn)
+
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.search_results)
         layout.addWidget(QLabel("Select Configuration File:"))
-        layout.addWidget(self.config_selector)
-        layout.addWidget(self.editor)
-        layout.addWidget(save_btn)
-        
+        layout.addLayout(selector_layout)
+        layout.addWidget(self.stack)
+        layout.addLayout(button_layout)
+
         self.setLayout(layout)
         self.load_config_files()
-    
+        self.refresh_index()
+
     def load_config_files(self):
         """Load all config files from the config directory"""
         self.config_selector.clear()
-        
+
         if not os.path.exists(self.config_path):
             return
-        
-        for file in os.listdir(self.config_path):
+
+        for file in sorted(os.listdir(self.config_path), key=str.lower):
             if file.endswith(".cfg"):
                 self.config_selector.addItem(file)
-    
+
+    def refresh_index(self):
+        """Re-index changed config files in the background"""
+        if self.index_thread is not None and self.index_thread.isRunning():
+            return
+        self.index_thread = IndexThread(self.search_index)
+        self.index_thread.finished.connect(self.on_index_updated)
+        self.index_thread.start()
+
+    def on_index_updated(self):
+        if self.index_thread.changed and self.search_box.text():
+            self.run_search()
+
+    def on_search_changed(self, text):
+        if not text.strip():
+            self.search_results.hide()
+            return
+        self.run_search()
+        self.refresh_index()
+
+    def run_search(self):
+        self.search_results.clear()
+        for result in self.search_index.search(self.search_box.text()):
+            item = QListWidgetItem(f"{result.file_name}  [{result.section}]  {result.key} = {result.value}")
+            item.setData(Qt.UserRole, (result.file_name, result.section, result.key))
+            self.search_results.addItem(item)
+        if self.search_results.count() == 0:
+            self.search_results.addItem("No matching settings")
+        self.search_results.show()
+
+    def on_search_result_selected(self, item):
+        target = item.data(Qt.UserRole)
+        if target:
+            self.show_entry(*target)
+
+    def show_entry(self, file_name, section, key):
+        """Open file_name and scroll to the given setting"""
+        if self.raw_mode.isChecked():
+            self.raw_mode.setChecked(False)
+        index = self.config_selector.findText(file_name)
+        if index < 0:
+            self.load_config_files()
+            index = self.config_selector.findText(file_name)
+            if index < 0:
+                return
+        self.config_selector.setCurrentIndex(index)
+
+        for i in range(self.tree.topLevelItemCount()):
+            section_item = self.tree.topLevelItem(i)
+            for j in range(section_item.childCount()):
+                item = section_item.child(j)
+                if item.data(0, Qt.UserRole) == (section, key):
+                    section_item.setExpanded(True)
+                    self.tree.setCurrentItem(item)
+                    self.tree.scrollToItem(item, QTreeWidget.PositionAtCenter)
+                    self.tree.itemWidget(item, 1).setFocus()
+                    return
+
+    def open_snapshots(self):
+        self.confirm_discard()
+        dialog = SnapshotDialog(self.game_path, self)
+        dialog.exec_()
+
+        # A restore may have rewritten any file, reload the list and the open file
+        selected = self.config_selector.currentText()
+        self.config_selector.blockSignals(True)
+        self.load_config_files()
+        index = self.config_selector.findText(selected)
+        self.config_selector.setCurrentIndex(max(index, 0))
+        self.config_selector.blockSignals(False)
+        self.load_selected_config()
+        self.refresh_index()
+
+    def confirm_discard(self):
+        """Offer to save pending changes before the model is swapped out"""
+        if self.config is None or not self.config.dirty:
+            return
+        reply = QMessageBox.question(self, "Unsaved Changes",
+                                     f"Save changes to {os.path.basename(self.config.path)}?",
+                                     QMessageBox.Save | QMessageBox.Discard)
+        if reply == QMessageBox.Save:
+            self.save_config()
+        else:
+            self.config.discard_changes()
+
     def load_selected_config(self):
         """Load the selected config file into the editor"""
+        self.confirm_discard()
+
         selected = self.config_selector.currentText()
         if not selected:
+            self.config = None
+            self.tree.clear()
+            self.editor.clear()
             return
-        
+
         file_path = os.path.join(self.config_path, selected)
+        self.current_file = file_path
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.editor.setPlainText(f.read())
+            if self.raw_mode.isChecked():
+                self.config = None
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    self.editor.setPlainText(f.read())
+            else:
+                self.config = cfg_parser.load_config(file_path)
+                self.populate_tree()
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to load config: {str(e)}")
-    
+
+    def toggle_raw_mode(self, checked):
+        self.confirm_discard()
+        self.stack.setCurrentWidget(self.editor if checked else self.tree)
+        self.load_selected_config()
+
+    def populate_tree(self):
+        self.tree.clear()
+
+        for section in self.config.sections:
+            section_item = QTreeWidgetItem([section.name])
+            font = section_item.font(0)
+            font.setBold(True)
+            section_item.setFont(0, font)
+            self.tree.addTopLevelItem(section_item)
+
+            for entry in section.entries:
+                item = QTreeWidgetItem([entry.key])
+                item.setData(0, Qt.UserRole, (entry.section, entry.key))
+                tooltip = entry.description_text()
+                if entry.setting_type:
+                    tooltip += f"\n\nType: {entry.setting_type}"
+                if entry.default_value is not None:
+                    tooltip += f"\nDefault: {entry.default_value}"
+                item.setToolTip(0, tooltip.strip())
+                section_item.addChild(item)
+                self.tree.setItemWidget(item, 1, self.create_value_widget(entry))
+
+            section_item.setExpanded(True)
+
+    def create_value_widget(self, entry):
+        """Pick an editing widget from the setting type and acceptable values"""
+        def on_change(value, entry=entry):
+            entry.value = value
+
+        setting_type = entry.setting_type or ""
+
+        if setting_type == "Boolean":
+            widget = QCheckBox()
+            widget.setChecked(entry.value.lower() == "true")
+            widget.toggled.connect(lambda checked: on_change("true" if checked else "false"))
+            return widget
+
+        if entry.acceptable_values and entry.multiple_values:
+            return FlagsEditor(entry, on_change)
+
+        if entry.acceptable_values:
+            widget = QComboBox()
+            widget.addItems(entry.acceptable_values)
+            if entry.value not in entry.acceptable_values:
+                widget.addItem(entry.value)
+            widget.setCurrentText(entry.value)
+            widget.currentTextChanged.connect(on_change)
+            return widget
+
+        if setting_type in INT_TYPES:
+            low, high = INT_TYPES[setting_type]
+            if entry.value_range:
+                try:
+                    low, high = max(low, int(entry.value_range[0])), min(high, int(entry.value_range[1]))
+                except ValueError:
+                    pass
+            try:
+                value = int(entry.value)
+            except ValueError:
+                value = None
+            if value is not None and low <= value <= high:
+                widget = QSpinBox()
+                widget.setRange(low, high)
+                widget.setValue(value)
+                widget.valueChanged.connect(lambda v: on_change(str(v)))
+                return widget
+
+        widget = QLineEdit(entry.value)
+        if setting_type in INT_TYPES:
+            widget.setValidator(QIntValidator(widget))
+        elif setting_type in FLOAT_TYPES:
+            validator = QDoubleValidator(widget)
+            validator.setNotation(QDoubleValidator.StandardNotation)
+            if entry.value_range:
+                try:
+                    validator.setRange(float(entry.value_range[0]), float(entry.value_range[1]), 10)
+                except ValueError:
+                    pass
+            widget.setValidator(validator)
+        widget.textEdited.connect(on_change)
+        return widget
+
     def save_config(self):
         """Save changes to the config file"""
         selected = self.config_selector.currentText()
         if not selected:
             return
-        
+
         file_path = os.path.join(self.config_path, selected)
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(self.editor.toPlainText())
+            if self.raw_mode.isChecked():
+                atomic_write_text(file_path, self.editor.toPlainText())
+                cfg_parser.invalidate(file_path)
+            elif self.config is not None:
+                self.config.save()
             QMessageBox.information(self, "Success", "Configuration saved successfully")
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to save config: {str(e)}")
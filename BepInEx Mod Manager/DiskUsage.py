@@ -0,0 +1,100 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTreeWidget, QTreeWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, pyqtSignal
+from disk_usage import UsageThread, format_size
+
+
+COMPONENT_LABELS = {
+    "core": "Core",
+    "plugins": "Plugins",
+    "patchers": "Patchers",
+    "config": "Config",
+    "cache": "Cache",
+    "logs": "Logs",
+    "other": "Other",
+    "trash": "Uninstalled (waiting for deletion)",
+}
+
+
+class SizeItem(QTreeWidgetItem):
+    """Sorts by the byte count instead of the formatted text"""
+
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn() if self.treeWidget() else 0
+        if column == 1:
+            return (self.data(1, Qt.UserRole) or 0) < (other.data(1, Qt.UserRole) or 0)
+        return super().__lt__(other)
+
+
+class DiskUsageView(QWidget):
+    """Size of a game's BepInEx install by component and by plugin folder"""
+    measured = pyqtSignal(object)
+
+    def __init__(self, game_path):
+        super().__init__()
+        self.game_path = game_path
+        self.thread = None
+        self.refresh_requested = False
+
+        layout = QVBoxLayout()
+
+        top_layout = QHBoxLayout()
+        self.total_label = QLabel("Measuring...")
+        self.total_label.setStyleSheet("font-weight: bold;")
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        top_layout.addWidget(self.total_label, 1)
+        top_layout.addWidget(refresh_btn)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Component", "Size"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(1, Qt.DescendingOrder)
+
+        layout.addLayout(top_layout)
+        layout.addWidget(self.tree)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        if self.thread is not None and self.thread.isRunning():
+            self.refresh_requested = True
+            return
+        self.thread = UsageThread([self.game_path], parent=self)
+        self.thread.measured.connect(self.show_report)
+        self.thread.finished.connect(self.on_thread_finished)
+        self.thread.start()
+
+    def on_thread_finished(self):
+        if self.refresh_requested:
+            self.refresh_requested = False
+            self.refresh()
+
+    def add_row(self, parent, label, size):
+        item = SizeItem(parent, [label, format_size(size)])
+        item.setData(1, Qt.UserRole, size)
+        item.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+        return item
+
+    def show_report(self, game_path, report):
+        expanded = set()
+        for row in range(self.tree.topLevelItemCount()):
+            item = self.tree.topLevelItem(row)
+            if item.isExpanded():
+                expanded.add(item.text(0))
+
+        self.tree.clear()
+        self.total_label.setText(f"BepInEx uses {format_size(report.total)}")
+        for component, size in report.components.items():
+            if component == "trash" and not size:
+                continue
+            item = self.add_row(self.tree, COMPONENT_LABELS[component], size)
+            if component == "plugins":
+                for plugin, plugin_size in report.plugins.items():
+                    self.add_row(item, plugin, plugin_size)
+                item.setExpanded(COMPONENT_LABELS[component] in expanded or not expanded)
+        self.measured.emit(report)
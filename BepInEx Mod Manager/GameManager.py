@@ -1,15 +1,28 @@
 import os
 import platform
 import sys
+import time
 import subprocess
-import shutil
 from PluginManager import PluginManager
 from Config import ConfigEditor
+from LogViewer import LogViewer
+from StartupProfiler import StartupProfiler
+from DiskUsage import DiskUsageView
+from CacheView import CacheView
+from PackageBrowser import PackageBrowser
+from cache_manager import CacheRecordThread
+from InstallHelper import MonitorWorker
+from load_profiler import analyze
+from settings import get_setting
+from transfer_scheduler import get_scheduler
+import trash
+import integrity
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
                              QLabel, QPushButton, QListWidget, QListWidgetItem,
-                             QCheckBox, QComboBox, QMessageBox, QFileDialog)
+                             QCheckBox, QComboBox, QMessageBox, QFileDialog, QMenu)
 from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal
 from PyQt5.QtGui import QPixmap, QIcon
+from icon_cache import get_icon
 
 def resource_path(relative_path):
     try:
@@ -19,6 +32,8 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class GameManagementWindow(QMainWindow):
+    installation_changed = pyqtSignal(str)
+
     def __init__(self, game_name, game_path):
         super().__init__()
         self.game_name = game_name
@@ -30,12 +45,34 @@ class GameManagementWindow(QMainWindow):
 
         self.plugin_tab = PluginManager(game_path)
         self.config_tab = ConfigEditor(game_path)
+        self.log_tab = LogViewer(game_path)
+        self.profiler_tab = StartupProfiler(game_path)
+        self.profiler_tab.plugin_activated.connect(self.show_plugin)
+        self.usage_tab = DiskUsageView(game_path)
+        self.cache_tab = CacheView(game_path)
+        self.package_tab = PackageBrowser(game_name, game_path)
+        self.package_tab.installed.connect(self.plugin_tab.load_plugins)
+        self.launch_monitor = None
+        self.verify_thread = None
+        self.modpack_thread = None
+        self.launched_at = None
+        # Launch time of a cache record waiting for the current record or a package install
+        self.pending_cache_record = None
+
+        # Caches that predate the manager get the current plugins as their baseline
+        self.cache_record_thread = CacheRecordThread(game_path, only_untracked=True, parent=self)
+        self.cache_record_thread.start()
 
-        self.tabs.addTab(self.plugin_tab, QIcon(resource_path("icons/plugin.png")), "Plugins")
-        self.tabs.addTab(self.config_tab, QIcon(resource_path("icons/config.png")), "Configuration")
+        self.tabs.addTab(self.plugin_tab, get_icon("icons/plugin.png"), "Plugins")
+        self.tabs.addTab(self.config_tab, get_icon("icons/config.png"), "Configuration")
+        self.tabs.addTab(self.log_tab, "Log")
+        self.tabs.addTab(self.profiler_tab, "Startup Profile")
+        self.tabs.addTab(self.usage_tab, "Disk Usage")
+        self.tabs.addTab(self.cache_tab, "Cache")
+        self.tabs.addTab(self.package_tab, "Packages")
 
         open_folder_btn = QPushButton()
-        open_folder_btn.setIcon(QIcon(resource_path("icons/folder.png")))
+        open_folder_btn.setIcon(get_icon("icons/folder.png"))
         open_folder_btn.setToolTip("Open Game Directory")
         open_folder_btn.clicked.connect(self.open_game_directory)
 
@@ -44,11 +81,22 @@ class GameManagementWindow(QMainWindow):
         launch_btn = QPushButton("Launch Game")
         launch_btn.clicked.connect(self.launch_game)
 
+        self.verify_btn = QPushButton("Verify Installation")
+        self.verify_btn.clicked.connect(self.verify_installation)
+
+        self.modpack_btn = QPushButton("Modpack")
+        modpack_menu = QMenu(self.modpack_btn)
+        modpack_menu.addAction("Export Modpack...", self.export_modpack)
+        modpack_menu.addAction("Apply Modpack...", self.apply_modpack)
+        self.modpack_btn.setMenu(modpack_menu)
+
         uninstall_btn = QPushButton("Uninstall BepInEx")
         uninstall_btn.clicked.connect(self.uninstall_bepinex)
 
         button_layout = QHBoxLayout()
         button_layout.addWidget(launch_btn)
+        button_layout.addWidget(self.verify_btn)
+        button_layout.addWidget(self.modpack_btn)
         button_layout.addWidget(uninstall_btn)
 
         main_layout = QVBoxLayout()
@@ -63,13 +111,149 @@ class GameManagementWindow(QMainWindow):
         for file in os.listdir(self.game_path):
             if file.endswith(".exe") and not file.endswith("UnityCrashHandler.exe"):
                 try:
-                    subprocess.Popen([os.path.join(self.game_path, file)])
+                    launched_at = time.time()
+                    process = subprocess.Popen([os.path.join(self.game_path, file)], cwd=self.game_path)
+                    # Background downloads and disk jobs slow down while the game runs
+                    get_scheduler().track_game(process)
+                    self.record_startup(process, launched_at)
                     return
                 except Exception as e:
                     QMessageBox.warning(self, "Error", f"Failed to launch game: {str(e)}")
                     return
         QMessageBox.warning(self, "Error", "Could not find game executable")
 
+    def record_startup(self, process, launched_at):
+        """Time-stamp the log as it is written so the startup profile can attribute load time"""
+        if self.launch_monitor is not None:
+            self.launch_monitor.finish(False, "superseded by a new launch")
+        self.launched_at = launched_at
+        self.launch_monitor = MonitorWorker(self.game_path, process, launched_at, timeout=600, parent=self)
+        self.launch_monitor.finished.connect(self.on_startup_recorded)
+        self.launch_monitor.start()
+
+    def on_startup_recorded(self, success):
+        monitor = self.sender()
+        if monitor is not self.launch_monitor:
+            return
+        self.launch_monitor = None
+        self.profiler_tab.add_profile(analyze(monitor.timed_lines))
+        if success:
+            # BepInEx has written its cache for the current plugins by now
+            self.record_cache(self.launched_at)
+
+    def record_cache(self, launched_at):
+        """Record the cache state after a launch, once the running record and any package install are done"""
+        busy = [thread for thread in (self.cache_record_thread, self.package_tab.running_install())
+                if thread is not None and thread.isRunning()]
+        if busy:
+            self.pending_cache_record = launched_at
+            for thread in busy:
+                thread.finished.connect(self.record_pending_cache)
+            return
+        self.pending_cache_record = None
+        self.cache_record_thread = CacheRecordThread(self.game_path, launched_at, parent=self)
+        self.cache_record_thread.recorded.connect(self.cache_tab.refresh)
+        self.cache_record_thread.start()
+
+    def record_pending_cache(self):
+        if self.pending_cache_record is not None:
+            self.record_cache(self.pending_cache_record)
+
+    def show_plugin(self, name):
+        self.tabs.setCurrentWidget(self.plugin_tab)
+        if not self.plugin_tab.select_plugin(name):
+            self.statusBar().showMessage(f"No installed plugin matches {name}", 5000)
+
+    def verify_installation(self):
+        archive_path = integrity.installed_archive(self.game_path)
+        if archive_path is None:
+            QMessageBox.warning(self, "Verify Installation",
+                                "There is no record of the BepInEx release this game was installed from. "
+                                "Reinstall BepInEx with the manager to enable verification.")
+            return
+        self.verify_btn.setEnabled(False)
+        self.statusBar().showMessage("Verifying BepInEx files...")
+        self.verify_thread = integrity.VerifyThread(self.game_path, archive_path, parent=self)
+        self.verify_thread.verified.connect(lambda report: self.on_verified(report, archive_path))
+        self.verify_thread.failed.connect(self.on_verify_failed)
+        self.verify_thread.start()
+
+    def on_verify_failed(self, error):
+        self.verify_btn.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Error", f"Failed to verify BepInEx: {error}")
+
+    def on_verified(self, report, archive_path):
+        self.verify_btn.setEnabled(True)
+        self.statusBar().showMessage(report.summary(), 10000)
+        if report.ok:
+            QMessageBox.information(self, "Verify Installation", "All BepInEx files are intact")
+            return
+
+        details = []
+        for title, names in (("Missing", report.missing), ("Modified", report.modified), ("Extra", report.extra)):
+            if names:
+                details.append(f"{title}:\n" + "\n".join(f"  {name}" for name in names))
+        message = QMessageBox(QMessageBox.Warning, "Verify Installation", report.summary(), parent=self)
+        message.setDetailedText("\n\n".join(details))
+        message.addButton(QMessageBox.Close)
+        repair_btn = None
+        if report.repairable:
+            repair_btn = message.addButton(f"Repair {len(report.repairable)} File(s)", QMessageBox.AcceptRole)
+        message.exec_()
+        if repair_btn is None or message.clickedButton() is not repair_btn:
+            return
+
+        try:
+            integrity.repair(self.game_path, archive_path, report.repairable)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to repair BepInEx: {str(e)}")
+            return
+        QMessageBox.information(self, "Verify Installation", f"Restored {len(report.repairable)} file(s) from the release archive")
+
+    def export_modpack(self):
+        pack_dir = QFileDialog.getExistingDirectory(self, "Select Folder for the Modpack")
+        if pack_dir:
+            from modpack import export
+            self.run_modpack(export, self.game_path, pack_dir)
+
+    def apply_modpack(self):
+        from modpack import LOCKFILE_NAME, apply
+        lockfile, _ = QFileDialog.getOpenFileName(self, "Select Modpack", "", f"Modpack ({LOCKFILE_NAME} *.json)")
+        if not lockfile:
+            return
+        reply = QMessageBox.question(self, "Apply Modpack",
+                                     "Remove plugin folders that are not part of the modpack?",
+                                     QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.No)
+        if reply == QMessageBox.Cancel:
+            return
+        # The plugin watcher refreshes the list as files land
+        self.run_modpack(apply, lockfile, self.game_path, reply == QMessageBox.Yes)
+
+    def run_modpack(self, function, *args):
+        from modpack import ModpackThread
+        self.modpack_btn.setEnabled(False)
+        self.statusBar().showMessage("Working on the modpack...")
+        self.modpack_thread = ModpackThread(function, *args, parent=self)
+        self.modpack_thread.done.connect(self.on_modpack_done)
+        self.modpack_thread.failed.connect(self.on_modpack_failed)
+        self.modpack_thread.start()
+
+    def on_modpack_done(self, result):
+        self.modpack_btn.setEnabled(True)
+        self.statusBar().clearMessage()
+        if isinstance(result, str):
+            QMessageBox.information(self, "Export Modpack", f"Modpack written to {result}")
+        else:
+            QMessageBox.information(self, "Apply Modpack", result.summary())
+            if result.changed:
+                self.installation_changed.emit(self.game_path)
+
+    def on_modpack_failed(self, error):
+        self.modpack_btn.setEnabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Error", f"Modpack failed: {error}")
+
     def uninstall_bepinex(self):
         reply = QMessageBox.question(self, "Uninstall BepInEx",
                                      "Are you sure you want to uninstall BepInEx from this game?",
@@ -77,20 +261,47 @@ class GameManagementWindow(QMainWindow):
         if reply == QMessageBox.No:
             return
 
+        # Watched folders can't be renamed on Windows
+        self.plugin_tab.watcher.stop()
+        self.log_tab.stop()
         try:
-            bepinex_path = os.path.join(self.game_path, "BepInEx")
-            if os.path.exists(bepinex_path):
-                shutil.rmtree(bepinex_path)
-
-            for file in [".doorstop_version", "doorstop_config.ini", "winhttp.dll"]:
-                file_path = os.path.join(self.game_path, file)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-
-            QMessageBox.information(self, "Success", "BepInEx has been uninstalled successfully")
-            self.close()
+            entry = trash.move_to_trash(self.game_path)
         except Exception as e:
+            self.plugin_tab.watcher.start()
+            self.log_tab.start()
             QMessageBox.warning(self, "Error", f"Failed to uninstall BepInEx: {str(e)}")
+            return
+
+        self.installation_changed.emit(self.game_path)
+        if entry is not None:
+            minutes = max(1, round(get_setting("trash_grace_seconds") / 60))
+            message = QMessageBox(QMessageBox.Information, "Success",
+                                  "BepInEx has been uninstalled successfully.\n\n"
+                                  f"It can be restored for the next {minutes} minute(s).", parent=self)
+            message.addButton(QMessageBox.Ok)
+            undo_btn = message.addButton("Undo", QMessageBox.ActionRole)
+            # Esc or closing the dialog must not restore what was just uninstalled
+            message.setEscapeButton(QMessageBox.Ok)
+            message.exec_()
+            if message.clickedButton() is undo_btn:
+                try:
+                    trash.restore(entry)
+                except Exception as e:
+                    QMessageBox.warning(self, "Error", f"Failed to restore BepInEx: {str(e)}")
+                else:
+                    self.plugin_tab.watcher.start()
+                    self.log_tab.start()
+                    self.installation_changed.emit(self.game_path)
+                    return
+        self.close()
+
+    def closeEvent(self, event):
+        # Let the cache record finish so the thread isn't destroyed while running
+        self.cache_record_thread.wait()
+        self.package_tab.wait()
+        self.plugin_tab.wait()
+        self.cache_tab.wait()
+        super().closeEvent(event)
 
     def open_game_directory(self):
         try:
@@ -3,7 +3,9 @@ import sys
 import time
 import subprocess
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal
+from PyQt5.QtCore import Qt, QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from async_runtime import get_runtime, wait_process
+from bepinex_log import LogTailer, parse_line, PLUGINS_TO_LOAD_PATTERN, LOADING_PATTERN
 
 def resource_path(relative_path):
     try:
@@ -15,74 +17,197 @@ def resource_path(relative_path):
 
 class InstallHelper(QObject):
     installation_complete = pyqtSignal(bool)
-    
+    status_changed = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.monitor_thread = None
         self.monitor_worker = None
-    
+
     def launch_game(self, game_path):
-        """Launch the game executable"""
+        """Launch the game executable, returning the process or None"""
         for file in os.listdir(game_path):
             if file.endswith(".exe") and not file.endswith("UnityCrashHandler.exe"):
                 try:
-                    subprocess.Popen([os.path.join(game_path, file)])
-                    return True
+                    return subprocess.Popen([os.path.join(game_path, file)], cwd=game_path)
                 except Exception as e:
                     QMessageBox.warning(self.parent(), "Error", f"Failed to launch game: {str(e)}")
-                    return False
-        
+                    return None
+
         QMessageBox.warning(self.parent(), "Error", "Could not find game executable")
-        return False
-    
+        return None
+
     def monitor_installation(self, game_path):
         """Monitor the game to ensure BepInEx is properly installed"""
+        launched_at = time.time()
+
         # Launch the game
-        if not self.launch_game(game_path):
+        process = self.launch_game(game_path)
+        if process is None:
             return
-        
-        # Create a monitoring thread
-        self.monitor_thread = QThread()
-        self.monitor_worker = MonitorWorker(game_path)
-        self.monitor_worker.moveToThread(self.monitor_thread)
-        
-        self.monitor_thread.started.connect(self.monitor_worker.run)
-        self.monitor_worker.finished.connect(self.monitor_thread.quit)
+
+        self.monitor_worker = MonitorWorker(game_path, process, launched_at, parent=self)
+        self.monitor_worker.status.connect(self.status_changed)
         self.monitor_worker.finished.connect(self.on_monitoring_complete)
-        
-        self.monitor_thread.start()
-    
+        self.monitor_worker.start()
+
     def on_monitoring_complete(self, success):
         """Handle monitoring completion"""
         if success:
-            QMessageBox.information(self.parent(), "Success", "BepInEx has been successfully installed and initialized")
+            QMessageBox.information(self.parent(), "Success",
+                                    f"BepInEx has been successfully installed and initialized\n\n{self.monitor_worker.result}")
         else:
-            QMessageBox.warning(self.parent(), "Warning", "BepInEx installation may not have completed successfully")
-        
+            QMessageBox.warning(self.parent(), "Warning",
+                                f"BepInEx installation may not have completed successfully\n\n{self.monitor_worker.result}")
+
         self.installation_complete.emit(success)
 
 class MonitorWorker(QObject):
+    """Follow the first start of BepInEx through LogOutput.log.
+
+    The log is tailed whenever the file system watcher reports a change, and
+    the game process is awaited on the async runtime so a crash ends the wait
+    right away instead of at the timeout.
+    """
     finished = pyqtSignal(bool)
-    
-    def __init__(self, game_path):
-        super().__init__()
+    status = pyqtSignal(str)
+
+    def __init__(self, game_path, process, launched_at, timeout=120, parent=None):
+        super().__init__(parent)
         self.game_path = game_path
-        
-    def run(self):
-        """Monitor the BepInEx installation"""
-        folders_to_check = [
-            os.path.join(self.game_path, "BepInEx", "cache"),
-            os.path.join(self.game_path, "BepInEx", "config"),
-            os.path.join(self.game_path, "BepInEx", "patchers"),
-            os.path.join(self.game_path, "BepInEx", "plugins")
-        ]
-        
-        # Check every second for up to 2 minutes
-        for _ in range(120):
-            if all(os.path.exists(folder) for folder in folders_to_check):
-                self.finished.emit(True)
+        self.process = process
+        self.bepinex_path = os.path.join(game_path, "BepInEx")
+        self.log_path = os.path.join(self.bepinex_path, "LogOutput.log")
+        self.tailer = LogTailer(self.log_path, since=launched_at)
+        self.result = ""
+        self.done = False
+        self.preloader_started = False
+        self.chainloader_started = False
+        self.plugins_to_load = None
+        self.plugins_loaded = 0
+        self.errors = []
+        # (monotonic arrival time, line) for startup profiling
+        self.timed_lines = []
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_changed)
+        self.watcher.fileChanged.connect(self.on_changed)
+
+        self.timeout_timer = QTimer(self)
+        self.timeout_timer.setSingleShot(True)
+        self.timeout_timer.setInterval(timeout * 1000)
+        self.timeout_timer.timeout.connect(self.on_timeout)
+
+        # Change notifications for a file another process keeps open can be
+        # delayed on Windows, so the log is also read on a slow backstop timer
+        self.backstop_timer = QTimer(self)
+        self.backstop_timer.setInterval(5000)
+        self.backstop_timer.timeout.connect(self.on_changed)
+
+        self.process_job = None
+
+    def start(self):
+        self.watcher.addPath(self.game_path)
+        if os.path.isdir(self.bepinex_path):
+            self.watcher.addPath(self.bepinex_path)
+        self.timeout_timer.start()
+        self.backstop_timer.start()
+        self.process_job = get_runtime().job(wait_process, self.process, name="Wait for game")
+        self.process_job.done.connect(self.on_process_exited)
+        self.process_job.start()
+        self.on_changed()
+
+    def on_changed(self, path=None):
+        if self.done:
+            return
+
+        # Watch BepInEx/ and the log as soon as they appear
+        watched = set(self.watcher.directories()) | set(self.watcher.files())
+        if self.bepinex_path not in watched and os.path.isdir(self.bepinex_path):
+            self.watcher.addPath(self.bepinex_path)
+        if self.log_path not in watched and os.path.exists(self.log_path):
+            self.watcher.addPath(self.log_path)
+
+        now = time.monotonic()
+        for line in self.tailer.read_new_lines():
+            self.timed_lines.append((now, line))
+            self.handle_line(line)
+            if self.done:
                 return
-            time.sleep(1)
-        
-        # If we get here, installation might have failed
-        self.finished.emit(False)
+
+        if not os.path.exists(self.log_path) and self.folders_created():
+            # Disk logging can be switched off; fall back to the folders BepInEx creates on its first run
+            self.finish(True, "BepInEx folders were created (disk log is disabled)")
+
+    def folders_created(self):
+        return all(os.path.exists(os.path.join(self.bepinex_path, folder))
+                   for folder in ("cache", "config", "patchers", "plugins"))
+
+    def handle_line(self, line):
+        record = parse_line(line)
+        if record is None:
+            return
+        message = record.message.strip()
+
+        if record.level in ("Fatal", "Error"):
+            self.errors.append(f"[{record.source}] {message}")
+
+        if record.source != "BepInEx":
+            return
+
+        if message.startswith("Preloader started") and not self.preloader_started:
+            self.preloader_started = True
+            self.status.emit("Preloader started")
+        elif message.startswith("Chainloader started") or message.startswith("Chainloader initialized"):
+            if not self.chainloader_started:
+                self.chainloader_started = True
+                self.status.emit("Chainloader started")
+        elif PLUGINS_TO_LOAD_PATTERN.match(message):
+            self.plugins_to_load = int(PLUGINS_TO_LOAD_PATTERN.match(message).group(1))
+        elif LOADING_PATTERN.match(message):
+            self.plugins_loaded += 1
+            self.status.emit(f"{self.plugins_loaded} plugins loaded")
+        elif message.startswith("Chainloader startup complete"):
+            summary = f"Chainloader started, {self.plugins_loaded} plugins loaded"
+            if self.errors:
+                summary += f", {len(self.errors)} errors logged"
+            self.finish(True, summary)
+
+    def on_process_exited(self, code):
+        if self.done:
+            return
+        # Read whatever the game managed to log before it exited
+        self.on_changed()
+        if self.done:
+            return
+
+        if code != 0:
+            details = "\n".join(self.errors[-5:])
+            self.finish(False, f"The game exited with code {code} before BepInEx finished loading\n{details}".strip())
+        elif self.preloader_started:
+            self.finish(False, "The game closed before the chainloader finished loading plugins")
+        else:
+            # Steam/Epic builds often restart themselves through the launcher; keep waiting for the log
+            self.status.emit("Game process exited, waiting for the relaunched game...")
+
+    def on_timeout(self):
+        if self.done:
+            return
+        self.on_changed()
+        if not self.done:
+            if self.chainloader_started:
+                stage = "the chainloader never reported startup complete"
+            elif self.preloader_started:
+                stage = "the preloader started but the chainloader did not"
+            else:
+                stage = "BepInEx did not start"
+            self.finish(False, f"Timed out: {stage}")
+
+    def finish(self, success, result):
+        self.done = True
+        self.result = result
+        self.timeout_timer.stop()
+        self.backstop_timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.finished.emit(success)
@@ -1,16 +1,15 @@
 import os
 import sys
 import platform
-import requests
-import zipfile
-import shutil
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QLabel, QPushButton, QListWidget, QListWidgetItem,
                             QCheckBox, QComboBox, QMessageBox, QFileDialog,
                             QProgressDialog, QPlainTextEdit)
 from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal
 from PyQt5.QtGui import QPixmap, QIcon
-from download import BepInExDownloader
+from download import BepInExDownloader, extract_bepinex_async
+from async_runtime import get_runtime
+from integrity import record_install
 
 def resource_path(relative_path):
     try:
@@ -24,6 +23,7 @@ class Installer(QObject):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.progress_dialog = None
+        self.extract_job = None
         
     def get_system_info(self):
         system = platform.system().lower()
@@ -67,9 +67,10 @@ class Installer(QObject):
         self.progress_dialog.show()
         
         # Download BepInEx
-        downloader = BepInExDownloader()
-        downloader.progress_signal.connect(self.update_progress)
-        downloader.download_latest(lambda success, path: self.on_download_complete(success, path, game_path))
+        self.downloader = BepInExDownloader()
+        self.downloader.progress_signal.connect(self.update_progress)
+        self.downloader.download_latest(lambda success, path: self.on_download_complete(success, path, game_path))
+        self.progress_dialog.canceled.connect(self.downloader.cancel)
     
     def update_progress(self, value):
         """Update progress dialog"""
@@ -85,47 +86,25 @@ class Installer(QObject):
             return
         
         self.progress_dialog.setLabelText("Extracting BepInEx...")
+        # The old BepInEx folder is gone once extraction starts, so it can't be cancelled
+        self.progress_dialog.setCancelButton(None)
+        self.progress_dialog.setValue(0)
         
-        # Extract BepInEx to game directory
-        try:
-            # Create game folder if it doesn't exist
-            os.makedirs(game_path, exist_ok=True)
-            
-            # Extract the zip file to a temporary folder
-            temp_dir = "temp_extract"
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # Copy required files to game folder
-            required_files = [
-                '.doorstop_version',
-                'doorstop_config.ini',
-                'winhttp.dll'
-            ]
-            
-            for file in required_files:
-                src_path = os.path.join(temp_dir, file)
-                if os.path.exists(src_path):
-                    shutil.copy2(src_path, os.path.join(game_path, file))
-            
-            # Copy BepInEx folder
-            src_bepinex = os.path.join(temp_dir, 'BepInEx')
-            if os.path.exists(src_bepinex):
-                dest_bepinex = os.path.join(game_path, 'BepInEx')
-                if os.path.exists(dest_bepinex):
-                    shutil.rmtree(dest_bepinex)
-                shutil.copytree(src_bepinex, dest_bepinex)
-            
-            # Clean up
-            shutil.rmtree(temp_dir)
-            os.remove(zip_path)
-            
-            QMessageBox.information(self.parent(), "Success", "BepInEx has been installed successfully")
-            
-        except Exception as e:
-            QMessageBox.warning(self.parent(), "Error", f"Failed to extract BepInEx: {str(e)}")
-        
+        # Extract BepInEx to game directory off the GUI thread
+        self.extract_job = get_runtime().job(extract_bepinex_async, zip_path, game_path, name="Extract BepInEx")
+        self.extract_job.progress.connect(lambda progress: self.update_progress(progress[0] * 100 // max(progress[1], 1)))
+        self.extract_job.done.connect(lambda paths: self.on_extract_complete(zip_path, game_path))
+        self.extract_job.failed.connect(self.on_extract_failed)
+        self.extract_job.start()
+    
+    def on_extract_complete(self, zip_path, game_path):
+        # The archive stays cached for verify and repair
+        record_install(game_path, zip_path)
+        if self.progress_dialog:
+            self.progress_dialog.close()
+        QMessageBox.information(self.parent(), "Success", "BepInEx has been installed successfully")
+    
+    def on_extract_failed(self, message):
         if self.progress_dialog:
             self.progress_dialog.close()
+        QMessageBox.warning(self.parent(), "Error", f"Failed to extract BepInEx: {message}")
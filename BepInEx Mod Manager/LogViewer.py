@@ -0,0 +1,214 @@
+import os
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox,
+                             QLineEdit, QCheckBox, QTableView, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QModelIndex, QTimer, QFileSystemWatcher)
+from PyQt5.QtGui import QColor
+from bepinex_log import LogBuffer, LogTailer, LEVELS
+
+
+LEVEL_COLORS = {"Fatal": QColor("#FF5555"), "Error": QColor("#FF7777"),
+                "Warning": QColor("#E0C050"), "Debug": QColor("#888888")}
+
+# Only the end of a large log is loaded when the tab opens
+INITIAL_TAIL_BYTES = 8 * 1024 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class LogTableModel(QAbstractTableModel):
+    """Rows are the sequence numbers of the buffered records that pass the current filters"""
+    COLUMNS = ["Time", "Level", "Source", "Message"]
+
+    def __init__(self, buffer, parent=None):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.rows = []
+        self.level = None
+        self.source = None
+        self.text = ""
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.buffer.get(self.rows[index.row()])
+        if role == Qt.DisplayRole:
+            return (record.timestamp or "", record.level, record.source, record.message)[index.column()]
+        if role == Qt.ForegroundRole:
+            return LEVEL_COLORS.get(record.level)
+        return None
+
+    def set_filters(self, level, source, text):
+        self.level, self.source, self.text = level, source, text.lower()
+        self.beginResetModel()
+        self.rows = self.buffer.select(self.level, self.source, self.text)
+        self.endResetModel()
+
+    def reset(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+    def records_added(self, first_seq):
+        """Append rows for the records from first_seq on and drop rows that fell out of the buffer"""
+        evicted = 0
+        while evicted < len(self.rows) and self.rows[evicted] < self.buffer.first_seq:
+            evicted += 1
+        if evicted:
+            self.beginRemoveRows(QModelIndex(), 0, evicted - 1)
+            del self.rows[:evicted]
+            self.endRemoveRows()
+
+        start = max(first_seq, self.buffer.first_seq)
+        new_rows = [seq for seq in range(start, self.buffer.next_seq)
+                    if self.buffer.matches(seq, self.level, self.source, self.text)]
+        if new_rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(new_rows) - 1)
+            self.rows.extend(new_rows)
+            self.endInsertRows()
+
+
+class LogViewer(QWidget):
+    def __init__(self, game_path, capacity=50000):
+        super().__init__()
+        self.game_path = game_path
+        self.log_path = os.path.join(game_path, "BepInEx", "LogOutput.log")
+        self.buffer = LogBuffer(capacity)
+        self.tailer = LogTailer(self.log_path)
+        self.tailer.seek_tail(INITIAL_TAIL_BYTES)
+
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        self.level_filter = QComboBox()
+        self.level_filter.addItem("All Levels")
+        self.level_filter.addItems(LEVELS)
+        self.level_filter.currentIndexChanged.connect(self.apply_filters)
+
+        self.source_filter = QComboBox()
+        self.source_filter.addItem("All Sources")
+        self.source_filter.currentIndexChanged.connect(self.apply_filters)
+
+        self.text_filter = QLineEdit()
+        self.text_filter.setPlaceholderText("Filter messages...")
+        self.text_filter.textChanged.connect(self.apply_filters)
+
+        self.follow = QCheckBox("Follow")
+        self.follow.setChecked(True)
+
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear)
+
+        filter_layout.addWidget(self.level_filter)
+        filter_layout.addWidget(self.source_filter)
+        filter_layout.addWidget(self.text_filter, 1)
+        filter_layout.addWidget(self.follow)
+        filter_layout.addWidget(clear_btn)
+
+        self.model = LogTableModel(self.buffer, self)
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setWordWrap(False)
+        self.view.verticalHeader().hide()
+        # Fixed row heights keep scrolling cheap for large row counts
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(20)
+        self.view.horizontalHeader().setStretchLastSection(True)
+
+        self.status_label = QLabel()
+
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule_read)
+        self.watcher.directoryChanged.connect(self.schedule_read)
+
+        # Backstop for delayed change notifications while the game holds the log open
+        self.backstop_timer = QTimer(self)
+        self.backstop_timer.setInterval(3000)
+        self.backstop_timer.timeout.connect(self.schedule_read)
+
+        self.read_pending = False
+        self.start()
+
+    def start(self):
+        bepinex_path = os.path.dirname(self.log_path)
+        if os.path.isdir(bepinex_path) and bepinex_path not in self.watcher.directories():
+            self.watcher.addPath(bepinex_path)
+        self.backstop_timer.start()
+        self.schedule_read()
+
+    def stop(self):
+        """Let go of the log folder, e.g. before BepInEx is moved away"""
+        self.backstop_timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def schedule_read(self, path=None):
+        if self.log_path not in self.watcher.files() and os.path.exists(self.log_path):
+            self.watcher.addPath(self.log_path)
+        if not self.read_pending:
+            self.read_pending = True
+            QTimer.singleShot(0, self.read_chunk)
+
+    def read_chunk(self):
+        """Ingest at most READ_CHUNK_BYTES, then yield to the event loop before the next chunk"""
+        self.read_pending = False
+        lines = self.tailer.read_new_lines(READ_CHUNK_BYTES)
+        if self.tailer.rotated:
+            # The game was restarted and BepInEx began a new log
+            self.tailer.rotated = False
+            self.buffer.clear()
+            self.model.reset()
+
+        if lines:
+            first_seq = self.buffer.next_seq
+            sources = len(self.buffer.by_source)
+            for line in lines:
+                self.buffer.append_line(line)
+            if len(self.buffer.by_source) != sources:
+                self.update_sources()
+            self.model.records_added(first_seq)
+            if self.follow.isChecked():
+                self.view.scrollToBottom()
+
+        self.status_label.setText(f"{len(self.model.rows)} of {len(self.buffer)} buffered lines shown")
+        if self.tailer.pending_bytes:
+            self.schedule_read()
+
+    def update_sources(self):
+        current = self.source_filter.currentText()
+        self.source_filter.blockSignals(True)
+        self.source_filter.clear()
+        self.source_filter.addItem("All Sources")
+        self.source_filter.addItems(sorted((s for s in self.buffer.by_source if s), key=str.lower))
+        index = self.source_filter.findText(current)
+        self.source_filter.setCurrentIndex(max(index, 0))
+        self.source_filter.blockSignals(False)
+
+    def apply_filters(self):
+        level = self.level_filter.currentText() if self.level_filter.currentIndex() > 0 else None
+        source = self.source_filter.currentText() if self.source_filter.currentIndex() > 0 else None
+        self.model.set_filters(level, source, self.text_filter.text())
+        self.status_label.setText(f"{len(self.model.rows)} of {len(self.buffer)} buffered lines shown")
+        if self.follow.isChecked():
+            self.view.scrollToBottom()
+
+    def clear(self):
+        self.buffer.clear()
+        self.model.reset()
+        self.status_label.setText("")
@@ -1,13 +1,18 @@
 import os
 import sys
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton,
-                             QListWidget, QListWidgetItem, QMessageBox, QFileDialog,
-                             QStyledItemDelegate, QStyle)
-from PyQt5.QtCore import Qt, QSize, QRect
-from PyQt5.QtGui import QPixmap, QIcon
-from GameManager import GameManagementWindow
-from Installer import Installer
-from game_finder import GameFinder
+                             QListView, QMessageBox, QFileDialog, QLineEdit, QComboBox,
+                             QStyledItemDelegate, QStyle, QInputDialog)
+from PyQt5.QtCore import Qt, QSize, QRect, QTimer, QSortFilterProxyModel
+from PyQt5.QtGui import QPixmap, QIcon, QStandardItemModel, QStandardItem
+from icon_cache import get_icon, get_pixmap
+from game_cache import (load_cached_games, save_cached_games, load_manual_games, save_manual_games,
+                        plugin_counts)
+from game_index import GameSearchIndex
+
+# GameManager, Installer and game_finder pull in most of the application
+# (requests, zipfile, every tab); they are imported on first use so the
+# window can paint before any of it is loaded.
 
 def resource_path(relative_path):
     try:
@@ -37,6 +42,11 @@ class GameItemDelegate(QStyledItemDelegate):
                               icon_size.width(), icon_size.height())
             status_icon.paint(painter, icon_rect)
 
+        size_text = index.data(Qt.UserRole + 4)
+        if size_text:
+            size_rect = option.rect.adjusted(24, 0, -28, 0)
+            painter.drawText(size_rect, Qt.AlignVCenter | Qt.AlignRight, size_text)
+
         source_icon = index.data(Qt.DecorationRole)
         if source_icon:
             icon_size = QSize(16, 16)
@@ -45,6 +55,101 @@ class GameItemDelegate(QStyledItemDelegate):
                               icon_size.width(), icon_size.height())
             source_icon.paint(painter, icon_rect)
 
+SOURCE_ICONS = {
+    'Steam': "icons/steam_icon.png",
+    'Epic Games': "icons/epic_icon.png",
+    'Microsoft Store': "icons/ms_store_icon.png",
+}
+
+GAME_INFO_ROLE = Qt.UserRole
+STATUS_ICON_ROLE = Qt.UserRole + 1
+INSTALLED_ROLE = Qt.UserRole + 2
+KEY_ROLE = Qt.UserRole + 3
+SIZE_TEXT_ROLE = Qt.UserRole + 4
+
+PLATFORM_FILTERS = ["All Platforms", "x64", "x86", "IL2CPP", "Unknown"]
+
+
+def game_key(game_path):
+    return os.path.normcase(os.path.abspath(game_path))
+
+
+class GameListModel(QStandardItemModel):
+    """One row per game, keyed by its normalized path so scan results update rows in place"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = {}
+        self.index = GameSearchIndex()
+
+    def upsert(self, game_name, game_info):
+        key = game_key(game_info['path'])
+        item = self.items.get(key)
+        if item is None:
+            item = QStandardItem()
+            item.setEditable(False)
+            item.setData(key, KEY_ROLE)
+            self.items[key] = item
+            self.appendRow(item)
+
+        item.setText(game_name)
+        item.setData(game_info, GAME_INFO_ROLE)
+        source_icon = SOURCE_ICONS.get(game_info['source'])
+        item.setIcon(get_icon(source_icon) if source_icon else QIcon())
+        self.update_status(item)
+        self.index.add(key, game_name, game_info['source'])
+        return item
+
+    def update_status(self, item):
+        installed = os.path.exists(os.path.join(item.data(GAME_INFO_ROLE)['path'], 'BepInEx'))
+        item.setData(installed, INSTALLED_ROLE)
+        item.setData(get_icon("icons/checkmark.png" if installed else "icons/download.png"), STATUS_ICON_ROLE)
+
+    def remove(self, key):
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.index.remove(key)
+            self.removeRow(item.row())
+
+    def find(self, game_path):
+        return self.items.get(game_key(game_path))
+
+    def games(self, source=None):
+        return [item for item in self.items.values()
+                if source is None or item.data(GAME_INFO_ROLE)['source'] == source]
+
+class GameFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.allowed_keys = None
+        self.source = None
+        self.installed = None
+        self.platform = None
+        self.setSortCaseSensitivity(Qt.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+    def set_filters(self, allowed_keys, source, installed, platform):
+        self.allowed_keys, self.source, self.installed, self.platform = allowed_keys, source, installed, platform
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        item = self.sourceModel().item(source_row)
+        if self.allowed_keys is not None and item.data(KEY_ROLE) not in self.allowed_keys:
+            return False
+        info = item.data(GAME_INFO_ROLE)
+        if self.source is not None and info['source'] != self.source:
+            return False
+        if self.installed is not None and bool(item.data(INSTALLED_ROLE)) != self.installed:
+            return False
+        if self.platform is not None:
+            platform = info.get('platform', 'Unknown')
+            if self.platform == "Unknown":
+                return not (platform.startswith("x64") or platform.startswith("x86"))
+            if self.platform == "IL2CPP":
+                return "IL2CPP" in platform
+            return platform.startswith(self.platform)
+        return True
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -57,21 +162,56 @@ class MainWindow(QMainWindow):
         """)
 
         self.logo_label = QLabel()
-        logo_pixmap = QPixmap(resource_path("icons/app_icon.png"))
+        logo_pixmap = get_pixmap("icons/app_icon.png")
         self.logo_label.setPixmap(logo_pixmap.scaled(200, 100, Qt.KeepAspectRatio))
         self.logo_label.setAlignment(Qt.AlignCenter)
 
         self.instructions = QLabel("To install BepInEx, click on one of the games below.\nIf you can't find your game on the list, add it manually.")
         self.instructions.setAlignment(Qt.AlignCenter)
 
-        self.game_list = QListWidget()
-        self.game_list.setStyleSheet("QListWidget::item { padding: 10px; }")
-        self.game_list.itemClicked.connect(self.on_game_selected)
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search games...")
+        self.search_box.textChanged.connect(self.apply_filters)
+
+        self.source_filter = QComboBox()
+        self.source_filter.addItems(["All Sources", "Steam", "Epic Games", "Microsoft Store", "Manual"])
+        self.source_filter.currentIndexChanged.connect(self.apply_filters)
+
+        self.status_filter = QComboBox()
+        self.status_filter.addItems(["All Games", "BepInEx Installed", "Not Installed"])
+        self.status_filter.currentIndexChanged.connect(self.apply_filters)
+
+        self.platform_filter = QComboBox()
+        self.platform_filter.addItems(PLATFORM_FILTERS)
+        self.platform_filter.currentIndexChanged.connect(self.apply_filters)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.source_filter)
+        filter_layout.addWidget(self.status_filter)
+        filter_layout.addWidget(self.platform_filter)
+
+        self.game_model = GameListModel(self)
+        self.game_proxy = GameFilterProxy(self)
+        self.game_proxy.setSourceModel(self.game_model)
+        self.game_proxy.sort(0)
+
+        self.game_list = QListView()
+        self.game_list.setModel(self.game_proxy)
+        self.game_list.setStyleSheet("QListView::item { padding: 10px; }")
+        self.game_list.clicked.connect(self.on_index_clicked)
         self.game_list.setItemDelegate(GameItemDelegate(self.game_list))
 
         self.add_game_btn = QPushButton("Add Game Manually")
         self.add_game_btn.clicked.connect(self.add_game_manually)
 
+        self.dedupe_btn = QPushButton("Deduplicate Plugins")
+        self.dedupe_btn.setToolTip("Hardlink identical plugin DLLs shared by several games on the same drive")
+        self.dedupe_btn.clicked.connect(self.deduplicate_plugins)
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.add_game_btn)
+        button_layout.addWidget(self.dedupe_btn)
+
         self.author_label = QLabel("@Pacmanninja998")
         self.URL_label = QLabel("github.com/pacmanninja998/BepInEx-Manager")
         self.version_label = QLabel("v1.0.0")
@@ -84,60 +224,206 @@ class MainWindow(QMainWindow):
         main_layout = QVBoxLayout()
         main_layout.addWidget(self.logo_label)
         main_layout.addWidget(self.instructions)
+        main_layout.addWidget(self.search_box)
+        main_layout.addLayout(filter_layout)
         main_layout.addWidget(self.game_list)
-        main_layout.addWidget(self.add_game_btn)
+        main_layout.addLayout(button_layout)
         main_layout.addLayout(footer_layout)
 
         central_widget = QWidget()
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
-        self.load_games()
+        # Paint straight away from the last scan, then rescan in the background
+        self.scan_job = None
+        self.game_window = None
+        self.purge_threads = []
+        self.dedupe_thread = None
+        self.usage_thread = None
+        self.usage_pending = set()
+        self.usage_sizes = {}
+        self.manual_games = load_manual_games()
+        for game_name, game_info in load_cached_games().items():
+            self.game_model.upsert(game_name, game_info)
+        for game_info in self.manual_games.values():
+            self.game_model.upsert(game_info['name'], game_info)
+        for key, (total, enabled) in plugin_counts().items():
+            item = self.game_model.items.get(key)
+            if item is not None:
+                item.setToolTip(f"{total} plugin files ({enabled} enabled)")
+        self.painted = False
+        self.filters_pending = False
+        QTimer.singleShot(0, lambda: self.measure_usage(self.installed_game_paths()))
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            # Start the scan only once the cached list is on screen; starting
+            # the async runtime (importing asyncio) would otherwise delay it
+            self.painted = True
+            QTimer.singleShot(0, self.load_games)
 
     def load_games(self):
-        self.game_list.clear()
-        game_finder = GameFinder()
-        games = game_finder.find_unity_games()
+        if self.scan_job is not None and self.scan_job.is_running():
+            return
+        from async_runtime import get_runtime, scan_games
+        self.scan_job = get_runtime().job(scan_games, name="Scan games")
+        self.scan_job.progress.connect(lambda game: self.on_game_found(*game))
+        self.scan_job.done.connect(self.on_scan_finished)
+        self.scan_job.failed.connect(lambda message: print(f"Game scan error: {message}"))
+        self.scan_job.start()
 
-        for game_name, game_info in games.items():
-            item = QListWidgetItem(game_name)
-            item.setData(Qt.UserRole, game_info)
+    def on_game_found(self, game_name, game_info):
+        self.game_model.upsert(game_name, game_info)
+        # Games arrive in bursts; refilter once per burst, not once per game
+        if not self.filters_pending:
+            self.filters_pending = True
+            QTimer.singleShot(0, self.apply_filters)
+
+    def on_scan_finished(self, games):
+        """Drop cached games the scan no longer finds and remember the result for the next start"""
+        found = {game_key(info['path']) for info in games.values()}
+        manual = set(self.manual_games)
+        for item in self.game_model.games():
+            key = item.data(KEY_ROLE)
+            if key not in found and key not in manual:
+                self.game_model.remove(key)
+        save_cached_games(games)
+        self.purge_trash([item.data(GAME_INFO_ROLE)['path'] for item in self.game_model.games()])
+        self.measure_usage(self.installed_game_paths())
+
+    def installed_game_paths(self):
+        return [item.data(GAME_INFO_ROLE)['path'] for item in self.game_model.games() if item.data(INSTALLED_ROLE)]
+
+    def measure_usage(self, game_paths):
+        """Size BepInEx of the given games on a worker; unchanged folders come from the cache"""
+        self.usage_pending.update(game_paths)
+        if not self.usage_pending or (self.usage_thread is not None and self.usage_thread.isRunning()):
+            return
+        from disk_usage import UsageThread
+        self.usage_thread = UsageThread(sorted(self.usage_pending), parent=self)
+        self.usage_pending.clear()
+        self.usage_thread.measured.connect(self.on_usage_measured)
+        self.usage_thread.finished.connect(lambda: self.measure_usage([]))
+        self.usage_thread.start()
+
+    def on_usage_measured(self, game_path, report):
+        from disk_usage import format_size
+        item = self.game_model.find(game_path)
+        if item is None:
+            return
+        installed = item.data(INSTALLED_ROLE)
+        item.setData(format_size(report.total) if installed else None, SIZE_TEXT_ROLE)
+        self.usage_sizes[item.data(KEY_ROLE)] = report.total if installed else 0
+        self.statusBar().showMessage(f"BepInEx uses {format_size(sum(self.usage_sizes.values()))} "
+                                     f"across {sum(1 for size in self.usage_sizes.values() if size)} game(s)")
+
+    def purge_trash(self, game_paths):
+        """Delete uninstalled BepInEx copies whose undo period is over, in the background"""
+        from trash import PurgeThread
+        thread = PurgeThread(game_paths)
+        thread.finished.connect(lambda: self.purge_threads.remove(thread))
+        self.purge_threads.append(thread)
+        thread.start()
+
+    def deduplicate_plugins(self):
+        from dedupe import DedupeThread
+        game_paths = [item.data(GAME_INFO_ROLE)['path'] for item in self.game_model.games()
+                      if item.data(INSTALLED_ROLE)]
+        if not game_paths:
+            QMessageBox.information(self, "Deduplicate Plugins", "No games with BepInEx installed")
+            return
+        self.dedupe_btn.setEnabled(False)
+        self.dedupe_btn.setText("Deduplicating...")
+        self.dedupe_thread = DedupeThread(game_paths, parent=self)
+        self.dedupe_thread.done.connect(self.on_deduplicated)
+        self.dedupe_thread.failed.connect(self.on_deduplicated)
+        self.dedupe_thread.start()
+
+    def on_deduplicated(self, report):
+        self.dedupe_btn.setEnabled(True)
+        self.dedupe_btn.setText("Deduplicate Plugins")
+        if isinstance(report, str):
+            QMessageBox.warning(self, "Error", f"Failed to deduplicate plugins: {report}")
+            return
+        message = QMessageBox(QMessageBox.Information, "Deduplicate Plugins", report.summary(), parent=self)
+        if report.errors:
+            message.setDetailedText("\n".join(report.errors))
+        message.exec_()
 
-            source = game_info['source']
-            if source == 'Steam':
-                source_icon = QIcon(resource_path("icons/steam_icon.png"))
-            elif source == 'Epic Games':
-                source_icon = QIcon(resource_path("icons/epic_icon.png"))
-            elif source == 'Microsoft Store':
-                source_icon = QIcon(resource_path("icons/ms_store_icon.png"))
-            else:
-                source_icon = QIcon()
+    def on_installation_changed(self, game_path):
+        from settings import get_setting
+        item = self.game_model.find(game_path)
+        if item is not None:
+            self.game_model.update_status(item)
+            self.apply_filters()
+        self.measure_usage([game_path])
+        grace_ms = int(get_setting("trash_grace_seconds") * 1000)
+        QTimer.singleShot(grace_ms + 1000, lambda: self.purge_trash([game_path]))
 
-            item.setIcon(source_icon)
+    def apply_filters(self):
+        self.filters_pending = False
+        allowed = self.game_model.index.search(self.search_box.text())
+        source = self.source_filter.currentText() if self.source_filter.currentIndex() > 0 else None
+        installed = {1: True, 2: False}.get(self.status_filter.currentIndex())
+        platform = self.platform_filter.currentText() if self.platform_filter.currentIndex() > 0 else None
+        self.game_proxy.set_filters(allowed, source, installed, platform)
 
-            if os.path.exists(os.path.join(game_info['path'], 'BepInEx')):
-                item.setData(Qt.UserRole + 1, QIcon(resource_path("icons/checkmark.png")))
-            else:
-                item.setData(Qt.UserRole + 1, QIcon(resource_path("icons/download.png")))
+    def add_game_item(self, game_name, game_info):
+        item = self.game_model.upsert(game_name, game_info)
+        if game_info['source'] == 'Manual':
+            self.manual_games[game_key(game_info['path'])] = dict(game_info, name=game_name)
+            save_manual_games(self.manual_games)
+        self.apply_filters()
+        return item
 
-            self.game_list.addItem(item)
+    def on_index_clicked(self, proxy_index):
+        self.on_game_selected(self.game_model.itemFromIndex(self.game_proxy.mapToSource(proxy_index)))
 
     def on_game_selected(self, item):
         game_name = item.text()
-        game_info = item.data(Qt.UserRole)
+        game_info = item.data(GAME_INFO_ROLE)
+        # BepInEx may have been installed or removed since the row was drawn
+        self.game_model.update_status(item)
         game_path = game_info['path']
 
         if os.path.exists(os.path.join(game_path, 'BepInEx')):
+            from GameManager import GameManagementWindow
             self.game_window = GameManagementWindow(game_name, game_path)
+            self.game_window.installation_changed.connect(self.on_installation_changed)
             self.game_window.show()
         else:
+            if self.offer_restore(game_name, game_path):
+                return
             reply = QMessageBox.question(self, "Install BepInEx",
                                          f"Would you like to install BepInEx for {game_name}?",
                                          QMessageBox.Yes | QMessageBox.No)
             if reply == QMessageBox.Yes:
+                from Installer import Installer
                 installer = Installer(self)
                 installer.install_bepinex(game_path, game_info['platform'])
 
+    def offer_restore(self, game_name, game_path):
+        """Offer to bring back a recently uninstalled BepInEx; returns True if it was restored"""
+        import trash
+        entry = trash.restorable_entry(game_path)
+        if entry is None:
+            return False
+        reply = QMessageBox.question(self, "Restore BepInEx",
+                                     f"BepInEx was uninstalled from {game_name} "
+                                     f"{max(1, round(entry.age() / 60))} minute(s) ago. Restore it with its plugins and configs?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.No:
+            return False
+        try:
+            trash.restore(entry)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to restore BepInEx: {str(e)}")
+            return True
+        self.on_installation_changed(game_path)
+        self.on_game_selected(self.game_model.find(game_path))
+        return True
+
     def add_game_manually(self):
         game_dir = QFileDialog.getExistingDirectory(self, "Select Game Directory")
         if not game_dir:
@@ -147,6 +433,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Invalid Directory", "Please select a valid game directory")
             return
 
+        if self.game_model.find(game_dir) is not None:
+            QMessageBox.information(self, "Add Game", "This game is already in the list")
+            return
+
+        from game_finder import GameFinder
         game_name = os.path.basename(game_dir)
         game_finder = GameFinder()
         platform = game_finder.get_unity_platform(game_dir) if game_finder.is_unity_game(game_dir) else "Unknown"
@@ -158,6 +449,55 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.No:
                 return
 
-        item = QListWidgetItem(game_name)
-        item.setData(Qt.UserRole, {'path': game_dir, 'platform': platform, 'source': 'Manual'})
-        self.game_list.addItem(item)
+        self.add_game_item(game_name, {'path': game_dir, 'platform': platform, 'source': 'Manual'})
+
+    def handle_arguments(self, arguments):
+        """Handle command line arguments, including ones forwarded by a second launch"""
+        self.setWindowState(self.windowState() & ~Qt.WindowMinimized)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+        plugin_files = [a for a in arguments if os.path.isfile(a) and a.lower().endswith(('.dll', '.zip'))]
+        game_dirs = [a for a in arguments if os.path.isdir(a)]
+
+        for game_dir in game_dirs:
+            self.open_game_path(game_dir)
+
+        if plugin_files:
+            self.install_plugin_files(plugin_files)
+
+    def open_game_path(self, game_path):
+        item = self.game_model.find(game_path)
+        if item is None:
+            from game_finder import GameFinder
+            game_finder = GameFinder()
+            platform = game_finder.get_unity_platform(game_path) if game_finder.is_unity_game(game_path) else "Unknown"
+            item = self.add_game_item(os.path.basename(game_path), {'path': game_path, 'platform': platform, 'source': 'Manual'})
+        proxy_index = self.game_proxy.mapFromSource(item.index())
+        if proxy_index.isValid():
+            self.game_list.setCurrentIndex(proxy_index)
+        self.on_game_selected(item)
+
+    def install_plugin_files(self, files):
+        """Install plugin files into the open game window, or ask which game they are for"""
+        if self.game_window is None or not self.game_window.isVisible():
+            installed = {}
+            for item in self.game_model.games():
+                if os.path.exists(os.path.join(item.data(GAME_INFO_ROLE)['path'], 'BepInEx')):
+                    installed[item.text()] = item
+            if not installed:
+                QMessageBox.warning(self, "Install Plugin", "Install BepInEx for a game before adding plugins")
+                return
+            name, ok = QInputDialog.getItem(self, "Install Plugin",
+                                            f"Install {len(files)} file(s) into which game?",
+                                            sorted(installed, key=str.lower), 0, False)
+            if not ok:
+                return
+            self.on_game_selected(installed[name])
+            if self.game_window is None:
+                return
+
+        self.game_window.raise_()
+        self.game_window.activateWindow()
+        self.game_window.plugin_tab.process_files(files)
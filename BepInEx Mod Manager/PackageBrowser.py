@@ -0,0 +1,170 @@
+import re
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
+                             QTreeWidget, QTreeWidgetItem, QHeaderView, QAbstractItemView, QMessageBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+from package_source import Catalog, CatalogThread, PackageInstallThread, index_url, installed_versions
+from settings import get_setting, set_setting
+from state_store import path_key
+
+
+class PackageBrowser(QWidget):
+    """Search a Thunderstore-style package index and install packages with their dependencies"""
+    installed = pyqtSignal()
+
+    def __init__(self, game_name, game_path):
+        super().__init__()
+        self.game_path = game_path
+        self.catalog_thread = None
+        self.install_thread = None
+        self.installed_versions = {}
+
+        layout = QVBoxLayout()
+
+        source_layout = QHBoxLayout()
+        source_layout.addWidget(QLabel("Community:"))
+        self.community_edit = QLineEdit(self.saved_community() or re.sub(r'[^0-9a-z]+', '-', game_name.lower()).strip('-'))
+        self.community_edit.setToolTip("The game's community name on the package site, as in /c/<community>/")
+        self.community_edit.editingFinished.connect(self.on_community_changed)
+        source_layout.addWidget(self.community_edit)
+        self.refresh_btn = QPushButton("Refresh Catalog")
+        self.refresh_btn.clicked.connect(self.refresh_catalog)
+        source_layout.addWidget(self.refresh_btn)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search packages (author:<name>, depends:<Owner-Name>)")
+        self.search_box.textChanged.connect(self.search)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Package", "Author", "Version", "Downloads", "Description"])
+        self.tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.tree.setRootIsDecorated(False)
+        self.tree.header().setSectionResizeMode(4, QHeaderView.Stretch)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #888888;")
+
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.status_label)
+        button_layout.addStretch()
+        self.install_btn = QPushButton("Install Selected")
+        self.install_btn.clicked.connect(self.install_selected)
+        button_layout.addWidget(self.install_btn)
+
+        layout.addLayout(source_layout)
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.tree)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def saved_community(self):
+        return get_setting("package_communities", {}).get(path_key(self.game_path))
+
+    def source(self):
+        return index_url(self.community_edit.text().strip())
+
+    def on_community_changed(self):
+        communities = get_setting("package_communities", {})
+        communities[path_key(self.game_path)] = self.community_edit.text().strip()
+        set_setting("package_communities", communities)
+        self.search()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.installed_versions = installed_versions(self.game_path)
+        if Catalog(self.source()).fetched_at() is None:
+            self.refresh_catalog()
+        else:
+            self.search()
+
+    def refresh_catalog(self):
+        if self.catalog_thread is not None and self.catalog_thread.isRunning():
+            return
+        self.refresh_btn.setEnabled(False)
+        self.status_label.setText("Downloading package index...")
+        self.catalog_thread = CatalogThread(self.source(), parent=self)
+        self.catalog_thread.progress.connect(lambda count: self.status_label.setText(f"Reading index: {count} packages"))
+        self.catalog_thread.updated.connect(self.on_catalog_updated)
+        self.catalog_thread.failed.connect(self.on_catalog_failed)
+        self.catalog_thread.start()
+
+    def on_catalog_updated(self, count):
+        self.refresh_btn.setEnabled(True)
+        self.search()
+        if count is None:
+            self.status_label.setText("Package index is up to date")
+        else:
+            self.status_label.setText(f"{count} packages in the index")
+
+    def on_catalog_failed(self, message):
+        self.refresh_btn.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Packages", f"Failed to download the package index: {message}")
+
+    def search(self):
+        text, owner, depends_on = [], None, None
+        for word in self.search_box.text().split():
+            if word.lower().startswith("author:"):
+                owner = word[len("author:"):]
+            elif word.lower().startswith("depends:"):
+                depends_on = word[len("depends:"):]
+            else:
+                text.append(word)
+
+        self.tree.clear()
+        for full_name, owner_name, name, version, description, downloads in \
+                Catalog(self.source()).search(" ".join(text), owner, depends_on):
+            current = self.installed_versions.get(full_name)
+            item = QTreeWidgetItem(self.tree, [name, owner_name, version if current in (None, version)
+                                               else f"{current} → {version}", str(downloads), description])
+            item.setData(0, Qt.UserRole, full_name)
+            item.setTextAlignment(3, Qt.AlignRight | Qt.AlignVCenter)
+            if current is not None:
+                item.setToolTip(0, f"Installed: {current}")
+
+    def install_selected(self):
+        full_names = [item.data(0, Qt.UserRole) for item in self.tree.selectedItems()]
+        if not full_names:
+            QMessageBox.information(self, "Packages", "Select the packages to install first.")
+            return
+        if self.install_thread is not None and self.install_thread.isRunning():
+            return
+        self.install_btn.setEnabled(False)
+        self.status_label.setText(f"Installing {len(full_names)} package(s) and their dependencies...")
+        self.install_thread = PackageInstallThread(self.game_path, self.source(), full_names, parent=self)
+        self.install_thread.progress.connect(lambda name: self.status_label.setText(f"Finished {name}"))
+        self.install_thread.done.connect(self.on_installed)
+        self.install_thread.failed.connect(self.on_install_failed)
+        self.install_thread.start()
+
+    def on_installed(self, report):
+        self.install_btn.setEnabled(True)
+        self.status_label.setText("")
+        self.installed_versions = installed_versions(self.game_path)
+        self.search()
+        self.installed.emit()
+        message = f"Installed {len(report.installed)} package(s)"
+        if report.skipped:
+            message += f", {len(report.skipped)} already up to date"
+        if report.missing:
+            message += "\n\nNot in the index: " + ", ".join(report.missing)
+        if report.errors:
+            message += "\n\nErrors:\n" + "\n".join(report.errors)
+            QMessageBox.warning(self, "Packages", message)
+        else:
+            QMessageBox.information(self, "Packages", message)
+
+    def on_install_failed(self, message):
+        self.install_btn.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.warning(self, "Packages", f"Failed to install packages: {message}")
+
+    def running_install(self):
+        """The package install thread while it is changing the game's plugins, else None"""
+        if self.install_thread is not None and self.install_thread.isRunning():
+            return self.install_thread
+        return None
+
+    def wait(self):
+        for thread in (self.catalog_thread, self.install_thread):
+            if thread is not None:
+                thread.wait()
@@ -1,11 +1,19 @@
 ﻿import os
+import re
 import sys
-import shutil
-import zipfile
+import sqlite3
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QPushButton, QLabel,
-                           QCheckBox, QListWidgetItem, QMessageBox, QFileDialog, QInputDialog)
-from PyQt5.QtCore import Qt
+                           QCheckBox, QListWidgetItem, QMessageBox, QFileDialog, QInputDialog,
+                           QTreeWidget, QTreeWidgetItem)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QIcon, QDragEnterEvent, QDropEvent
+from plugin_watcher import PluginWatcher
+from icon_cache import get_icon
+from dedupe import PluginStore
+from cache_manager import CacheInvalidateThread
+from game_cache import save_plugins
+from harmony_analyzer import HarmonyScanThread, is_hot
+from plugin_files import set_plugin_enabled, import_plugin_files
 
 def resource_path(relative_path):
     try:
@@ -57,6 +65,17 @@ class PluginManager(QWidget):
         super().__init__()
         self.game_path = game_path
         self.plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+        self.patch_thread = None
+        self.patches_stale = False
+        # Toggling or importing several plugins in a row triggers one scan, after the last change
+        self.patch_timer = QTimer(self)
+        self.patch_timer.setSingleShot(True)
+        self.patch_timer.setInterval(500)
+        self.patch_timer.timeout.connect(self.start_patch_scan)
+        # plugin folder -> methods it patches that other plugins patch too
+        self.shared_patches = {}
+        self.cache_thread = None
+        self.cache_pending = set()
         
         layout = QVBoxLayout()
         
@@ -85,12 +104,28 @@ class PluginManager(QWidget):
         layout.addLayout(button_layout)
         layout.addWidget(self.plugin_list)
         
+        # Methods patched by more than one plugin, filled in by the Harmony analysis
+        self.patch_label = QLabel()
+        self.patch_label.setStyleSheet("font-weight: bold;")
+        self.patch_tree = QTreeWidget()
+        self.patch_tree.setHeaderLabels(["Patched Method", "Plugin", "Patch"])
+        self.patch_tree.setMaximumHeight(180)
+        self.patch_label.hide()
+        self.patch_tree.hide()
+        layout.addWidget(self.patch_label)
+        layout.addWidget(self.patch_tree)
+        
         self.setLayout(layout)
         
         if not os.path.exists(self.plugins_path):
             os.makedirs(self.plugins_path)
             
         self.load_plugins()
+        
+        # Pick up plugins added or removed outside the manager
+        self.watcher = PluginWatcher(self.plugins_path, parent=self)
+        self.watcher.folders_changed.connect(self.refresh_folders)
+        self.watcher.start()
     
     def load_plugins(self):
         self.plugin_list.clear()
@@ -99,48 +134,213 @@ class PluginManager(QWidget):
             os.makedirs(self.plugins_path)
             return
         
-        subfolders = [f for f in os.listdir(self.plugins_path) 
-                     if os.path.isdir(os.path.join(self.plugins_path, f))]
+        subfolders = sorted((f for f in os.listdir(self.plugins_path)
+                             if os.path.isdir(os.path.join(self.plugins_path, f))), key=str.lower)
         
         if not subfolders:
             self.plugin_list.addItem("No plugins installed")
-            return
         
+        rows = []
         for subfolder in subfolders:
-            subfolder_path = os.path.join(self.plugins_path, subfolder)
+            rows += self.insert_folder_items(self.plugin_list.count(), subfolder)
+        self.record_plugins(None, rows)
+        self.analyze_patches()
+    
+    def insert_folder_items(self, row, subfolder):
+        """Insert the folder row and its DLL rows starting at `row`; returns the files for record_plugins"""
+        subfolder_path = os.path.join(self.plugins_path, subfolder)
+        
+        folder_item = QListWidgetItem(f"📁 {subfolder}")
+        folder_item.setData(Qt.UserRole, {"type": "folder", "path": subfolder_path})
+        folder_item.setIcon(get_icon("icons/folder.png"))
+        if subfolder in self.shared_patches:
+            folder_item.setToolTip(self.patch_tooltip(subfolder))
+        self.plugin_list.insertItem(row, folder_item)
+        row += 1
+        
+        try:
+            dll_files = sorted((f for f in os.listdir(subfolder_path)
+                                if f.endswith(".dll") or f.endswith(".bak")), key=str.lower)
+        except OSError:
+            dll_files = []
+        
+        records = []
+        for dll_file in dll_files:
+            item = QListWidgetItem(f"    {dll_file}")
+            item.setData(Qt.UserRole, {"type": "file", "path": os.path.join(subfolder_path, dll_file)})
             
-            folder_item = QListWidgetItem(f"📁 {subfolder}")
-            folder_item.setData(Qt.UserRole, {"type": "folder", "path": subfolder_path})
-            folder_item.setIcon(QIcon(resource_path("icons/folder.png")))
-            self.plugin_list.addItem(folder_item)
+            checkbox = QCheckBox()
+            checkbox.setChecked(dll_file.endswith(".dll"))
+            checkbox.stateChanged.connect(lambda state, f=dll_file, sf=subfolder_path: self.toggle_plugin(f, sf, state))
             
-            dll_files = [f for f in os.listdir(subfolder_path) 
-                        if f.endswith(".dll") or f.endswith(".bak")]
+            self.plugin_list.insertItem(row, item)
+            self.plugin_list.setItemWidget(item, checkbox)
+            row += 1
             
-            for dll_file in dll_files:
-                item = QListWidgetItem(f"    {dll_file}")
-                item.setData(Qt.UserRole, {"type": "file", "path": os.path.join(subfolder_path, dll_file)})
-                
-                checkbox = QCheckBox()
-                checkbox.setChecked(dll_file.endswith(".dll"))
-                checkbox.stateChanged.connect(lambda state, f=dll_file, sf=subfolder_path: self.toggle_plugin(f, sf, state))
-                
-                self.plugin_list.addItem(item)
-                self.plugin_list.setItemWidget(item, checkbox)
+            try:
+                st = os.stat(os.path.join(subfolder_path, dll_file))
+            except OSError:
+                continue
+            records.append((subfolder, dll_file, dll_file.endswith(".dll"), st.st_size, st.st_mtime_ns))
+        return records
     
-    def toggle_plugin(self, filename, subfolder_path, state):
-        full_path = os.path.join(subfolder_path, filename)
+    def record_plugins(self, folders, rows):
+        """Remember the plugin files in the state store (all folders when folders is None)"""
+        try:
+            save_plugins(self.game_path, folders, rows)
+        except sqlite3.Error as e:
+            print(f"Failed to record plugins: {str(e)}")
+    
+    def folder_rows(self):
+        """Map folder name -> (first row, row count) for the folders currently in the list"""
+        rows = {}
+        current = None
+        for row in range(self.plugin_list.count()):
+            data = self.plugin_list.item(row).data(Qt.UserRole)
+            if not data:
+                continue
+            if data["type"] == "folder":
+                current = os.path.basename(data["path"])
+                rows[current] = [row, 1]
+            elif current is not None:
+                rows[current][1] += 1
+        return rows
+    
+    def refresh_folders(self, names):
+        """Rebuild only the rows of the given plugin folders"""
+        records = []
+        for name in names:
+            rows = self.folder_rows()
+            if name in rows:
+                first, count = rows.pop(name)
+                for _ in range(count):
+                    self.plugin_list.takeItem(first)
+            
+            if not os.path.isdir(os.path.join(self.plugins_path, name)):
+                continue
+            
+            # Drop the "No plugins installed" placeholder
+            if not rows and self.plugin_list.count():
+                self.plugin_list.clear()
+            
+            following = [r[0] for n, r in rows.items() if n.lower() > name.lower()]
+            row = min(following) if following else self.plugin_list.count()
+            records += self.insert_folder_items(row, name)
+        
+        if self.plugin_list.count() == 0:
+            self.plugin_list.addItem("No plugins installed")
+        self.record_plugins(names, records)
+        self.analyze_patches()
+        self.invalidate_cache(names)
+    
+    def invalidate_cache(self, names):
+        """Drop only the BepInEx cache entries built from the plugin folders that changed, in the background"""
+        self.cache_pending.update(f"plugins/{name}" for name in names)
+        if not self.cache_pending or (self.cache_thread is not None and self.cache_thread.isRunning()):
+            return
+        self.cache_thread = CacheInvalidateThread(self.game_path, sorted(self.cache_pending), parent=self)
+        self.cache_pending.clear()
+        self.cache_thread.finished.connect(lambda: self.invalidate_cache([]))
+        self.cache_thread.start()
+    
+    def analyze_patches(self):
+        """Scan the plugin assemblies for Harmony patches in the background, shortly after the last change"""
+        self.patch_timer.start()
+    
+    def start_patch_scan(self):
+        if self.patch_thread is not None and self.patch_thread.isRunning():
+            # Run again once the current scan is done, it may have missed this change
+            self.patches_stale = True
+            return
+        self.patches_stale = False
+        self.patch_thread = HarmonyScanThread(self.plugins_path, parent=self)
+        self.patch_thread.done.connect(self.on_patches_analyzed)
+        self.patch_thread.finished.connect(self.on_patch_thread_finished)
+        self.patch_thread.start()
+    
+    def on_patch_thread_finished(self):
+        if self.patches_stale:
+            self.start_patch_scan()
+    
+    def on_patches_analyzed(self, report):
+        self.patch_tree.clear()
+        self.shared_patches = {}
+        overlaps = report.overlaps()
+        for target, plugins in overlaps:
+            hot = is_hot(target)
+            target_item = QTreeWidgetItem(self.patch_tree, [target, f"{len(plugins)} plugins", ""])
+            if hot:
+                target_item.setText(2, "runs every frame")
+                target_item.setToolTip(0, "Called every frame; each extra patch adds to the frame time")
+            for plugin, patches in sorted(plugins.items(), key=lambda item: item[0].lower()):
+                kinds = ", ".join(sorted({kind for kind, patch_method in patches}))
+                plugin_item = QTreeWidgetItem(target_item, ["", plugin, kinds])
+                plugin_item.setToolTip(2, "\n".join(patch_method for kind, patch_method in patches))
+                self.shared_patches.setdefault(plugin, []).append(target)
         
-        if state == Qt.Checked and filename.endswith(".bak"):
-            # Enable plugin
-            new_path = full_path.replace(".bak", ".dll")
-            os.rename(full_path, new_path)
-        elif state == Qt.Unchecked and filename.endswith(".dll"):
-            # Disable plugin
-            new_path = full_path + ".bak"
-            os.rename(full_path, new_path)
+        self.patch_label.setText(f"Methods patched by more than one plugin ({len(overlaps)}):")
+        self.patch_label.setVisible(bool(overlaps))
+        self.patch_tree.setVisible(bool(overlaps))
+        self.patch_tree.resizeColumnToContents(0)
+        for error in report.errors:
+            print(f"Harmony analysis skipped {error}")
         
-        self.load_plugins()
+        for row in range(self.plugin_list.count()):
+            item = self.plugin_list.item(row)
+            data = item.data(Qt.UserRole)
+            if data and data["type"] == "folder":
+                name = os.path.basename(data["path"])
+                item.setToolTip(self.patch_tooltip(name) if name in self.shared_patches else "")
+    
+    def patch_tooltip(self, plugin):
+        return "Also patched by other plugins:\n" + "\n".join(self.shared_patches[plugin])
+    
+    def wait(self):
+        self.patch_timer.stop()
+        self.patches_stale = False
+        if self.patch_thread is not None:
+            self.patch_thread.wait()
+        # Changes still pending get their own run so the next launch doesn't load a stale cache
+        while self.cache_thread is not None and self.cache_thread.isRunning():
+            self.cache_thread.wait()
+            self.invalidate_cache([])
+    
+    def select_plugin(self, name):
+        """Select the row best matching a plugin name as BepInEx logs it; returns True if found"""
+        def normalize(text):
+            return re.sub(r'[^0-9a-z]', '', text.lower())
+        
+        wanted = normalize(name)
+        if not wanted:
+            return False
+        
+        best = None
+        for row in range(self.plugin_list.count()):
+            item = self.plugin_list.item(row)
+            data = item.data(Qt.UserRole)
+            if not data:
+                continue
+            stem = os.path.basename(data["path"])
+            for suffix in (".bak", ".dll"):
+                if stem.endswith(suffix):
+                    stem = stem[:-len(suffix)]
+            candidate = normalize(stem)
+            if candidate == wanted:
+                best = item
+                if data["type"] == "file":
+                    break
+            elif best is None and candidate and (wanted in candidate or candidate in wanted):
+                best = item
+        
+        if best is None:
+            return False
+        self.plugin_list.setCurrentItem(best)
+        self.plugin_list.scrollToItem(best)
+        return True
+    
+    def toggle_plugin(self, filename, subfolder_path, state):
+        set_plugin_enabled(os.path.join(subfolder_path, filename), state == Qt.Checked)
+        self.refresh_folders([os.path.basename(subfolder_path)])
     
     def add_plugin(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -157,68 +357,11 @@ class PluginManager(QWidget):
         if not ok or not plugin_name:
             return
         
-        plugin_folder = os.path.join(self.plugins_path, plugin_name)
-        if not os.path.exists(plugin_folder):
-            os.makedirs(plugin_folder)
-        
-        dll_count = 0
-        
-        for file_path in files:
-            if file_path.endswith('.dll'):
-                shutil.copy(file_path, os.path.join(plugin_folder, os.path.basename(file_path)))
-                dll_count += 1
-            elif file_path.endswith('.zip'):
-                extracted_dlls = self.handle_zip(file_path, plugin_folder)
-                dll_count += extracted_dlls
-        
+        # Identical DLLs already installed in other games on this drive are hardlinked instead of copied
+        store = PluginStore()
+        dll_count, warnings = import_plugin_files(self.plugins_path, plugin_name, files, store)
+        store.save()
+        for warning in warnings:
+            QMessageBox.warning(self, "Warning", warning)
         QMessageBox.information(self, "Success", f"{dll_count} DLL files installed to {plugin_name}")
-        self.load_plugins()
-    
-    def handle_zip(self, zip_path, plugin_folder):
-        extracted_count = 0
-        
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Get all files in the zip
-                all_files = zip_ref.namelist()
-                
-                # Find all DLL files (including those in subfolders)
-                dll_files = [f for f in all_files if f.endswith('.dll')]
-                
-                if not dll_files:
-                    QMessageBox.warning(self, "Warning", f"No DLL files found in {os.path.basename(zip_path)}")
-                    return 0
-                
-                # Extract each DLL file
-                for dll_file in dll_files:
-                    # Extract to a temporary location
-                    zip_ref.extract(dll_file, "temp_extract")
-                    
-                    # Get just the filename without any path
-                    dll_filename = os.path.basename(dll_file)
-                    
-                    # Copy from temp location to plugin folder
-                    temp_path = os.path.join("temp_extract", dll_file)
-                    dest_path = os.path.join(plugin_folder, dll_filename)
-                    
-                    # If the file already exists, add a number to the filename
-                    if os.path.exists(dest_path):
-                        base_name, ext = os.path.splitext(dll_filename)
-                        counter = 1
-                        while os.path.exists(os.path.join(plugin_folder, f"{base_name}_{counter}{ext}")):
-                            counter += 1
-                        dest_path = os.path.join(plugin_folder, f"{base_name}_{counter}{ext}")
-                    
-                    # Copy the file
-                    shutil.copy2(temp_path, dest_path)
-                    extracted_count += 1
-                
-                # Clean up temp directory
-                if os.path.exists("temp_extract"):
-                    shutil.rmtree("temp_extract")
-                
-                return extracted_count
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to extract ZIP file: {str(e)}")
-            return 0
+        self.refresh_folders([plugin_name])
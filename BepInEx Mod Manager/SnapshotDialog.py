@@ -0,0 +1,123 @@
+import time
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                             QPushButton, QLabel, QPlainTextEdit, QMessageBox, QInputDialog,
+                             QAbstractItemView)
+from PyQt5.QtCore import Qt
+from config_snapshots import SnapshotStore
+
+
+class SnapshotDialog(QDialog):
+    def __init__(self, game_path, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Configuration Snapshots")
+        self.setMinimumSize(600, 500)
+        self.store = SnapshotStore(game_path)
+
+        layout = QVBoxLayout()
+
+        self.snapshot_list = QListWidget()
+        self.snapshot_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+
+        button_layout = QHBoxLayout()
+        for label, handler in [("Create Snapshot", self.create_snapshot),
+                               ("Compare", self.compare_snapshots),
+                               ("Restore", self.restore_snapshot),
+                               ("Delete", self.delete_snapshots)]:
+            btn = QPushButton(label)
+            btn.clicked.connect(handler)
+            button_layout.addWidget(btn)
+
+        layout.addWidget(QLabel("Select one snapshot to compare with the current config, or two to compare them:"))
+        layout.addWidget(self.snapshot_list)
+        layout.addLayout(button_layout)
+        layout.addWidget(self.diff_view)
+        self.setLayout(layout)
+
+        self.load_snapshots()
+
+    def load_snapshots(self):
+        self.snapshot_list.clear()
+        for snapshot in self.store.list_snapshots():
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.created))
+            text = f"{created}  {snapshot.label}" if snapshot.label else created
+            item = QListWidgetItem(f"{text}  ({len(snapshot.files)} files)")
+            item.setData(Qt.UserRole, snapshot)
+            self.snapshot_list.addItem(item)
+
+    def selected_snapshots(self):
+        """Selected snapshots, oldest first"""
+        snapshots = [item.data(Qt.UserRole) for item in self.snapshot_list.selectedItems()]
+        return sorted(snapshots, key=lambda s: s.created)
+
+    def create_snapshot(self):
+        label, ok = QInputDialog.getText(self, "Create Snapshot", "Label for this snapshot (optional):")
+        if not ok:
+            return
+        try:
+            self.store.create_snapshot(label)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to create snapshot: {str(e)}")
+        self.load_snapshots()
+
+    def compare_snapshots(self):
+        snapshots = self.selected_snapshots()
+        if len(snapshots) not in (1, 2):
+            QMessageBox.information(self, "Compare", "Select one or two snapshots to compare")
+            return
+
+        new_id = snapshots[1].id if len(snapshots) == 2 else None
+        try:
+            diffs = self.store.diff(snapshots[0].id, new_id)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to compare snapshots: {str(e)}")
+            return
+
+        lines = []
+        for file_diff in diffs:
+            lines.append(f"{file_diff.file_name} ({file_diff.status})")
+            for section, key, old_value, new_value in file_diff.entries:
+                if old_value is None:
+                    lines.append(f"    + [{section}] {key} = {new_value}")
+                elif new_value is None:
+                    lines.append(f"    - [{section}] {key} = {old_value}")
+                else:
+                    lines.append(f"    ~ [{section}] {key}: {old_value} -> {new_value}")
+        self.diff_view.setPlainText("\n".join(lines) if lines else "No differences")
+
+    def restore_snapshot(self):
+        snapshots = self.selected_snapshots()
+        if len(snapshots) != 1:
+            QMessageBox.information(self, "Restore", "Select a single snapshot to restore")
+            return
+
+        reply = QMessageBox.question(self, "Restore Snapshot",
+                                     "Overwrite the current configuration with this snapshot?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.No:
+            return
+
+        try:
+            written = self.store.restore(snapshots[0].id)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to restore snapshot: {str(e)}")
+            return
+        QMessageBox.information(self, "Success", f"{len(written)} config files restored")
+
+    def delete_snapshots(self):
+        snapshots = self.selected_snapshots()
+        if not snapshots:
+            return
+        reply = QMessageBox.question(self, "Delete Snapshots",
+                                     f"Delete {len(snapshots)} snapshot(s)?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.No:
+            return
+
+        for snapshot in snapshots:
+            self.store.delete_snapshot(snapshot.id)
+        self.store.collect_garbage()
+        self.load_snapshots()
@@ -0,0 +1,148 @@
+import os
+import time
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox,
+                             QCheckBox, QTreeWidget, QTreeWidgetItem, QHeaderView, QMessageBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+import cfg_parser
+from load_profiler import ProfileHistory, analyze_log_file
+
+
+def format_seconds(seconds):
+    return "" if seconds is None else f"{seconds:.2f}"
+
+
+class StartupProfiler(QWidget):
+    """Ranks plugins and patchers by the time they take during game startup"""
+    plugin_activated = pyqtSignal(str)
+
+    def __init__(self, game_path):
+        super().__init__()
+        self.game_path = game_path
+        self.log_path = os.path.join(game_path, "BepInEx", "LogOutput.log")
+        self.bepinex_cfg = os.path.join(game_path, "BepInEx", "config", "BepInEx.cfg")
+        self.history = ProfileHistory(game_path)
+        self.profiles = []
+
+        layout = QVBoxLayout()
+
+        run_layout = QHBoxLayout()
+        self.run_selector = QComboBox()
+        self.run_selector.currentIndexChanged.connect(self.show_selected_run)
+        analyze_btn = QPushButton("Analyze Current Log")
+        analyze_btn.clicked.connect(self.analyze_current_log)
+        run_layout.addWidget(QLabel("Launch:"))
+        run_layout.addWidget(self.run_selector, 1)
+        run_layout.addWidget(analyze_btn)
+
+        # BepInEx buffers the disk log and flushes it about once a second,
+        # which is too coarse to time individual plugins
+        self.instant_flushing = QCheckBox("Precise timing (flush the BepInEx log instantly)")
+        self.instant_flushing.toggled.connect(self.set_instant_flushing)
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["#", "Type", "Name", "Version", "Seconds", "Average"])
+        self.tree.setRootIsDecorated(False)
+        self.tree.setSortingEnabled(False)
+        self.tree.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.tree.itemDoubleClicked.connect(self.on_item_activated)
+
+        hint = QLabel("Launch the game from this window to record timings. Double-click an entry to find its plugin.")
+        hint.setStyleSheet("color: #888888;")
+
+        layout.addLayout(run_layout)
+        layout.addWidget(self.instant_flushing)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.tree)
+        layout.addWidget(hint)
+        self.setLayout(layout)
+
+        self.load_instant_flushing()
+        self.load_history()
+
+    def load_instant_flushing(self):
+        entry = None
+        try:
+            entry = cfg_parser.load_config(self.bepinex_cfg).get("Logging.Disk", "InstantFlushing")
+        except (OSError, UnicodeDecodeError):
+            pass
+        self.instant_flushing.blockSignals(True)
+        self.instant_flushing.setEnabled(entry is not None)
+        self.instant_flushing.setChecked(entry is not None and entry.value.lower() == "true")
+        self.instant_flushing.blockSignals(False)
+
+    def set_instant_flushing(self, checked):
+        try:
+            # A fresh parse: only this one setting is written, whatever is edited elsewhere
+            config = cfg_parser.read_config(self.bepinex_cfg)
+            config.set_value("Logging.Disk", "InstantFlushing", "true" if checked else "false")
+            config.save()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to update BepInEx.cfg: {str(e)}")
+            self.load_instant_flushing()
+
+    def load_history(self, select_index=0):
+        self.profiles = self.history.load()
+        self.averages = self.history.averages()
+        self.run_selector.blockSignals(True)
+        self.run_selector.clear()
+        for profile in self.profiles:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(profile.recorded_at))
+            total = f" - {profile.total_seconds:.1f}s" if profile.total_seconds is not None else ""
+            self.run_selector.addItem(f"{started}{total}")
+        self.run_selector.blockSignals(False)
+        if self.profiles:
+            self.run_selector.setCurrentIndex(select_index)
+            self.show_profile(self.profiles[select_index])
+
+    def add_profile(self, profile):
+        """Store a profile recorded during a launch and show it"""
+        if not profile.entries:
+            return
+        self.history.add(profile)
+        self.load_history()
+
+    def analyze_current_log(self):
+        if not os.path.exists(self.log_path):
+            QMessageBox.information(self, "Startup Profile", "No LogOutput.log found, launch the game first")
+            return
+        try:
+            profile = analyze_log_file(self.log_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to read log: {str(e)}")
+            return
+        self.run_selector.setCurrentIndex(-1)
+        self.show_profile(profile)
+
+    def show_selected_run(self, index):
+        if 0 <= index < len(self.profiles):
+            self.show_profile(self.profiles[index])
+
+    def show_profile(self, profile):
+        parts = []
+        if profile.total_seconds is not None:
+            parts.append(f"Total {profile.total_seconds:.2f}s")
+        if profile.preloader_seconds is not None:
+            parts.append(f"preloader {profile.preloader_seconds:.2f}s")
+        if profile.chainloader_seconds is not None:
+            parts.append(f"chainloader {profile.chainloader_seconds:.2f}s")
+        if not profile.timed:
+            parts.append("This log has no timing information; showing load order only")
+        if not profile.complete:
+            parts.append("startup did not complete")
+        self.summary_label.setText(", ".join(parts))
+
+        self.tree.clear()
+        for rank, entry in enumerate(profile.slowest(), 1):
+            average = self.averages.get((entry.kind, entry.name))
+            item = QTreeWidgetItem([str(rank), entry.kind.capitalize(), entry.name, entry.version or "",
+                                    format_seconds(entry.seconds), format_seconds(average)])
+            item.setData(0, Qt.UserRole, entry.name)
+            for column in (0, 4, 5):
+                item.setTextAlignment(column, Qt.AlignRight | Qt.AlignVCenter)
+            self.tree.addTopLevelItem(item)
+
+    def on_item_activated(self, item):
+        self.plugin_activated.emit(item.data(0, Qt.UserRole))
@@ -0,0 +1,30 @@
+import os
+import sys
+import hashlib
+
+
+def app_data_dir():
+    """Per-user folder for the manager's own state (snapshots, caches, settings)"""
+    override = os.environ.get("BEPINEX_MANAGER_DATA")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "BepInEx Manager")
+
+
+def app_data_path(*parts):
+    """Return a path inside the data folder, creating its parent folders"""
+    path = os.path.join(app_data_dir(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def game_key(game_path):
+    """Stable short id for a game folder, used to name per-game state"""
+    normalized = os.path.normcase(os.path.abspath(game_path))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,285 @@
+import os
+import asyncio
+import hashlib
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from PyQt5.QtCore import QObject, pyqtSignal
+import fast_extract
+from transfer_scheduler import get_scheduler, INTERACTIVE
+
+CHUNK_SIZE = 256 * 1024
+
+
+class Job(QObject):
+    """A coroutine on the shared runtime, created by AsyncRuntime.job and run by start().
+
+    The signals are emitted from the runtime thread and delivered on the
+    thread the job was created on (the GUI thread), so slots can touch
+    widgets.  cancel() interrupts the coroutine at its next await; the job
+    only counts as ended once the coroutine has finished cleaning up.
+    """
+    progress = pyqtSignal(object)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, loop, coroutine, name=""):
+        super().__init__()
+        self.loop = loop
+        self.coroutine = coroutine
+        self.name = name
+        self.task = None
+        self.future = Future()
+        self.result = None
+        self.error = None
+
+    def report(self, value):
+        self.progress.emit(value)
+
+    def cancel(self):
+        self.loop.call_soon_threadsafe(lambda: self.task is not None and self.task.cancel())
+
+    def is_running(self):
+        return not self.future.done()
+
+    def wait(self, timeout=None):
+        """Block until the job ended; returns its result (None if it failed or was cancelled)"""
+        try:
+            return self.future.result(timeout)
+        except (CancelledError, Exception):
+            return None
+
+    def start(self):
+        """Schedule the coroutine; connect the signals first, like QThread.start"""
+        self.loop.call_soon_threadsafe(self.create_task)
+        return self
+
+    def create_task(self):
+        self.task = self.loop.create_task(self.coroutine)
+        self.task.add_done_callback(self.on_task_done)
+
+    def on_task_done(self, task):
+        # Signal first, so nothing waiting on the future can tear Qt down mid-emit
+        if task.cancelled():
+            self.cancelled.emit()
+            self.future.cancel()
+        elif task.exception() is not None:
+            self.error = task.exception()
+            self.failed.emit(str(self.error))
+            self.future.set_exception(self.error)
+        else:
+            self.result = task.result()
+            self.done.emit(self.result)
+            self.future.set_result(self.result)
+
+
+class AsyncRuntime:
+    """One asyncio loop on a background thread plus one executor for blocking work.
+
+    Coroutines do the coordination (ordering, cancellation, progress);
+    anything that blocks on disk, CPU or a blocking library call goes through
+    run_blocking so every operation shares the same few threads.
+    """
+
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 2),
+                                           thread_name_prefix="bepinex-io")
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(target=self.run, name="bepinex-async", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def job(self, coroutine_function, *args, name=""):
+        """A job that runs coroutine_function(job, *args) once started"""
+        job = Job(self.loop, None, name)
+        job.coroutine = coroutine_function(job, *args)
+        return job
+
+    def call(self, coroutine_function, *args, timeout=None):
+        """Run a coroutine to completion from a thread other than the loop's and return its result"""
+        return self.job(coroutine_function, *args).start().future.result(timeout)
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+        return _runtime
+
+
+def shutdown_runtime():
+    """Stop the runtime if it was started; unfinished jobs are dropped"""
+    global _runtime
+    with _runtime_lock:
+        runtime, _runtime = _runtime, None
+    if runtime is not None:
+        runtime.shutdown()
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Run a blocking call on the runtime's executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+
+async def download(job, url, save_path, chunk_size=CHUNK_SIZE, priority=INTERACTIVE):
+    """Stream url to save_path and return its sha256.
+
+    Data goes to save_path.part first, so a cancelled or broken transfer never
+    looks like a finished file.  Progress is reported in percent when the
+    size is known.  The transfer waits for its turn in the transfer scheduler.
+    """
+    async with get_scheduler().transfer(url, priority) as ticket:
+        return await download_admitted(job, ticket, url, save_path, chunk_size)
+
+
+async def download_admitted(job, ticket, url, save_path, chunk_size):
+    # Imported here so the game scan can use the runtime before requests is needed
+    import requests
+    response = await run_blocking(requests.get, url, stream=True, timeout=30)
+    partial_path = save_path + ".part"
+    try:
+        response.raise_for_status()
+        total_size = int(response.headers.get('content-length', 0))
+        chunks = response.iter_content(chunk_size=chunk_size)
+        digest = hashlib.sha256()
+        downloaded = 0
+        with open(partial_path, 'wb') as f:
+            def transfer():
+                chunk = next(chunks, None)
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                return chunk
+
+            while True:
+                # One chunk per executor call, so a cancel lands between chunks
+                chunk = await run_blocking(transfer)
+                if chunk is None:
+                    break
+                downloaded += len(chunk)
+                await ticket.throttle_async(len(chunk))
+                if total_size > 0:
+                    job.report(int(downloaded * 100 / total_size))
+        os.replace(partial_path, save_path)
+        return digest.hexdigest()
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        response.close()
+
+
+async def extract(job, extractor, target_dir, destination=None, priority=INTERACTIVE):
+    """Extract with a fast_extract.Extractor a few members at a time; returns the written paths.
+
+    Progress is reported as (members done, total).  On cancel no new member
+    is started and the ones in progress are finished before the archive
+    handles are closed.  Runs as a disk job of the transfer scheduler.
+    """
+    try:
+        async with get_scheduler().disk_job(f"Extract {os.path.basename(extractor.zip_path)}", priority) as ticket:
+            return await extract_admitted(job, ticket, extractor, target_dir, destination)
+    finally:
+        await run_blocking(extractor.close)
+
+
+async def extract_admitted(job, ticket, extractor, target_dir, destination):
+    loop = asyncio.get_running_loop()
+    plan = await run_blocking(extractor.plan, target_dir, destination)
+    await run_blocking(lambda: [os.makedirs(directory, exist_ok=True)
+                                for directory in sorted({os.path.dirname(path) for info, path in plan})])
+    plan.sort(key=lambda job_: job_[0].file_size)
+    written = []
+    in_flight = set()
+
+    async def worker():
+        while plan:
+            info, path = plan.pop()
+            future = loop.run_in_executor(None, extractor.extract_member, info, path)
+            in_flight.add(future)
+            # Shielded: a cancel must not abandon a member half written (see below)
+            written.append(await asyncio.shield(future))
+            in_flight.discard(future)
+            await ticket.throttle_async(info.file_size)
+            job.report((len(written), len(written) + len(plan) + len(in_flight)))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, min(extractor.workers, len(plan))))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        plan.clear()
+        if in_flight:
+            await asyncio.wait(in_flight)
+        raise
+    return written
+
+
+async def extract_zip(job, zip_path, target_dir, destination=None):
+    extractor = await run_blocking(fast_extract.Extractor, zip_path)
+    return await extract(job, extractor, target_dir, destination)
+
+
+async def scan_games(job):
+    """Find Unity games, reporting each one as (name, info); returns {name: info}"""
+    from game_finder import GameFinder
+    games = {}
+    found = GameFinder().iter_unity_games()
+    while True:
+        game = await run_blocking(next, found, None)
+        if game is None:
+            return games
+        games[game[0]] = game[1]
+        job.report(game)
+
+
+async def wait_process(job, process):
+    """Wait for a subprocess to exit and return its exit code.
+
+    Uses a pidfd on Linux; elsewhere a dedicated thread blocks on the
+    process, so a game session doesn't hold one of the executor's threads.
+    """
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+
+    def set_exited(code=None):
+        if not exited.done():
+            exited.set_result(code)
+
+    fd = None
+    if hasattr(os, "pidfd_open"):
+        try:
+            fd = os.pidfd_open(process.pid)
+        except OSError:
+            fd = None
+    if fd is not None:
+        loop.add_reader(fd, set_exited)
+        try:
+            await exited
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+        return process.wait()
+
+    threading.Thread(target=lambda: loop.call_soon_threadsafe(set_exited, process.wait()), daemon=True).start()
+    return await exited
@@ -0,0 +1,104 @@
+"""Extraction benchmark: fast_extract against zipfile.extractall.
+
+Without --zip a synthetic archive shaped like an IL2CPP BepInEx build is
+generated (thousands of deflated members, a few large ones).  Each method
+extracts into a fresh folder; the median wall time and throughput are
+printed as JSON.
+
+    python benchmarks/bench_extract.py [--zip archive.zip] [--runs 5] [--workers 8]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import zipfile
+import argparse
+import tempfile
+import statistics
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import fast_extract
+
+
+def make_archive(path, members=3000, large=8, seed=1):
+    """Mix of small and large members with realistic (partly compressible) content"""
+    rng = random.Random(seed)
+    words = [bytes(rng.choice(b"abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 12))) for _ in range(2000)]
+
+    def content(size):
+        data = bytearray()
+        while len(data) < size:
+            if rng.random() < 0.3:
+                data += rng.randbytes(64)
+            else:
+                data += rng.choice(words) + b" "
+        return bytes(data[:size])
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for i in range(members):
+            zip_ref.writestr(f"BepInEx/interop/Assembly{i // 100}/Type{i}.dll", content(rng.randint(2000, 60000)))
+        for i in range(large):
+            zip_ref.writestr(f"BepInEx/core/Large{i}.dll", content(8 * 1024 * 1024))
+
+
+def time_method(extract, zip_path, runs):
+    times = []
+    for _ in range(runs):
+        target = tempfile.mkdtemp(prefix="bench_extract_")
+        try:
+            start = time.perf_counter()
+            extract(zip_path, target)
+            times.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--zip", help="archive to extract instead of a generated one")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="write the result JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        zip_path = args.zip
+        if not zip_path:
+            zip_path = os.path.join(work_dir, "synthetic.zip")
+            make_archive(zip_path)
+
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            infos = zip_ref.infolist()
+        uncompressed = sum(info.file_size for info in infos)
+
+        def extractall(path, target):
+            with zipfile.ZipFile(path) as zip_ref:
+                zip_ref.extractall(target)
+
+        methods = {
+            "extractall": extractall,
+            "fast_extract": lambda path, target: fast_extract.extract(path, target, workers=args.workers),
+        }
+        result = {"archive": os.path.basename(zip_path), "members": len(infos),
+                  "uncompressed_mb": uncompressed / 1024 / 1024, "runs": args.runs}
+        for name, method in methods.items():
+            times = time_method(method, zip_path, args.runs)
+            median = statistics.median(times)
+            result[name] = {"median_s": median, "min_s": min(times), "max_s": max(times),
+                            "mb_per_s": uncompressed / 1024 / 1024 / median}
+        result["speedup"] = result["extractall"]["median_s"] / result["fast_extract"]["median_s"]
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
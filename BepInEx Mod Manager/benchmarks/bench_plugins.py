@@ -0,0 +1,295 @@
+"""Plugin handling benchmark: plugin list rebuilds, toggles, imports and config editing.
+
+A synthetic BepInEx/plugins tree (--folders x --dlls), mod zips (--zips of
+--zip-members members, --zip-kb KB each) and a config file (--config-entries
+settings) are generated in a temporary game folder.  The "headless" cases
+time the file work behind each operation without widgets; the "qt" cases
+drive PluginManager and ConfigEditor on an offscreen Qt platform.  Medians
+are printed as JSON; with --baseline a previous result is compared and the
+exit code is 1 when a case got slower than --tolerance times its baseline.
+plugins_baseline.json is a reference run with the default parameters.
+
+    python benchmarks/bench_plugins.py [--mode both] [--runs 5] [--output result.json]
+                                       [--baseline benchmarks/plugins_baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import zipfile
+import argparse
+import tempfile
+import statistics
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+def make_plugin_tree(plugins_path, folders, dlls, seed=1):
+    rng = random.Random(seed)
+    for i in range(folders):
+        folder = os.path.join(plugins_path, f"Plugin{i:04d}")
+        os.makedirs(folder, exist_ok=True)
+        for j in range(dlls):
+            # Every tenth plugin disabled, like a real install
+            suffix = ".dll.bak" if (i * dlls + j) % 10 == 0 else ".dll"
+            with open(os.path.join(folder, f"Plugin{i:04d}.Part{j}{suffix}"), 'wb') as f:
+                f.write(rng.randbytes(rng.randint(4096, 65536)))
+
+
+def make_zip(path, members, member_kb, seed=1):
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("manifest.json", json.dumps({"name": os.path.basename(path)}))
+        zip_ref.writestr("README.md", "readme\n" * 100)
+        for i in range(members):
+            # Half random, half repetitive so the members compress like real assemblies
+            data = rng.randbytes(member_kb * 512) + bytes(member_kb * 512)
+            zip_ref.writestr(f"BepInEx/plugins/Mod/Assembly{i}.dll", data)
+
+
+def make_config(path, entries, seed=1):
+    rng = random.Random(seed)
+    lines = ["## Settings file was created by plugin Benchmark v1.0.0", "## Plugin GUID: bench.plugin", ""]
+    for i in range(entries):
+        if i % 20 == 0:
+            lines += [f"[Section{i // 20}]", ""]
+        kind = i % 4
+        lines.append(f"## Description of setting {i}")
+        if kind == 0:
+            lines += ["# Setting type: Boolean", "# Default value: false", f"Key{i} = {rng.choice(['true', 'false'])}"]
+        elif kind == 1:
+            lines += ["# Setting type: Int32", "# Default value: 5", "# Acceptable value range: From 0 to 100",
+                      f"Key{i} = {rng.randint(0, 100)}"]
+        elif kind == 2:
+            lines += ["# Setting type: Mode", "# Default value: Fast", "# Acceptable values: Fast, Slow, Off",
+                      f"Key{i} = {rng.choice(['Fast', 'Slow', 'Off'])}"]
+        else:
+            lines += ["# Setting type: String", "# Default value: ", f"Key{i} = value {i}"]
+        lines.append("")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+def time_case(action, runs, setup=None):
+    times = []
+    for run in range(runs):
+        if setup:
+            setup(run)
+        start = time.perf_counter()
+        action(run)
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times)}
+
+
+def headless_cases(game_path, zips, config_file, args):
+    import cfg_parser
+    import fast_extract
+    from dedupe import PluginStore
+
+    plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+    results = {}
+
+    def scan(run):
+        # The file system work of load_plugins: list folders, then each folder's DLLs
+        for name in sorted(os.listdir(plugins_path), key=str.lower):
+            folder = os.path.join(plugins_path, name)
+            if os.path.isdir(folder):
+                for file_name in os.listdir(folder):
+                    if file_name.endswith((".dll", ".bak")):
+                        os.stat(os.path.join(folder, file_name))
+    results["plugin_tree_scan"] = time_case(scan, args.runs)
+
+    toggle_path = os.path.join(plugins_path, "Plugin0000", "Plugin0000.Part1.dll")
+
+    def toggle(run):
+        os.rename(toggle_path, toggle_path + ".bak")
+        os.rename(toggle_path + ".bak", toggle_path)
+    results["toggle_rename"] = time_case(toggle, args.runs)
+
+    work_dir = tempfile.mkdtemp(prefix="bench_plugins_")
+    try:
+        def extract(run):
+            for zip_path in zips:
+                fast_extract.extract(zip_path, os.path.join(work_dir, f"extract{run}"),
+                                     lambda name: name if name.endswith('.dll') else None)
+        results["zip_extract"] = time_case(extract, args.runs)
+        results["zip_extract"]["mb_per_s"] = archive_mb(zips) / (results["zip_extract"]["median_ms"] / 1000)
+
+        sources = [os.path.join(dirpath, name) for dirpath, dirnames, names in os.walk(os.path.join(work_dir, "extract0"))
+                   for name in names]
+
+        def import_files(run):
+            store = PluginStore()
+            target = os.path.join(plugins_path, f"Imported{run}")
+            os.makedirs(target, exist_ok=True)
+            for source in sources:
+                store.import_file(source, os.path.join(target, os.path.basename(source)))
+            store.save()
+        results["import_files"] = time_case(import_files, args.runs)
+        results["import_files"]["files_per_s"] = len(sources) / (results["import_files"]["median_ms"] / 1000)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for run in range(args.runs):
+            shutil.rmtree(os.path.join(plugins_path, f"Imported{run}"), ignore_errors=True)
+
+    results["config_parse"] = time_case(lambda run: cfg_parser.read_config(config_file), args.runs)
+
+    def save_config(run):
+        config = cfg_parser.read_config(config_file)
+        config.set_value("Section0", "Key3", f"changed {run}")
+        config.save()
+    results["config_save"] = time_case(save_config, args.runs)
+    return results
+
+
+def qt_cases(game_path, zips, config_file, args):
+    from PyQt5.QtWidgets import QApplication, QInputDialog, QMessageBox
+    from PyQt5.QtCore import Qt
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    # Dialogs would block the run; answer them the way a user importing mods would
+    plugin_names = iter(f"Zipped{i}" for i in range(10 ** 6))
+    QInputDialog.getText = staticmethod(lambda *a, **k: (next(plugin_names), True))
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.Ok)
+    QMessageBox.warning = staticmethod(lambda *a, **k: QMessageBox.Ok)
+
+    from PluginManager import PluginManager
+    from Config import ConfigEditor
+
+    plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+    results = {}
+    managers = []
+
+    def construct(run):
+        managers.append(PluginManager(game_path))
+    results["plugin_manager_open"] = time_case(construct, args.runs)
+    for manager in managers[1:]:
+        manager.watcher.stop()
+        manager.wait()
+    manager = managers[0]
+    manager.watcher.stop()
+
+    results["load_plugins"] = time_case(lambda run: manager.load_plugins(), args.runs)
+    results["refresh_one_folder"] = time_case(lambda run: manager.refresh_folders(["Plugin0001"]), args.runs)
+
+    subfolder = os.path.join(plugins_path, "Plugin0000")
+
+    def toggle(run):
+        manager.toggle_plugin("Plugin0000.Part1.dll", subfolder, Qt.Unchecked)
+        manager.toggle_plugin("Plugin0000.Part1.dll.bak", subfolder, Qt.Checked)
+    results["toggle_plugin"] = time_case(toggle, args.runs)
+
+    imported = []
+
+    def process(run):
+        manager.process_files(zips)
+        imported.append(os.path.join(plugins_path, f"Zipped{run}"))
+    results["process_zip_files"] = time_case(process, args.runs)
+    results["process_zip_files"]["mb_per_s"] = archive_mb(zips) / (results["process_zip_files"]["median_ms"] / 1000)
+    for path in imported:
+        shutil.rmtree(path, ignore_errors=True)
+
+    editor = ConfigEditor(game_path)
+    editor.index_thread.wait()
+    index = editor.config_selector.findText(os.path.basename(config_file))
+
+    def load(run):
+        # Reload from disk, not from the parsed-config cache
+        import cfg_parser
+        cfg_parser.invalidate(config_file)
+        editor.config_selector.setCurrentIndex(index)
+        editor.load_selected_config()
+    results["config_editor_load"] = time_case(load, args.runs)
+
+    def save(run):
+        editor.config.set_value("Section0", "Key3", f"edited {run}")
+        editor.save_config()
+    results["config_editor_save"] = time_case(save, args.runs)
+    editor.index_thread.wait()
+    manager.wait()
+    app.processEvents()
+    return results
+
+
+def archive_mb(zips):
+    total = 0
+    for zip_path in zips:
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            total += sum(info.file_size for info in zip_ref.infolist())
+    return total / 1024 / 1024
+
+
+def compare(result, baseline, tolerance):
+    regressions = []
+    for mode in ("headless", "qt"):
+        for case, stats in result.get(mode, {}).items():
+            old = baseline.get(mode, {}).get(case)
+            if not old or not old.get("median_ms"):
+                continue
+            ratio = stats["median_ms"] / old["median_ms"]
+            stats["vs_baseline"] = ratio
+            if ratio > tolerance:
+                regressions.append(f"{mode}/{case} median {stats['median_ms']:.1f} ms is {ratio:.2f}x the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["headless", "qt", "both"], default="both")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--folders", type=int, default=200)
+    parser.add_argument("--dlls", type=int, default=5)
+    parser.add_argument("--zips", type=int, default=3)
+    parser.add_argument("--zip-members", type=int, default=40)
+    parser.add_argument("--zip-kb", type=int, default=128)
+    parser.add_argument("--config-entries", type=int, default=400)
+    parser.add_argument("--output", help="write the result JSON to this file")
+    parser.add_argument("--baseline", help="earlier result JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Keep the hash cache and state store of the run out of the user's data
+        os.environ["BEPINEX_MANAGER_DATA"] = os.path.join(work_dir, "data")
+        game_path = os.path.join(work_dir, "game")
+        make_plugin_tree(os.path.join(game_path, "BepInEx", "plugins"), args.folders, args.dlls)
+        config_dir = os.path.join(game_path, "BepInEx", "config")
+        os.makedirs(config_dir)
+        config_file = os.path.join(config_dir, "bench.plugin.cfg")
+        make_config(config_file, args.config_entries)
+        zips = []
+        for i in range(args.zips):
+            zips.append(os.path.join(work_dir, f"mod{i}.zip"))
+            make_zip(zips[-1], args.zip_members, args.zip_kb, seed=i)
+
+        result = {
+            "parameters": {key: value for key, value in vars(args).items()
+                           if key not in ("output", "baseline", "tolerance")},
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+        }
+        if args.mode in ("headless", "both"):
+            result["headless"] = headless_cases(game_path, zips, config_file, args)
+        if args.mode in ("qt", "both"):
+            result["qt"] = qt_cases(game_path, zips, config_file, args)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Startup benchmark: import time and time to first paint of MainWindow.
+
+Each run starts a fresh interpreter so module caches don't hide import cost.
+Results are printed as JSON and compared with startup_budget.json; the exit
+code is 1 when a budget is exceeded or a heavy module is imported before the
+first paint.
+
+    python benchmarks/bench_startup.py [--runs 5] [--output result.json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+CHILD = r'''
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, QEvent, QTimer
+t_qt = time.perf_counter()
+from MainWindow import MainWindow
+t_import = time.perf_counter()
+app = QApplication(sys.argv[:1])
+window = MainWindow()
+t_construct = time.perf_counter()
+result = {}
+
+class PaintWatcher(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and "first_paint" not in result:
+            result["first_paint"] = time.perf_counter()
+            result["modules_at_paint"] = sorted(sys.modules)
+            QTimer.singleShot(0, app.quit)
+        return False
+
+watcher = PaintWatcher()
+window.installEventFilter(watcher)
+window.show()
+QTimer.singleShot(10000, app.quit)
+app.exec_()
+if window.scan_job is not None:
+    window.scan_job.wait()
+if window.usage_thread is not None:
+    window.usage_thread.wait()
+print(json.dumps({
+    "qt_import_ms": (t_qt - t0) * 1000,
+    "app_import_ms": (t_import - t_qt) * 1000,
+    "construct_ms": (t_construct - t_import) * 1000,
+    "first_paint_ms": (result.get("first_paint", time.perf_counter()) - t0) * 1000,
+    "modules_at_paint": result.get("modules_at_paint", []),
+}))
+'''
+
+
+def run_once(data_dir):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["BEPINEX_MANAGER_DATA"] = data_dir
+    output = subprocess.run([sys.executable, "-c", CHILD, APP_DIR], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write the result JSON to this file")
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    args = parser.parse_args()
+
+    with open(args.budget, 'r', encoding='utf-8') as f:
+        budget = json.load(f)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        # The first run writes the game cache the later runs paint from
+        runs = [run_once(data_dir) for _ in range(args.runs + 1)][1:]
+
+    result = {"runs": args.runs}
+    for key in ("qt_import_ms", "app_import_ms", "construct_ms", "first_paint_ms"):
+        values = [run[key] for run in runs]
+        result[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+    loaded = set(runs[-1]["modules_at_paint"])
+    result["eager_heavy_modules"] = sorted(m for m in budget["lazy_modules"] if m in loaded)
+
+    failures = []
+    for key, limit in budget["median_ms"].items():
+        if result[key]["median"] > limit:
+            failures.append(f"{key} median {result[key]['median']:.1f} ms exceeds budget {limit} ms")
+    for module in result["eager_heavy_modules"]:
+        failures.append(f"{module} is imported before the first paint")
+    result["failures"] = failures
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import os
+import re
+from collections import deque
+
+# [Level  :  Source] message, optionally preceded by a [HH:MM:SS.fff] timestamp
+LINE_PATTERN = re.compile(
+    r'^(?:\[?(?P<timestamp>\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?)\]?\s*)?'
+    r'\[(?P<level>[A-Za-z]+)\s*:\s*(?P<source>[^\]]*?)\s*\]\s?(?P<message>.*)$')
+
+PLUGINS_TO_LOAD_PATTERN = re.compile(r'^(\d+) plugins? to load')
+LOADING_PATTERN = re.compile(r'^Loading \[(?P<name>.+?)(?: (?P<version>[\d.]+))?\]$')
+
+LEVELS = ["Fatal", "Error", "Warning", "Message", "Info", "Debug"]
+
+
+class LogRecord:
+    __slots__ = ("timestamp", "level", "source", "message")
+
+    def __init__(self, timestamp, level, source, message):
+        self.timestamp = timestamp
+        self.level = level
+        self.source = source
+        self.message = message
+
+
+def parse_line(line):
+    """Parse one LogOutput.log line; returns None for continuation lines such as stack traces"""
+    match = LINE_PATTERN.match(line)
+    if not match:
+        return None
+    return LogRecord(match.group("timestamp"), match.group("level"),
+                     match.group("source"), match.group("message"))
+
+
+def parse_timestamp(timestamp):
+    """Seconds since midnight for an HH:MM:SS(.fff) timestamp"""
+    hours, minutes, seconds = timestamp.replace(",", ".").split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+class LogTailer:
+    """Read a growing log file incrementally.
+
+    Only bytes appended since the previous call are read.  If the file is
+    replaced or truncated (BepInEx recreates LogOutput.log on every start)
+    reading restarts from the beginning.  With `since` set, a file last
+    written before that time is treated as a leftover from an older run and
+    ignored until it is rewritten.
+    """
+
+    def __init__(self, path, since=None, start_at_end=False):
+        self.path = path
+        self.since = since
+        self.offset = 0
+        self.identity = None
+        self.remainder = b""
+        self.skip_partial = False
+        # Set when the file was replaced or truncated; cleared by the caller
+        self.rotated = False
+        if start_at_end:
+            try:
+                st = os.stat(path)
+                self.offset, self.identity = st.st_size, (st.st_dev, st.st_ino)
+            except OSError:
+                pass
+
+    def read_new_lines(self, max_bytes=None):
+        """Return the complete lines appended since the last call"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+
+        if self.since is not None:
+            if st.st_mtime < self.since:
+                return []
+            self.since = None
+            self.reset()
+
+        identity = (st.st_dev, st.st_ino)
+        if identity != self.identity or st.st_size < self.offset:
+            self.rotated = self.identity is not None
+            self.reset()
+            self.identity = identity
+
+        if st.st_size == self.offset:
+            return []
+
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(max_bytes) if max_bytes else f.read()
+        except OSError:
+            return []
+
+        self.offset += len(data)
+        data = self.remainder + data
+        lines = data.split(b"\n")
+        self.remainder = lines.pop()
+        if self.skip_partial and lines:
+            lines.pop(0)
+            self.skip_partial = False
+        return [line.rstrip(b"\r").decode("utf-8", errors="replace") for line in lines]
+
+    def seek_tail(self, max_bytes):
+        """Skip to the last max_bytes of the file, dropping the partial first line"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        self.identity = (st.st_dev, st.st_ino)
+        self.since = None
+        self.reset()
+        if st.st_size > max_bytes:
+            self.offset = st.st_size - max_bytes
+            self.skip_partial = True
+
+    def reset(self):
+        self.offset = 0
+        self.remainder = b""
+        self.skip_partial = False
+
+    @property
+    def pending_bytes(self):
+        try:
+            return max(os.stat(self.path).st_size - self.offset, 0)
+        except OSError:
+            return 0
+
+
+class LogBuffer:
+    """Bounded ring buffer of log records with per-level and per-source indexes.
+
+    Records get increasing sequence numbers and live in a fixed list of
+    `capacity` slots; the oldest ones are overwritten once it is full and the
+    indexes are trimmed along with them.
+    """
+
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.slots = [None] * self.capacity
+        self.first_seq = 0
+        self.next_seq = 0
+        self.by_level = {}
+        self.by_source = {}
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def get(self, seq):
+        return self.slots[seq % self.capacity]
+
+    def append_line(self, line):
+        """Parse and store a line; returns (sequence number, number of records evicted)"""
+        record = parse_line(line)
+        if record is None:
+            # Stack traces and other continuation lines inherit the previous record's level and source
+            previous = self.get(self.next_seq - 1) if len(self) else None
+            record = LogRecord(None, previous.level if previous else "Info",
+                               previous.source if previous else "", line)
+
+        evicted = 0
+        if len(self) == self.capacity:
+            old = self.get(self.first_seq)
+            self.by_level[old.level].popleft()
+            self.by_source[old.source].popleft()
+            self.first_seq += 1
+            evicted = 1
+
+        seq = self.next_seq
+        self.slots[seq % self.capacity] = record
+        self.next_seq += 1
+        self.by_level.setdefault(record.level, deque()).append(seq)
+        self.by_source.setdefault(record.source, deque()).append(seq)
+        return seq, evicted
+
+    def matches(self, seq, level=None, source=None, text=None):
+        record = self.get(seq)
+        return ((level is None or record.level == level) and
+                (source is None or record.source == source) and
+                (not text or text in record.message.lower()))
+
+    def select(self, level=None, source=None, text=None):
+        """Sequence numbers of the records passing the filters, oldest first"""
+        if level is not None and source is not None:
+            candidates = self.by_level.get(level, ())
+            if len(self.by_source.get(source, ())) < len(candidates):
+                candidates = self.by_source.get(source, ())
+        elif level is not None:
+            candidates = self.by_level.get(level, ())
+        elif source is not None:
+            candidates = self.by_source.get(source, ())
+        else:
+            candidates = range(self.first_seq, self.next_seq)
+
+        text = text.lower() if text else None
+        if level is not None and source is not None or text:
+            return [seq for seq in candidates if self.matches(seq, level, source, text)]
+        return list(candidates)
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import shutil
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from app_data import app_data_path, game_key
+from file_utils import atomic_write_text
+from integrity import HashCache
+
+# Which assemblies each cache entry is built from, as folders under BepInEx/.
+# The type loader cache only covers plugins; Harmony's interop cache covers
+# everything that can patch.  Anything else (e.g. IL2CPP interop assemblies)
+# depends on the core and patchers, never on plugins, so plugin changes
+# don't force a full rebuild of it.
+DEPENDENCY_RULES = {
+    "chainloader_typeloader.dat": ("plugins",),
+    "harmony_interop_cache.dat": ("plugins", "patchers"),
+}
+DEFAULT_DEPENDENCIES = ("core", "patchers")
+
+VALID = "valid"
+STALE = "stale"
+UNTRACKED = "untracked"
+
+
+class CacheEntry:
+    def __init__(self, name, path, size, status, changed=None, last_launch=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.status = status
+        self.changed = changed or []
+        self.last_launch = last_launch
+
+
+def dependency_folders(entry_name):
+    return DEPENDENCY_RULES.get(entry_name, DEFAULT_DEPENDENCIES)
+
+
+_manifest_locks = {}
+_manifest_locks_lock = threading.Lock()
+
+
+def manifest_lock(game_path):
+    """Held around loading, changing and saving a game's manifest, so workers don't drop each other's changes"""
+    key = game_key(game_path)
+    with _manifest_locks_lock:
+        return _manifest_locks.setdefault(key, threading.Lock())
+
+
+def entry_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class CacheManager:
+    """Tracks what each BepInEx/cache entry was built from and drops only the stale ones.
+
+    After a launch the manager records size, mtime and sha256 of every
+    assembly the cache entries depend on.  When plugins change, only the
+    entries depending on the changed folders are compared and deleted; a
+    touched but identical file keeps its entry valid.
+    """
+
+    def __init__(self, game_path, hash_cache=None):
+        self.game_path = game_path
+        self.bepinex_path = os.path.join(game_path, "BepInEx")
+        self.cache_path = os.path.join(self.bepinex_path, "cache")
+        self.manifest_path = app_data_path("cache_manifests", f"{game_key(game_path)}.json")
+        self.hash_cache = hash_cache or HashCache()
+        self.manifest = {"entries": {}}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        try:
+            atomic_write_text(self.manifest_path, json.dumps(self.manifest, indent=1))
+        except OSError as e:
+            print(f"Failed to save cache manifest: {str(e)}")
+        self.hash_cache.save()
+
+    def entry_names(self):
+        try:
+            return sorted(os.listdir(self.cache_path))
+        except OSError:
+            return []
+
+    def folder_state(self, folder):
+        """{relative dll path: [size, mtime_ns]} of the assemblies in a BepInEx folder"""
+        state = {}
+        root = os.path.join(self.bepinex_path, folder)
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                if not name.lower().endswith(".dll"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                relative = os.path.relpath(path, self.bepinex_path).replace(os.sep, '/')
+                state[relative] = [st.st_size, st.st_mtime_ns]
+        return state
+
+    def dependency_state(self, folders):
+        state = {}
+        for folder in folders:
+            for relative, (size, mtime_ns) in self.folder_state(folder).items():
+                sha256 = self.hash_cache.hash(os.path.join(self.bepinex_path, relative))
+                state[relative] = [size, mtime_ns, sha256]
+        return state
+
+    def changed_dependencies(self, recorded, folders):
+        """Dependencies in the given folders added, removed or with different content since the entry was recorded"""
+        prefixes = tuple(folder.rstrip('/') + '/' for folder in folders)
+        recorded = {relative: state for relative, state in recorded.items() if relative.startswith(prefixes)}
+        current = {}
+        for folder in folders:
+            current.update(self.folder_state(folder))
+        changed = sorted(set(recorded) ^ set(current))
+        for relative in set(recorded) & set(current):
+            size, mtime_ns, sha256 = recorded[relative]
+            if [size, mtime_ns] == current[relative]:
+                continue
+            # Touched or rewritten; only a content change makes the cache stale
+            if size != current[relative][0] or \
+                    self.hash_cache.hash(os.path.join(self.bepinex_path, relative)) != sha256:
+                changed.append(relative)
+        return sorted(changed)
+
+    def record(self, launched_at=None, only_untracked=False):
+        """Remember the dependencies the current cache entries were built from (call after a launch).
+
+        With only_untracked, entries that already have a record keep it; this
+        gives a baseline for caches that existed before the manager tracked them.
+        """
+        entries = dict(self.manifest["entries"]) if only_untracked else {}
+        for name in self.entry_names():
+            if name in entries:
+                continue
+            path = os.path.join(self.cache_path, name)
+            folders = dependency_folders(name)
+            last_launch = None
+            if launched_at is not None:
+                # Rewritten during the launch means BepInEx missed its cache
+                last_launch = "rebuilt" if os.path.getmtime(path) >= launched_at else "hit"
+            entries[name] = {
+                "recorded_at": time.time(),
+                "last_launch": last_launch,
+                "dependencies": self.dependency_state(folders),
+            }
+        self.manifest["entries"] = entries
+        self.save()
+
+    def status(self):
+        result = []
+        for name in self.entry_names():
+            path = os.path.join(self.cache_path, name)
+            try:
+                size = entry_size(path)
+            except OSError:
+                continue
+            recorded = self.manifest["entries"].get(name)
+            if recorded is None:
+                result.append(CacheEntry(name, path, size, UNTRACKED))
+                continue
+            changed = self.changed_dependencies(recorded["dependencies"], dependency_folders(name))
+            result.append(CacheEntry(name, path, size, STALE if changed else VALID, changed,
+                                     recorded.get("last_launch")))
+        self.hash_cache.save()
+        return result
+
+    def invalidate(self, folders=None):
+        """Delete the entries that depend on the given folders and no longer match them.
+
+        Folders are under BepInEx/, either whole ("plugins") or one plugin
+        ("plugins/SomePlugin"); only files inside them are compared.  Returns
+        the names of the deleted entries.  Without folders every tracked
+        entry is checked.
+        """
+        removed = []
+        for name in self.entry_names():
+            entry_folders = dependency_folders(name)
+            scope = entry_folders if folders is None else \
+                [folder for folder in folders if folder.split('/')[0] in entry_folders]
+            if not scope:
+                continue
+            recorded = self.manifest["entries"].get(name)
+            if recorded is None or not self.changed_dependencies(recorded["dependencies"], scope):
+                continue
+            if self.remove(name):
+                removed.append(name)
+        if removed:
+            self.save()
+        return removed
+
+    def remove(self, name):
+        path = os.path.join(self.cache_path, name)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            # Locked while the game is running
+            print(f"Failed to remove cache entry {name}: {str(e)}")
+            return False
+        self.manifest["entries"].pop(name, None)
+        return True
+
+    def clear(self):
+        removed = [name for name in self.entry_names() if self.remove(name)]
+        self.save()
+        return removed
+
+
+class CacheRecordThread(QThread):
+    """Hash the cache dependencies off the GUI thread; the first run may read every plugin"""
+    recorded = pyqtSignal()
+
+    def __init__(self, game_path, launched_at=None, only_untracked=False, parent=None):
+        super().__init__(parent)
+        self.game_path = game_path
+        self.launched_at = launched_at
+        self.only_untracked = only_untracked
+
+    def run(self):
+        try:
+            with manifest_lock(self.game_path):
+                CacheManager(self.game_path).record(self.launched_at, self.only_untracked)
+        except Exception as e:
+            print(f"Failed to record the BepInEx cache state: {str(e)}")
+            return
+        self.recorded.emit()
+
+
+class CacheInvalidateThread(QThread):
+    """Drop the cache entries built from changed folders off the GUI thread; comparing may hash DLLs"""
+    invalidated = pyqtSignal(list)
+
+    def __init__(self, game_path, folders, parent=None):
+        super().__init__(parent)
+        self.game_path = game_path
+        self.folders = folders
+
+    def run(self):
+        try:
+            with manifest_lock(self.game_path):
+                removed = CacheManager(self.game_path).invalidate(self.folders)
+        except Exception as e:
+            print(f"Failed to invalidate the BepInEx cache: {str(e)}")
+            return
+        self.invalidated.emit(removed)
+
+
+class CacheJobThread(QThread):
+    """Run a CacheManager method (status, invalidate, clear) off the GUI thread under the manifest lock"""
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_path, method, *args, parent=None):
+        super().__init__(parent)
+        self.game_path = game_path
+        self.method = method
+        self.args = args
+
+    def run(self):
+        try:
+            with manifest_lock(self.game_path):
+                result = getattr(CacheManager(self.game_path), self.method)(*self.args)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit(result)
@@ -0,0 +1,225 @@
+import os
+import re
+import copy
+from file_utils import atomic_write_text
+
+# Unedited parsed models keyed by path, reused while (mtime, size) is unchanged;
+# load_config hands out copies, so one caller's edits never reach another
+_cache = {}
+
+RANGE_PATTERN = re.compile(r'From\s+(\S+)\s+to\s+(\S+)', re.IGNORECASE)
+
+
+class ConfigEntry:
+    def __init__(self, section, key, value, line_index):
+        self.section = section
+        self.key = key
+        self.value = value
+        self.original_value = value
+        self.line_index = line_index
+        self.description = []
+        self.comments = []
+        self.setting_type = None
+        self.default_value = None
+        self.acceptable_values = None
+        self.value_range = None
+        self.multiple_values = False
+
+    @property
+    def changed(self):
+        return self.value != self.original_value
+
+    def description_text(self):
+        return "\n".join(self.description)
+
+
+class ConfigSection:
+    def __init__(self, name, line_index):
+        self.name = name
+        self.line_index = line_index
+        self.entries = []
+
+
+class ConfigFile:
+    """A BepInEx .cfg file: the raw lines plus the sections and entries found in them"""
+
+    def __init__(self, path, lines, bom=False):
+        self.path = path
+        self.lines = lines
+        self.bom = bom
+        self.header = []
+        self.sections = []
+        self.mtime_ns = None
+        self.size = None
+
+    def entries(self):
+        for section in self.sections:
+            yield from section.entries
+
+    def get(self, section_name, key):
+        for entry in self.entries():
+            if entry.section == section_name and entry.key == key:
+                return entry
+        return None
+
+    def changed_entries(self):
+        return [entry for entry in self.entries() if entry.changed]
+
+    @property
+    def dirty(self):
+        return any(entry.changed for entry in self.entries())
+
+    def set_value(self, section_name, key, value):
+        entry = self.get(section_name, key)
+        if entry is None:
+            raise KeyError(f"[{section_name}] {key}")
+        entry.value = value
+
+    def copy(self):
+        """An independent model of the same file; entries are copied, their parsed metadata is shared"""
+        clone = copy.copy(self)
+        clone.lines = list(self.lines)
+        clone.sections = []
+        for section in self.sections:
+            section_copy = copy.copy(section)
+            section_copy.entries = [copy.copy(entry) for entry in section.entries]
+            clone.sections.append(section_copy)
+        return clone
+
+    def discard_changes(self):
+        for entry in self.entries():
+            entry.value = entry.original_value
+
+    def render(self):
+        """Return the file text with only the changed entry lines rewritten"""
+        lines = list(self.lines)
+        for entry in self.changed_entries():
+            lines[entry.line_index] = replace_value(lines[entry.line_index], entry.value)
+        return "".join(lines)
+
+    def save(self):
+        """Write the changed entries back to disk atomically.
+
+        If the file was modified since it was parsed, the changes are applied
+        on top of the current file contents instead of overwriting them.
+        """
+        changes = self.changed_entries()
+        if not changes:
+            return
+
+        target = self
+        if self.path and os.path.exists(self.path):
+            st = os.stat(self.path)
+            if (st.st_mtime_ns, st.st_size) != (self.mtime_ns, self.size):
+                target = read_config(self.path)
+                for entry in changes:
+                    current = target.get(entry.section, entry.key)
+                    if current is not None:
+                        current.value = entry.value
+
+        text = target.render()
+        atomic_write_text(self.path, ("\ufeff" if target.bom else "") + text)
+
+        for entry in target.changed_entries():
+            target.lines[entry.line_index] = replace_value(target.lines[entry.line_index], entry.value)
+            entry.original_value = entry.value
+        for entry in changes:
+            entry.original_value = entry.value
+        if target is not self:
+            self.lines, self.header, self.sections = target.lines, target.header, target.sections
+
+        st = os.stat(self.path)
+        self.mtime_ns, self.size = st.st_mtime_ns, st.st_size
+        # The cached model predates this save; the next load parses the new file
+        _cache.pop(os.path.abspath(self.path), None)
+
+
+def replace_value(line, value):
+    """Swap the value in a `Key = Value` line, keeping the key text and line ending"""
+    body = line.rstrip("\r\n")
+    ending = line[len(body):]
+    key_part = body.partition("=")[0]
+    return f"{key_part}= {value}{ending}"
+
+
+def parse_config(text, path=None):
+    """Parse the text of a BepInEx config file"""
+    bom = text.startswith("\ufeff")
+    if bom:
+        text = text[1:]
+    config = ConfigFile(path, text.splitlines(keepends=True), bom)
+
+    section = None
+    description = []
+    metadata = []
+
+    for index, raw in enumerate(config.lines):
+        line = raw.strip()
+
+        if not line:
+            continue
+
+        if line.startswith("[") and line.endswith("]"):
+            section = ConfigSection(line[1:-1].strip(), index)
+            config.sections.append(section)
+            description, metadata = [], []
+        elif line.startswith("##"):
+            if section is None:
+                config.header.append(line[2:].strip())
+            else:
+                description.append(line[2:].strip())
+        elif line.startswith("#"):
+            metadata.append(line[1:].strip())
+        elif "=" in line and section is not None:
+            key, _, value = line.partition("=")
+            entry = ConfigEntry(section.name, key.strip(), value.strip(), index)
+            entry.description = description
+            apply_metadata(entry, metadata)
+            section.entries.append(entry)
+            description, metadata = [], []
+
+    return config
+
+
+def apply_metadata(entry, metadata):
+    for line in metadata:
+        name, sep, value = line.partition(":")
+        name = name.strip().lower()
+        value = value.strip()
+        if sep and name == "setting type":
+            entry.setting_type = value
+        elif sep and name == "default value":
+            entry.default_value = value
+        elif sep and name == "acceptable values":
+            entry.acceptable_values = [v.strip() for v in value.split(",") if v.strip()]
+        elif sep and name == "acceptable value range":
+            match = RANGE_PATTERN.search(value)
+            if match:
+                entry.value_range = (match.group(1), match.group(2))
+        elif line.lower().startswith("multiple values can be set"):
+            entry.multiple_values = True
+        else:
+            entry.comments.append(line)
+
+
+def read_config(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        st = os.fstat(f.fileno())
+        text = f.read()
+    config = parse_config(text, path)
+    config.mtime_ns, config.size = st.st_mtime_ns, st.st_size
+    return config
+
+
+def load_config(path):
+    """Return the caller's own copy of the parsed config for path, parsing again only when the file changed"""
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    cached = _cache.get(key)
+    if cached is None or (cached.mtime_ns, cached.size) != (st.st_mtime_ns, st.st_size):
+        cached = _cache[key] = read_config(path)
+    return cached.copy()
+
+
+def invalidate(path):
+    _cache.pop(os.path.abspath(path), None)
@@ -0,0 +1,150 @@
+import os
+import re
+import bisect
+import heapq
+import threading
+import cfg_parser
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+# Matches in the key count most, then section, value and description
+FIELD_WEIGHTS = {"key": 8, "section": 4, "value": 2, "description": 1}
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchResult:
+    def __init__(self, file_name, section, key, value, score):
+        self.file_name = file_name
+        self.section = section
+        self.key = key
+        self.value = value
+        self.score = score
+
+
+class ConfigSearchIndex:
+    """Inverted index over section, key, value and description of every .cfg in a folder.
+
+    `update` only re-parses files whose (mtime, size) changed since the last
+    run, so it is cheap to call again before each search.
+    """
+
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.lock = threading.Lock()
+        self.files = {}      # file name -> ((mtime_ns, size), [doc ids], {tokens})
+        self.docs = {}       # doc id -> (file name, section, key, value)
+        self.postings = {}   # token -> {doc id: weight}
+        self.sorted_tokens = []
+        self.tokens_dirty = False
+        self.next_id = 0
+
+    def update(self):
+        """Bring the index in line with the files on disk; returns True if anything changed"""
+        seen = {}
+        try:
+            with os.scandir(self.config_path) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(".cfg"):
+                        st = entry.stat()
+                        seen[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+
+        changed = False
+        for name in list(self.files):
+            if name not in seen:
+                with self.lock:
+                    self.remove_file(name)
+                changed = True
+
+        for name, signature in seen.items():
+            if name in self.files and self.files[name][0] == signature:
+                continue
+            try:
+                config = cfg_parser.load_config(os.path.join(self.config_path, name))
+            except (OSError, UnicodeDecodeError):
+                continue
+            with self.lock:
+                self.remove_file(name)
+                self.add_file(name, signature, config)
+            changed = True
+
+        return changed
+
+    def add_file(self, name, signature, config):
+        doc_ids = []
+        tokens = set()
+        for entry in config.entries():
+            doc_id = self.next_id
+            self.next_id += 1
+            self.docs[doc_id] = (name, entry.section, entry.key, entry.original_value)
+            doc_ids.append(doc_id)
+
+            fields = {"key": entry.key, "section": entry.section,
+                      "value": entry.original_value, "description": entry.description_text()}
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    tokens.add(token)
+                    docs = self.postings.get(token)
+                    if docs is None:
+                        docs = self.postings[token] = {}
+                        self.tokens_dirty = True
+                    if docs.get(doc_id, 0) < weight:
+                        docs[doc_id] = weight
+
+        self.files[name] = (signature, doc_ids, tokens)
+
+    def remove_file(self, name):
+        if name not in self.files:
+            return
+        _, doc_ids, tokens = self.files.pop(name)
+        for doc_id in doc_ids:
+            del self.docs[doc_id]
+        for token in tokens:
+            docs = self.postings[token]
+            for doc_id in doc_ids:
+                docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[token]
+                self.tokens_dirty = True
+
+    def matching_tokens(self, prefix):
+        if self.tokens_dirty:
+            self.sorted_tokens = sorted(self.postings)
+            self.tokens_dirty = False
+        tokens = self.sorted_tokens
+        for i in range(bisect.bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            yield tokens[i]
+
+    def search(self, query, limit=50):
+        """Return entries matching every word of the query (as word prefixes), best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self.lock:
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token in self.matching_tokens(term):
+                    exact = token == term
+                    for doc_id, weight in self.postings[token].items():
+                        score = weight * 2 if exact else weight
+                        if term_scores.get(doc_id, 0) < score:
+                            term_scores[doc_id] = score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doc_id: scores[doc_id] + score
+                              for doc_id, score in term_scores.items() if doc_id in scores}
+                if not scores:
+                    return []
+
+            best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], self.docs[item[0]][:3]))
+            return [SearchResult(*self.docs[doc_id], score) for doc_id, score in best]
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import cfg_parser
+from app_data import app_data_path, game_key
+from file_utils import atomic_write_bytes, atomic_write_text
+
+
+class Snapshot:
+    def __init__(self, snapshot_id, label, created, files):
+        self.id = snapshot_id
+        self.label = label
+        self.created = created
+        self.files = files  # file name -> {"sha": ..., "size": ..., "mtime_ns": ...}
+
+    def to_json(self):
+        return {"id": self.id, "label": self.label, "created": self.created, "files": self.files}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["id"], data.get("label", ""), data["created"], data["files"])
+
+
+class FileDiff:
+    def __init__(self, file_name, status):
+        self.file_name = file_name
+        self.status = status  # "added", "removed" or "changed"
+        self.entries = []     # (section, key, old value, new value); None for a missing side
+
+
+class SnapshotStore:
+    """Config snapshots of one game, backed by a shared content-addressed blob store.
+
+    Blobs are zlib-compressed file contents named by their SHA-256, so a file
+    that is identical in many snapshots (or many games) is stored once.
+    """
+
+    def __init__(self, game_path, root=None):
+        self.game_path = game_path
+        self.config_path = os.path.join(game_path, "BepInEx", "config")
+        self.root = root or os.path.dirname(app_data_path("snapshots", "blobs"))
+        self.blob_dir = os.path.join(self.root, "blobs")
+        self.snapshot_dir = os.path.join(self.root, "games", game_key(game_path))
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    # Blobs
+
+    def blob_path(self, sha):
+        return os.path.join(self.blob_dir, sha[:2], sha)
+
+    def put_blob(self, data):
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_bytes(path, zlib.compress(data, 9))
+        return sha
+
+    def get_blob(self, sha):
+        with open(self.blob_path(sha), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # Snapshots
+
+    def list_snapshots(self):
+        """All snapshots of this game, newest first"""
+        snapshots = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.snapshot_dir, name), 'r', encoding='utf-8') as f:
+                        snapshots.append(Snapshot.from_json(json.load(f)))
+                except (OSError, ValueError, KeyError):
+                    pass
+        snapshots.sort(key=lambda s: s.created, reverse=True)
+        return snapshots
+
+    def get_snapshot(self, snapshot_id):
+        with open(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"), 'r', encoding='utf-8') as f:
+            return Snapshot.from_json(json.load(f))
+
+    def scan_config(self, previous=None, store=True):
+        """Return {file name: {sha, size, mtime_ns}} for the current config folder.
+
+        Files whose size and mtime match `previous` reuse its hash instead of
+        being read again.  With store=False the contents are only hashed.
+        """
+        previous = previous or {}
+        files = {}
+        if not os.path.isdir(self.config_path):
+            return files
+        with os.scandir(self.config_path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                known = previous.get(entry.name)
+                if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                    files[entry.name] = dict(known)
+                    continue
+                with open(entry.path, 'rb') as f:
+                    data = f.read()
+                sha = self.put_blob(data) if store else hashlib.sha256(data).hexdigest()
+                files[entry.name] = {"sha": sha, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        return files
+
+    def create_snapshot(self, label=""):
+        snapshots = self.list_snapshots()
+        previous = snapshots[0].files if snapshots else None
+        files = self.scan_config(previous)
+        created = time.time()
+        snapshot_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(created)) + f"-{int(created * 1000) % 1000:03d}"
+        snapshot = Snapshot(snapshot_id, label, created, files)
+        atomic_write_text(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"),
+                          json.dumps(snapshot.to_json(), separators=(",", ":")))
+        return snapshot
+
+    def delete_snapshot(self, snapshot_id):
+        os.remove(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"))
+
+    def collect_garbage(self):
+        """Remove blobs no snapshot of any game refers to; returns bytes freed"""
+        referenced = set()
+        games_dir = os.path.join(self.root, "games")
+        for game in os.listdir(games_dir):
+            game_dir = os.path.join(games_dir, game)
+            for name in os.listdir(game_dir):
+                if name.endswith(".json"):
+                    try:
+                        with open(os.path.join(game_dir, name), 'r', encoding='utf-8') as f:
+                            referenced.update(info["sha"] for info in json.load(f)["files"].values())
+                    except (OSError, ValueError, KeyError):
+                        # Keep everything if a manifest can't be read
+                        return 0
+
+        freed = 0
+        if not os.path.isdir(self.blob_dir):
+            return freed
+        for prefix in os.listdir(self.blob_dir):
+            prefix_dir = os.path.join(self.blob_dir, prefix)
+            for sha in os.listdir(prefix_dir):
+                if sha not in referenced:
+                    path = os.path.join(prefix_dir, sha)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+    # Diff and restore
+
+    def file_text(self, files, name):
+        if files is None:
+            with open(os.path.join(self.config_path, name), 'rb') as f:
+                data = f.read()
+        else:
+            data = self.get_blob(files[name]["sha"])
+        return data.decode('utf-8', errors='replace')
+
+    def diff(self, old_id, new_id=None):
+        """Per-entry differences between two snapshots; new_id=None compares with the config on disk"""
+        old_files = self.get_snapshot(old_id).files
+        new_files = self.get_snapshot(new_id).files if new_id else self.scan_config(old_files, store=False)
+
+        diffs = []
+        for name in sorted(old_files.keys() | new_files.keys(), key=str.lower):
+            old, new = old_files.get(name), new_files.get(name)
+            if old and new and old["sha"] == new["sha"]:
+                continue
+            status = "changed" if old and new else ("added" if new else "removed")
+            file_diff = FileDiff(name, status)
+            if name.endswith(".cfg"):
+                old_values = self.entry_values(old_files, name) if old else {}
+                new_values = self.entry_values(new_files if new_id else None, name) if new else {}
+                for section, key in sorted(old_values.keys() | new_values.keys()):
+                    old_value = old_values.get((section, key))
+                    new_value = new_values.get((section, key))
+                    if old_value != new_value:
+                        file_diff.entries.append((section, key, old_value, new_value))
+            diffs.append(file_diff)
+        return diffs
+
+    def entry_values(self, files, name):
+        config = cfg_parser.parse_config(self.file_text(files, name))
+        return {(entry.section, entry.key): entry.value for entry in config.entries()}
+
+    def restore(self, snapshot_id, remove_extra=False):
+        """Write back only the files that differ from the snapshot; returns the names written"""
+        snapshot = self.get_snapshot(snapshot_id)
+        current = self.scan_config(snapshot.files, store=False)
+        os.makedirs(self.config_path, exist_ok=True)
+
+        written = []
+        for name, info in snapshot.files.items():
+            if current.get(name, {}).get("sha") == info["sha"]:
+                continue
+            atomic_write_bytes(os.path.join(self.config_path, name), self.get_blob(info["sha"]))
+            written.append(name)
+
+        if remove_extra:
+            for name in current.keys() - snapshot.files.keys():
+                os.remove(os.path.join(self.config_path, name))
+                written.append(name)
+        return written
@@ -0,0 +1,717 @@
+"""Headless agent: the manager's game, install, plugin and config operations over HTTP/JSON.
+
+    python daemon.py serve [--bind 127.0.0.1] [--port 8731] [--token TOKEN]
+    python daemon.py call METHOD PATH [--body JSON] [--hosts host:port,...] [--token TOKEN] [--wait]
+
+Reads are answered directly.  Anything that changes a game is queued as a
+job and answered with 202 and the job; jobs on the same game run one at a
+time, jobs on different games run side by side.
+
+    GET  /status
+    GET  /games                                   last scan plus the games added by hand
+    POST /games/scan                              find Unity games again
+    POST /install   {"game_path"}                 download the latest BepInEx and install it
+    POST /upgrade   {"game_path", "community"}    update the installed packages to the index's versions
+    POST /packages/install {"game_path", "community", "packages": ["Owner-Name", ...]}
+    GET  /plugins?game_path=...
+    POST /plugins/import {"game_path", "name", "files": [<path on the agent> | {"name", "data": <base64>}]}
+    POST /plugins/toggle {"game_path", "folder", "file", "enabled"}
+    GET  /config?game_path=...[&file=BepInEx.cfg]
+    POST /config {"game_path", "config": {"<file>": {"<section>": {"<key>": "<value>"}}}}
+    POST /bulk   {"operations": [{"path": "/install", "body": {...}, "games": [...]}, ...]}
+    GET  /jobs, GET /jobs/<id>
+    GET  /jobs/<id>/events                        NDJSON: the job on every change until it ended
+
+"games" in a bulk operation runs it once per game path.  Every request
+needs the agent's token as "Authorization: Bearer <token>"; without
+--token the agent generates one on first run and keeps it in the app data
+folder, where "call" reads it too.  Requests from browsers are refused: a
+POST body must be application/json, an Origin header is rejected, and on a
+loopback address the Host must be localhost.  "call" sends one request to
+every host at once and prints one JSON line per host (and per job event
+with --wait).
+"""
+import os
+import sys
+import json
+import hmac
+import time
+import uuid
+import shutil
+import base64
+import secrets
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import requests
+from PyQt5.QtCore import Qt
+from game_finder import GameFinder
+from game_cache import load_cached_games, load_manual_games, save_cached_games, save_plugins
+from download import BepInExDownloader, extract_bepinex
+from async_runtime import get_runtime, shutdown_runtime
+from integrity import record_install
+from package_source import Catalog, index_url, install_packages, installed_versions
+from plugin_files import plugin_folders, folder_records, set_plugin_enabled, import_plugin_files
+from dedupe import PluginStore
+from cache_manager import CacheManager, manifest_lock
+from cfg_parser import read_config
+from modpack import ApplyResult, apply_config
+from settings import get_setting
+from state_store import path_key
+from transfer_scheduler import get_scheduler
+from app_data import app_data_path
+
+DEFAULT_PORT = 8731
+JOB_WORKERS = 4
+# Finished jobs kept for GET /jobs
+KEPT_JOBS = 500
+# Seconds between repeated events of an unchanged job, so dead streams are noticed
+KEEPALIVE_SECONDS = 15
+ENDED_STATES = ("done", "failed")
+TOKEN_FILE = "agent_token"
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+class DaemonError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class DaemonJob:
+    """One queued operation; every change wakes the event streams following it"""
+
+    def __init__(self, operation, body):
+        self.id = uuid.uuid4().hex[:12]
+        self.operation = operation
+        self.body = body
+        self.state = "queued"
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def update(self, **changes):
+        with self.condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.condition.notify_all()
+
+    def report(self, progress):
+        self.update(progress=progress)
+
+    def to_dict(self):
+        return {"id": self.id, "operation": self.operation, "game_path": self.body.get("game_path"),
+                "state": self.state, "progress": self.progress, "result": self.result, "error": self.error,
+                "created": self.created, "finished": self.finished}
+
+    def events(self):
+        """The job as a dict now and after every change, ending with its final state"""
+        seen = None
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.version != seen, KEEPALIVE_SECONDS)
+                seen = self.version
+                event = self.to_dict()
+            yield event
+            if event["state"] in ENDED_STATES:
+                return
+
+
+class JobQueue:
+    """Runs jobs on a few worker threads, one game at a time per game.
+
+    Each game has its own FIFO; a worker drains one game's queue, so jobs
+    waiting for a busy game don't hold a worker other games could use.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="daemon-job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # game key -> jobs not started yet; a key is present while a worker drains it
+        self.game_queues = {}
+
+    def submit(self, operation, body):
+        job = DaemonJob(operation, body)
+        game_path = body.get("game_path")
+        key = path_key(game_path) if game_path else None
+        with self.lock:
+            self.jobs[job.id] = job
+            self.prune()
+            idle = key not in self.game_queues
+            self.game_queues.setdefault(key, deque()).append(job)
+        if idle:
+            self.executor.submit(self.drain, key)
+        return job
+
+    def prune(self):
+        ended = [job_id for job_id, job in self.jobs.items() if job.state in ENDED_STATES]
+        for job_id in ended[:max(0, len(self.jobs) - KEPT_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise DaemonError(f"No job {job_id}", 404)
+        return job
+
+    def all(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def drain(self, key):
+        while True:
+            with self.lock:
+                queue = self.game_queues[key]
+                if not queue:
+                    del self.game_queues[key]
+                    return
+                job = queue.popleft()
+            self.run(job)
+
+    def run(self, job):
+        job.update(state="running")
+        try:
+            result = OPERATIONS[job.operation][0](job, job.body)
+        except Exception as e:
+            job.update(state="failed", error=str(e), finished=time.time())
+        else:
+            job.update(state="done", result=result, finished=time.time())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def plain_name(value, what):
+    """A single file or folder name, never a path"""
+    if not isinstance(value, str) or not value or value in (".", "..") or \
+            os.path.basename(value) != value or "/" in value or "\\" in value:
+        raise DaemonError(f"Invalid {what}: {value!r}")
+    return value
+
+
+def plugins_path(game_path):
+    return os.path.join(game_path, "BepInEx", "plugins")
+
+
+def plugins_changed(game_path, folders):
+    """What PluginManager.refresh_folders does besides redrawing: record the files, drop stale cache entries.
+
+    folders=None stands for every plugin folder, like PluginManager.load_plugins.
+    """
+    names = folders
+    if names is None:
+        names = [name for name, files in plugin_folders(plugins_path(game_path))]
+    records = []
+    for folder in names:
+        records += folder_records(plugins_path(game_path), folder)
+    save_plugins(game_path, folders, records)
+    with manifest_lock(game_path):
+        CacheManager(game_path).invalidate(["plugins"] if folders is None else [f"plugins/{name}" for name in folders])
+
+
+def run_on_runtime(job, coroutine_function, *args, step=None):
+    """Run a runtime coroutine from a job thread, passing its progress on to the daemon job"""
+    runtime_job = get_runtime().job(coroutine_function, *args)
+    # No Qt event loop here, so deliver progress on the runtime thread
+    runtime_job.progress.connect(lambda progress: job.report({"step": step, "progress": progress}), Qt.DirectConnection)
+    return runtime_job.start().future.result()
+
+
+def scan_games(job, body):
+    games = {}
+    for name, info in GameFinder().iter_unity_games():
+        games[name] = info
+        job.report({"step": "scan", "found": len(games), "game": name})
+    save_cached_games(games)
+    return games
+
+
+def install_bepinex(job, body):
+    game_path = body["game_path"]
+    zip_path = run_on_runtime(job, BepInExDownloader().fetch_latest, step="download")
+    job.report({"step": "extract"})
+    extract_bepinex(zip_path, game_path)
+    # The archive stays cached for verify and repair
+    record_install(game_path, zip_path)
+    return {"archive": os.path.basename(zip_path)}
+
+
+def package_catalog(job, body):
+    """The game's package index, refreshed first; the community defaults to the one picked in the Packages tab"""
+    community = body.get("community") or get_setting("package_communities", {}).get(path_key(body["game_path"]))
+    catalog = Catalog(index_url(community))
+    catalog.update(lambda count: job.report({"step": "index", "packages": count}))
+    return catalog
+
+
+def report_dict(report):
+    return {"installed": report.installed, "skipped": report.skipped, "missing": report.missing,
+            "errors": report.errors}
+
+
+def upgrade_packages(job, body):
+    game_path = body["game_path"]
+    catalog = package_catalog(job, body)
+    outdated = []
+    for full_name, version in installed_versions(game_path).items():
+        package = catalog.package(full_name)
+        if package is not None and package[1] != version:
+            outdated.append(full_name)
+    report = install_packages(game_path, catalog, outdated,
+                              progress=lambda name: job.report({"step": "install", "package": name}))
+    plugins_changed(game_path, None)
+    return report_dict(report)
+
+
+def install_package_list(job, body):
+    game_path = body["game_path"]
+    full_names = body.get("packages")
+    if not isinstance(full_names, list) or not full_names:
+        raise DaemonError("packages must be a non-empty list")
+    report = install_packages(game_path, package_catalog(job, body), full_names,
+                              progress=lambda name: job.report({"step": "install", "package": name}))
+    plugins_changed(game_path, None)
+    return report_dict(report)
+
+
+def import_plugins(job, body):
+    game_path = body["game_path"]
+    name = plain_name(body.get("name"), "plugin name")
+    temp_dir = tempfile.mkdtemp(prefix="bepinex_daemon_")
+    try:
+        files = []
+        for entry in body.get("files") or []:
+            if isinstance(entry, str):
+                files.append(entry)
+                continue
+            if not isinstance(entry, dict):
+                raise DaemonError("files must be paths or {\"name\", \"data\"} objects")
+            # Uploaded by the controller
+            file_path = os.path.join(temp_dir, plain_name(entry.get("name"), "file name"))
+            with open(file_path, 'wb') as f:
+                f.write(base64.b64decode(entry.get("data", "")))
+            files.append(file_path)
+        store = PluginStore()
+        dll_count, warnings = import_plugin_files(plugins_path(game_path), name, files, store)
+        store.save()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    plugins_changed(game_path, [name])
+    return {"installed": dll_count, "warnings": warnings}
+
+
+def toggle_plugin(job, body):
+    game_path = body["game_path"]
+    folder = plain_name(body.get("folder"), "folder")
+    path = os.path.join(plugins_path(game_path), folder, plain_name(body.get("file"), "file"))
+    if not os.path.isfile(path):
+        raise DaemonError(f"No plugin file {path}", 404)
+    new_path = set_plugin_enabled(path, bool(body.get("enabled")))
+    plugins_changed(game_path, [folder])
+    return {"file": os.path.basename(new_path), "enabled": new_path.endswith(".dll")}
+
+
+def apply_config_values(job, body):
+    overrides = body.get("config")
+    check_config(overrides)
+    config_path = os.path.join(body["game_path"], "BepInEx", "config")
+    missing = [file_name for file_name in overrides if not os.path.isfile(os.path.join(config_path, file_name))]
+    result = ApplyResult()
+    apply_config(config_path, overrides, result)
+    # BepInEx and plugins write their config on first run, so a missing file isn't an error
+    return {"changed": result.config_changes, "missing_files": missing}
+
+
+# Queued operations: path -> (function, required body fields)
+OPERATIONS = {
+    "/games/scan": (scan_games, ()),
+    "/install": (install_bepinex, ("game_path",)),
+    "/upgrade": (upgrade_packages, ("game_path",)),
+    "/packages/install": (install_package_list, ("game_path", "packages")),
+    "/plugins/import": (import_plugins, ("game_path", "name", "files")),
+    "/plugins/toggle": (toggle_plugin, ("game_path", "folder", "file", "enabled")),
+    "/config": (apply_config_values, ("game_path", "config")),
+}
+
+
+def check_operation(path, body):
+    if path not in OPERATIONS:
+        raise DaemonError(f"Unknown operation {path}", 404)
+    if not isinstance(body, dict):
+        raise DaemonError("The request body must be a JSON object")
+    for field in OPERATIONS[path][1]:
+        if field not in body:
+            raise DaemonError(f"{path} needs {field}")
+    for field in ("name", "folder", "file"):
+        if field in body:
+            plain_name(body[field], field)
+    if "files" in body and (not isinstance(body["files"], list) or
+                            not all(isinstance(entry, (str, dict)) for entry in body["files"])):
+        raise DaemonError("files must be a list of paths or {\"name\", \"data\"} objects")
+    if "config" in body:
+        check_config(body["config"])
+    if "game_path" in body and not os.path.isdir(str(body["game_path"])):
+        raise DaemonError(f"No game folder {body['game_path']}", 404)
+
+
+def check_config(overrides):
+    """{file: {section: {key: value}}} with plain file names and string values"""
+    if not isinstance(overrides, dict):
+        raise DaemonError("config must be {file: {section: {key: value}}}")
+    for file_name, sections in overrides.items():
+        plain_name(file_name, "config file")
+        if not isinstance(sections, dict) or not all(
+                isinstance(values, dict) and all(isinstance(value, str) for value in values.values())
+                for values in sections.values()):
+            raise DaemonError(f"config of {file_name} must be {{section: {{key: \"value\"}}}}")
+
+
+class Agent:
+    """Answers the API requests of one machine"""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.queue = JobQueue(workers)
+        self.started = time.time()
+
+    def handle(self, method, path, query, body):
+        """(HTTP status, JSON payload) of a request"""
+        if method == "GET":
+            if path == "/status":
+                jobs = self.queue.all()
+                return 200, {"uptime": time.time() - self.started, "pid": os.getpid(),
+                             "jobs": {state: sum(job.state == state for job in jobs)
+                                      for state in ("queued", "running", "done", "failed")},
+                             "transfers": get_scheduler().snapshot()}
+            if path == "/games":
+                return 200, {"scanned": load_cached_games(), "manual": list(load_manual_games().values())}
+            if path == "/plugins":
+                game_path = self.game_path(query)
+                return 200, {"plugins": [{"folder": folder, "files": [{"file": f, "enabled": enabled}
+                                                                      for f, enabled in files]}
+                                         for folder, files in plugin_folders(plugins_path(game_path))]}
+            if path == "/config":
+                return 200, self.config(self.game_path(query), query.get("file"))
+            if path == "/jobs":
+                return 200, {"jobs": [job.to_dict() for job in self.queue.all()]}
+            if path.startswith("/jobs/"):
+                return 200, self.queue.get(path[len("/jobs/"):]).to_dict()
+        elif method == "POST":
+            if path == "/bulk":
+                return 202, {"jobs": [job.to_dict() for job in self.bulk(body)]}
+            check_operation(path, body)
+            return 202, self.queue.submit(path, body).to_dict()
+        raise DaemonError(f"No such endpoint: {method} {path}", 404)
+
+    def game_path(self, query):
+        game_path = query.get("game_path")
+        if not game_path or not os.path.isdir(game_path):
+            raise DaemonError(f"No game folder {game_path}", 404)
+        return game_path
+
+    def config(self, game_path, file_name):
+        config_path = os.path.join(game_path, "BepInEx", "config")
+        if not file_name:
+            try:
+                return {"files": sorted(f for f in os.listdir(config_path) if f.endswith(".cfg"))}
+            except OSError:
+                return {"files": []}
+        path = os.path.join(config_path, plain_name(file_name, "config file"))
+        if not os.path.isfile(path):
+            raise DaemonError(f"No config file {file_name}", 404)
+        sections = {}
+        for entry in read_config(path).entries():
+            sections.setdefault(entry.section, {})[entry.key] = {
+                "value": entry.value, "default": entry.default_value, "type": entry.setting_type,
+                "acceptable_values": entry.acceptable_values, "range": entry.value_range,
+            }
+        return {"file": file_name, "sections": sections}
+
+    def bulk(self, body):
+        operations = body.get("operations") if isinstance(body, dict) else None
+        if not isinstance(operations, list):
+            raise DaemonError("bulk needs a list of operations")
+        # Check everything before queuing anything, so a typo doesn't leave half a batch running
+        queued = []
+        for operation in operations:
+            if not isinstance(operation, dict):
+                raise DaemonError("Every bulk operation must be a JSON object")
+            path, operation_body, games = operation.get("path"), operation.get("body") or {}, operation.get("games")
+            if not isinstance(operation_body, dict):
+                raise DaemonError(f"The body of {path} must be a JSON object")
+            if games is not None and not isinstance(games, list):
+                raise DaemonError(f"games of {path} must be a list of game paths")
+            for game_path in games or [operation_body.get("game_path")]:
+                game_body = dict(operation_body)
+                if game_path is not None:
+                    game_body["game_path"] = game_path
+                check_operation(path, game_body)
+                queued.append((path, game_body))
+        return [self.queue.submit(path, game_body) for path, game_body in queued]
+
+    def job_events(self, path):
+        """The job behind /jobs/<id>/events"""
+        return self.queue.get(path[len("/jobs/"):-len("/events")]).events()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "BepInExManagerAgent/1"
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            self.check_client()
+            self.check_token()
+            body = self.read_body() if method == "POST" else {}
+            if method == "GET" and url.path.startswith("/jobs/") and url.path.endswith("/events"):
+                self.stream(self.server.agent.job_events(url.path))
+                return
+            status, payload = self.server.agent.handle(method, url.path, query, body)
+        except DaemonError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        self.send_json(status, payload)
+
+    def check_client(self):
+        """Refuse browsers: a web page can send requests here, but only with an Origin header
+        (cross-origin) or through a rebound DNS name (a foreign Host)"""
+        if self.headers.get("Origin") is not None:
+            raise DaemonError("Requests from web pages are not accepted", 403)
+        if self.server.local and host_name(self.headers.get("Host", "")) not in LOCAL_HOSTS:
+            raise DaemonError("Host must be localhost", 403)
+
+    def check_token(self):
+        if not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {self.server.token}"):
+            raise DaemonError("Missing or wrong token", 401)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise DaemonError("Invalid Content-Length")
+        content_type = self.headers.get("Content-Type")
+        if (length or content_type is not None) and \
+                (content_type or "").split(";")[0].strip().lower() != "application/json":
+            raise DaemonError("The request body must be application/json", 415)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError as e:
+            raise DaemonError(f"Invalid JSON: {str(e)}")
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def stream(self, events):
+        """NDJSON in chunked encoding, one line per event"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in events:
+                line = (json.dumps(event) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AgentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, agent, token, verbose=False):
+        super().__init__(address, RequestHandler)
+        self.agent = agent
+        self.token = token
+        self.verbose = verbose
+        # Only reachable through localhost, so any other Host is a rebound DNS name
+        self.local = is_loopback(address[0])
+
+
+def is_loopback(host):
+    return host in ("localhost", "::1") or host.startswith("127.")
+
+
+def host_name(host):
+    """The name of a Host header without its port ("[::1]:8731" -> "::1")"""
+    if host.startswith("["):
+        return host[1:host.find("]")].lower()
+    return host.rsplit(":", 1)[0].lower()
+
+
+def agent_token():
+    """The token in the app data folder, generated on first use; readable by the user only"""
+    path = app_data_path(TOKEN_FILE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+        if not token:
+            raise DaemonError(f"The agent token file {path} is empty; delete it to generate a new token")
+        return token
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+class Controller:
+    """Send the same request to many agents at once"""
+
+    def __init__(self, hosts, token=None, timeout=30, workers=32):
+        self.hosts = [host if ":" in host else f"{host}:{DEFAULT_PORT}" for host in hosts]
+        self.timeout = timeout
+        self.executor_workers = workers
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def request(self, host, method, path, body=None):
+        """(status, payload) from one agent; status is None when it couldn't be reached"""
+        try:
+            response = self.session.request(method, f"http://{host}{path}", json=body, timeout=self.timeout)
+            return response.status_code, response.json()
+        except (requests.RequestException, ValueError) as e:
+            return None, {"error": str(e)}
+
+    def fan_out(self, method, path, body=None):
+        """{host: (status, payload)} with every agent asked concurrently"""
+        with ThreadPoolExecutor(max_workers=min(self.executor_workers, len(self.hosts) or 1)) as executor:
+            results = executor.map(lambda host: self.request(host, method, path, body), self.hosts)
+            return dict(zip(self.hosts, results))
+
+    def follow(self, host, job_id):
+        """The events of a job on one agent, until it ended"""
+        with self.session.get(f"http://{host}/jobs/{job_id}/events", stream=True,
+                              timeout=(self.timeout, KEEPALIVE_SECONDS * 4)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def wait(self, host_jobs, on_event=None):
+        """Follow (host, job id) pairs concurrently; returns {(host, job id): final job}"""
+        def follow_one(host_job):
+            final = None
+            try:
+                for event in self.follow(*host_job):
+                    final = event
+                    if on_event:
+                        on_event(host_job[0], event)
+            except (requests.RequestException, ValueError) as e:
+                final = {"id": host_job[1], "state": "failed", "error": str(e)}
+            return host_job, final
+
+        with ThreadPoolExecutor(max_workers=min(self.executor_workers, len(host_jobs) or 1)) as executor:
+            return dict(executor.map(follow_one, host_jobs))
+
+
+def serve(bind, port, token=None, workers=JOB_WORKERS, verbose=False):
+    token = token or agent_token()
+    agent = Agent(workers)
+    server = AgentServer((bind, port), agent, token, verbose)
+    print(f"Listening on http://{bind}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        agent.queue.shutdown()
+        shutdown_runtime()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage BepInEx installs headlessly over a local HTTP API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the agent")
+    serve_parser.add_argument("--bind", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--token", default=os.environ.get("BEPINEX_AGENT_TOKEN"),
+                              help="required from clients; defaults to the one in the app data folder")
+    serve_parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    serve_parser.add_argument("--verbose", action="store_true", help="log every request")
+    call_parser = commands.add_parser("call", help="send one request to one or more agents")
+    call_parser.add_argument("method", choices=["GET", "POST"], type=str.upper)
+    call_parser.add_argument("path")
+    call_parser.add_argument("--body", help="JSON request body")
+    call_parser.add_argument("--hosts", default=f"127.0.0.1:{DEFAULT_PORT}", help="comma separated host[:port] list")
+    call_parser.add_argument("--token", default=os.environ.get("BEPINEX_AGENT_TOKEN"),
+                             help="defaults to this machine's agent token")
+    call_parser.add_argument("--wait", action="store_true", help="follow the queued jobs until they end")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            serve(args.bind, args.port, args.token, args.workers, args.verbose)
+        except (OSError, DaemonError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 1
+        return 0
+
+    try:
+        body = json.loads(args.body) if args.body else None
+    except ValueError as e:
+        print(f"Error: invalid --body: {str(e)}", file=sys.stderr)
+        return 1
+    try:
+        token = args.token or agent_token()
+    except (OSError, DaemonError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    controller = Controller([host.strip() for host in args.hosts.split(",") if host.strip()], token)
+    failed = False
+    host_jobs = []
+    for host, (status, payload) in controller.fan_out(args.method, args.path, body).items():
+        print(json.dumps({"host": host, "status": status, "response": payload}), flush=True)
+        failed = failed or status is None or status >= 400
+        if status == 202:
+            host_jobs += [(host, job["id"]) for job in payload.get("jobs", [payload])]
+    if args.wait and host_jobs:
+        print_lock = threading.Lock()
+
+        def print_event(host, event):
+            with print_lock:
+                print(json.dumps({"host": host, "event": event}), flush=True)
+
+        for final in controller.wait(host_jobs, print_event).values():
+            failed = failed or final is None or final.get("state") != "done"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
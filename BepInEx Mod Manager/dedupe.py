@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from integrity import HashCache, hash_file
+from disk_usage import format_size
+from transfer_scheduler import get_scheduler, BACKGROUND
+
+PLUGIN_SUFFIXES = ('.dll', '.dll.bak')
+
+
+def link_into_place(source, target):
+    """Hardlink source at target, replacing whatever is there in one rename"""
+    directory = os.path.dirname(os.path.abspath(target))
+    temp_path = os.path.join(directory, f".link_{os.getpid()}_{threading.get_ident()}_{os.path.basename(target)}")
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    os.link(source, temp_path)
+    try:
+        os.replace(temp_path, target)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+
+def copy_into_place(source, target):
+    """Copy through a temp file so an existing hardlink at target is replaced, not written through"""
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    os.close(fd)
+    try:
+        shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class PluginStore:
+    """Content-hash index of plugin files so identical copies can share one file on disk.
+
+    Every hashed copy is looked up by sha256 in the hash cache.  Copies on the same volume are
+    linked together; the manager never writes through a link (every write
+    goes through a temp file and a rename, see copy_into_place), so changing
+    one game's copy breaks the link instead of changing the other games.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or HashCache()
+
+    def save(self):
+        self.cache.save()
+
+    def copy_on_device(self, sha256, device):
+        """A known, still identical copy of a file on the given volume"""
+        for path in self.cache.paths_with_hash(sha256):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if st.st_dev == device and self.cache.get(path, st) == sha256:
+                return path
+        return None
+
+    def import_file(self, source, target):
+        """Put source at target, linking to an identical copy on the same volume when there is one"""
+        sha256 = self.cache.hash(source)
+        device = os.stat(os.path.dirname(os.path.abspath(target))).st_dev
+        existing = self.copy_on_device(sha256, device)
+        if existing is not None and os.path.abspath(existing) != os.path.abspath(target):
+            try:
+                link_into_place(existing, target)
+                self.cache.put(target, os.stat(target), sha256)
+                return True
+            except OSError:
+                pass
+        copy_into_place(source, target)
+        self.cache.put(target, os.stat(target), sha256)
+        return False
+
+
+class DedupeReport:
+    def __init__(self):
+        self.files = 0
+        self.linked = 0
+        self.reclaimed = 0
+        self.errors = []
+
+    def summary(self):
+        text = (f"Scanned {self.files} plugin file(s), linked {self.linked} duplicate(s), "
+                f"reclaimed {format_size(self.reclaimed)}")
+        if self.errors:
+            text += f", {len(self.errors)} file(s) could not be linked"
+        return text
+
+
+def plugin_files(game_path):
+    for folder in ("plugins", "patchers"):
+        root = os.path.join(game_path, "BepInEx", folder)
+        for dirpath, dirnames, filenames in os.walk(root):
+            for file_name in filenames:
+                if file_name.lower().endswith(PLUGIN_SUFFIXES):
+                    yield os.path.join(dirpath, file_name)
+
+
+def deduplicate(game_paths, store=None, workers=None):
+    """Replace byte-identical plugin files on the same volume with hardlinks to one copy; a background disk job"""
+    with get_scheduler().disk_job("Deduplicate plugins", BACKGROUND) as ticket:
+        return deduplicate_files(game_paths, store or PluginStore(), workers, ticket)
+
+
+def deduplicate_files(game_paths, store, workers, ticket):
+    report = DedupeReport()
+    paths = [path for game_path in game_paths for path in plugin_files(game_path)]
+    report.files = len(paths)
+
+    def identify(path):
+        try:
+            st = os.stat(path)
+            sha256 = store.cache.get(path, st)
+            if sha256 is None:
+                ticket.throttle(st.st_size)
+                sha256 = hash_file(path)
+                store.cache.put(path, st, sha256)
+            return path, st, sha256
+        except OSError as e:
+            return path, None, str(e)
+
+    groups = {}
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 2)) as executor:
+        for path, st, sha256 in executor.map(identify, paths):
+            if st is None:
+                report.errors.append(f"{path}: {sha256}")
+                continue
+            groups.setdefault((st.st_dev, sha256), []).append((path, st))
+
+    for (device, keep_sha), copies in groups.items():
+        if len(copies) < 2:
+            continue
+        # Link everything to the copy that already has the most links
+        copies.sort(key=lambda copy: copy[1].st_nlink, reverse=True)
+        keep_path, keep_st = copies[0]
+        for path, st in copies[1:]:
+            if st.st_ino == keep_st.st_ino:
+                continue
+            try:
+                link_into_place(keep_path, path)
+            except OSError as e:
+                report.errors.append(f"{path}: {str(e)}")
+                continue
+            report.linked += 1
+            store.cache.put(path, os.stat(path), keep_sha)
+            # The space only comes back when the last link to the old file goes
+            if st.st_nlink == 1:
+                report.reclaimed += st.st_size
+
+    store.save()
+    return report
+
+
+class DedupeThread(QThread):
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_paths, parent=None):
+        super().__init__(parent)
+        self.game_paths = list(game_paths)
+
+    def run(self):
+        try:
+            self.done.emit(deduplicate(self.game_paths))
+        except Exception as e:
+            self.failed.emit(str(e))
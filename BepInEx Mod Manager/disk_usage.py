@@ -0,0 +1,178 @@
+import os
+import json
+import sqlite3
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+from state_store import get_store
+
+# Files rewritten in place, which doesn't change their folder's mtime, always re-stat'ed:
+# logs, the BepInEx cache files and configs
+VOLATILE_SUFFIXES = ('.log', '.dat', '.cfg')
+LOG_SUFFIXES = ('.log',)
+
+COMPONENTS = ["core", "plugins", "patchers", "config", "cache", "logs", "other", "trash"]
+
+
+def format_size(size):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class UsageCache:
+    """Folder sizes keyed by folder mtime.
+
+    Adding, removing or renaming an entry changes its folder's mtime, so a
+    folder whose mtime is unchanged only needs its subfolders checked; its own
+    files are not listed again.  Files ending in VOLATILE_SUFFIXES (logs, cache
+    files and configs change in place) are re-stat'ed every time.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = set()
+        for path, mtime_ns, size, dirs, volatile in self.store.query(
+                "SELECT path, mtime_ns, size, dirs, volatile FROM folder_usage"):
+            self.entries[path] = {"mtime_ns": mtime_ns, "size": size,
+                                  "dirs": json.loads(dirs), "volatile": json.loads(volatile)}
+
+    def scan_folder(self, path):
+        """Return (size of the folder's own files, subfolder names, volatile file names)"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return 0, [], []
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry["mtime_ns"] == mtime_ns:
+            return entry["size"], entry["dirs"], entry["volatile"]
+
+        size, dirs, volatile = 0, [], []
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            dirs.append(item.name)
+                        elif item.name.lower().endswith(VOLATILE_SUFFIXES):
+                            volatile.append(item.name)
+                        else:
+                            size += item.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            return 0, [], []
+        with self.lock:
+            self.entries[path] = {"mtime_ns": mtime_ns, "size": size, "dirs": dirs, "volatile": volatile}
+            self.dirty.add(path)
+        return size, dirs, volatile
+
+    def tree_size(self, path):
+        size, dirs, volatile = self.scan_folder(path)
+        size += volatile_size(path, volatile)
+        for name in dirs:
+            size += self.tree_size(os.path.join(path, name))
+        return size
+
+    def save(self):
+        with self.lock:
+            rows = [(path, self.entries[path]["mtime_ns"], self.entries[path]["size"],
+                     json.dumps(self.entries[path]["dirs"]), json.dumps(self.entries[path]["volatile"]))
+                    for path in self.dirty]
+            self.dirty = set()
+        try:
+            self.store.execute_many("INSERT OR REPLACE INTO folder_usage (path, mtime_ns, size, dirs, volatile) "
+                                    "VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"Failed to save disk usage cache: {str(e)}")
+
+
+def volatile_size(path, names):
+    size = 0
+    for name in names:
+        try:
+            size += os.stat(os.path.join(path, name)).st_size
+        except OSError:
+            pass
+    return size
+
+
+class UsageReport:
+    def __init__(self, game_path):
+        self.game_path = game_path
+        self.components = dict.fromkeys(COMPONENTS, 0)
+        self.plugins = {}
+
+    @property
+    def total(self):
+        """Size of the BepInEx install, without trashed copies waiting to be deleted"""
+        return sum(size for name, size in self.components.items() if name != "trash")
+
+
+def measure(game_path, cache):
+    report = UsageReport(game_path)
+    bepinex_path = os.path.join(game_path, "BepInEx")
+    size, dirs, volatile = cache.scan_folder(bepinex_path)
+    report.components["other"] += size
+    logs = [name for name in volatile if name.lower().endswith(LOG_SUFFIXES)]
+    report.components["logs"] += volatile_size(bepinex_path, logs)
+    report.components["other"] += volatile_size(bepinex_path, [name for name in volatile if name not in logs])
+
+    for name in dirs:
+        path = os.path.join(bepinex_path, name)
+        component = name.lower()
+        if component == "plugins":
+            own_size, plugin_dirs, plugin_volatile = cache.scan_folder(path)
+            report.components["plugins"] += own_size + volatile_size(path, plugin_volatile)
+            for plugin in plugin_dirs:
+                plugin_size = cache.tree_size(os.path.join(path, plugin))
+                report.plugins[plugin] = plugin_size
+                report.components["plugins"] += plugin_size
+        elif component in report.components:
+            report.components[component] += cache.tree_size(path)
+        else:
+            report.components["other"] += cache.tree_size(path)
+
+    for name in (".doorstop_version", "doorstop_config.ini", "winhttp.dll"):
+        try:
+            report.components["core"] += os.stat(os.path.join(game_path, name)).st_size
+        except OSError:
+            pass
+
+    trash_path = os.path.join(game_path, ".bepinex_trash")
+    if os.path.isdir(trash_path):
+        report.components["trash"] = cache.tree_size(trash_path)
+    return report
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """One cache for all workers so they share what the others already scanned"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = UsageCache()
+        return _shared_cache
+
+
+class UsageThread(QThread):
+    measured = pyqtSignal(str, object)
+
+    def __init__(self, game_paths, parent=None):
+        super().__init__(parent)
+        self.game_paths = list(game_paths)
+
+    def run(self):
+        cache = shared_cache()
+        for game_path in self.game_paths:
+            try:
+                self.measured.emit(game_path, measure(game_path, cache))
+            except Exception as e:
+                print(f"Disk usage error for {game_path}: {str(e)}")
+        cache.save()
@@ -1,9 +1,12 @@
 import os
 import sys
 import requests
-import zipfile
 import shutil
-from PyQt5.QtCore import QThread, pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, QObject
+from integrity import archives_dir, build_manifest, load_manifest
+from fast_extract import Extractor
+import async_runtime
+from async_runtime import get_runtime, run_blocking, download
 
 def resource_path(relative_path):
     try:
@@ -13,73 +16,43 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-class DownloadThread(QThread):
-    progress_updated = pyqtSignal(int)
+REQUIRED_FILES = [
+    '.doorstop_version',
+    'doorstop_config.ini',
+    'winhttp.dll'
+]
+
+
+def bepinex_destination(name):
+    """Members of a release archive that are installed: the doorstop files and BepInEx/"""
+    if name in REQUIRED_FILES or name.startswith('BepInEx/'):
+        return name
+    return None
+
+
+def prepare_target(extractor, target_dir):
+    """Check every member name, then remove the old BepInEx folder if the archive brings a new one"""
+    os.makedirs(target_dir, exist_ok=True)
+    extractor.plan(target_dir, bepinex_destination)
+    if any(info.filename.replace('\\', '/').startswith('BepInEx/') for info in extractor.infos):
+        dest_bepinex = os.path.join(target_dir, 'BepInEx')
+        if os.path.exists(dest_bepinex):
+            shutil.rmtree(dest_bepinex)
+
+
+def extract_bepinex(zip_path, target_dir):
+    """Extract the doorstop files and a fresh BepInEx folder from a release archive into target_dir"""
+    extractor = Extractor(zip_path)
+    prepare_target(extractor, target_dir)
+    return extractor.extract(target_dir, bepinex_destination)
+
+
+async def extract_bepinex_async(job, zip_path, target_dir):
+    """extract_bepinex on the async runtime; progress is (members done, total)"""
+    extractor = await run_blocking(Extractor, zip_path)
+    await run_blocking(prepare_target, extractor, target_dir)
+    return await async_runtime.extract(job, extractor, target_dir, bepinex_destination)
 
-    def __init__(self, url, save_path):
-        super().__init__()
-        self.url = url
-        self.save_path = save_path
-        self.success = False
-
-    def run(self):
-        try:
-            response = requests.get(self.url, stream=True)
-            response.raise_for_status()
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            with open(self.save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        if total_size > 0:
-                            progress = int((downloaded / total_size) * 100)
-                            self.progress_updated.emit(progress)
-            self.success = True
-        except Exception as e:
-            print(f"Download error: {str(e)}")
-            self.success = False
-
-class ExtractThread(QThread):
-    def __init__(self, zip_path, target_dir):
-        super().__init__()
-        self.zip_path = zip_path
-        self.target_dir = target_dir
-        self.success = False
-
-    def run(self):
-        try:
-            os.makedirs(self.target_dir, exist_ok=True)
-            temp_dir = "temp_extract"
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            with zipfile.ZipFile(self.zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            required_files = [
-                '.doorstop_version',
-                'doorstop_config.ini',
-                'winhttp.dll'
-            ]
-            
-            for file in required_files:
-                src_path = os.path.join(temp_dir, file)
-                if os.path.exists(src_path):
-                    shutil.copy2(src_path, os.path.join(self.target_dir, file))
-            
-            src_bepinex = os.path.join(temp_dir, 'BepInEx')
-            if os.path.exists(src_bepinex):
-                dest_bepinex = os.path.join(self.target_dir, 'BepInEx')
-                if os.path.exists(dest_bepinex):
-                    shutil.rmtree(dest_bepinex)
-                shutil.copytree(src_bepinex, dest_bepinex)
-            
-            shutil.rmtree(temp_dir)
-            self.success = True
-        except Exception as e:
-            print(f"Extraction error: {str(e)}")
-            self.success = False
 
 class BepInExDownloader(QObject):
     progress_signal = pyqtSignal(int)
@@ -87,45 +60,59 @@ class BepInExDownloader(QObject):
     def __init__(self):
         super().__init__()
         self.api_url = "https://api.github.com/repos/BepInEx/BepInEx/releases/latest"
+        self.download_job = None
 
     def download_latest(self, callback):
-        try:
-            response = requests.get(self.api_url)
-            response.raise_for_status()
-            release_data = response.json()
-            
-            version = release_data["tag_name"].replace("v", "")
-            os_name, arch = self.get_system_info()
-            
-            asset_name_pattern = f"BepInEx_{os_name}_{arch}_{version}.zip"
-            
-            asset_url = None
+        """Fetch the latest release archive in the background; callback(success, path) runs on the GUI thread"""
+        self.download_job = get_runtime().job(self.fetch_latest, name="Download BepInEx")
+        self.download_job.progress.connect(self.progress_signal.emit)
+        self.download_job.done.connect(lambda path: callback(True, path))
+        self.download_job.failed.connect(lambda message: self.on_failed(message, callback))
+        return self.download_job.start()
+
+    def cancel(self):
+        if self.download_job is not None:
+            self.download_job.cancel()
+
+    def on_failed(self, message, callback):
+        print(f"Download error: {message}")
+        callback(False, None)
+
+    async def fetch_latest(self, job):
+        response = await run_blocking(requests.get, self.api_url, timeout=30)
+        response.raise_for_status()
+        release_data = response.json()
+
+        version = release_data["tag_name"].replace("v", "")
+        os_name, arch = self.get_system_info()
+
+        asset_name_pattern = f"BepInEx_{os_name}_{arch}_{version}.zip"
+
+        asset_url = None
+        for asset in release_data["assets"]:
+            if asset["name"] == asset_name_pattern:
+                asset_url = asset["browser_download_url"]
+                break
+
+        if not asset_url:
             for asset in release_data["assets"]:
-                if asset["name"] == asset_name_pattern:
+                if f"{os_name}_{arch}" in asset["name"] and asset["name"].endswith(".zip"):
                     asset_url = asset["browser_download_url"]
+                    asset_name_pattern = asset["name"]
                     break
-            
-            if not asset_url:
-                for asset in release_data["assets"]:
-                    if f"{os_name}_{arch}" in asset["name"] and asset["name"].endswith(".zip"):
-                        asset_url = asset["browser_download_url"]
-                        asset_name_pattern = asset["name"]
-                        break
-            
-            if not asset_url:
-                print(f"Could not find appropriate asset for {os_name}_{arch}")
-                callback(False, None)
-                return
-            
-            save_path = asset_name_pattern
-            download_thread = DownloadThread(asset_url, save_path)
-            download_thread.progress_updated.connect(self.progress_signal)
-            download_thread.finished.connect(lambda: callback(download_thread.success, save_path))
-            download_thread.start()
-        
-        except Exception as e:
-            print(f"Error getting latest release: {str(e)}")
-            callback(False, None)
+
+        if not asset_url:
+            raise RuntimeError(f"Could not find appropriate asset for {os_name}_{arch}")
+
+        save_path = os.path.join(archives_dir(), asset_name_pattern)
+        if os.path.isfile(save_path) and load_manifest(save_path) is not None:
+            # Release assets never change under the same name
+            job.report(100)
+            return save_path
+
+        sha256 = await download(job, asset_url, save_path)
+        await run_blocking(build_manifest, save_path, sha256)
+        return save_path
 
     def get_system_info(self):
         import platform
@@ -0,0 +1,196 @@
+import os
+import time
+import zlib
+import struct
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CHUNK_SIZE = 1024 * 1024
+
+
+class UnsafeMemberError(zipfile.BadZipFile):
+    pass
+
+
+def safe_member_path(name):
+    """Relative output path of a member; rejects names that would land outside the target (zip-slip)"""
+    normalized = name.replace('\\', '/')
+    parts = [part for part in normalized.split('/') if part not in ('', '.')]
+    if normalized.startswith('/') or (parts and ':' in parts[0]) or '..' in parts:
+        raise UnsafeMemberError(f"Unsafe path in archive: {name}")
+    return os.path.join(*parts) if parts else ""
+
+
+class PositionalReader:
+    """Reads at absolute offsets on its own handle, so workers never share a file position"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.fd = self.file.fileno()
+
+    def read_at(self, offset, size):
+        if hasattr(os, "pread"):
+            data = os.pread(self.fd, size, offset)
+        else:
+            # Windows has no pread; the handle is private to this worker so seek+read is safe
+            self.file.seek(offset)
+            data = self.file.read(size)
+        if len(data) != size:
+            raise zipfile.BadZipFile("Unexpected end of archive")
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def member_timestamp(info):
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+
+def preallocate(f, size):
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+    # Extends the file in one call (SetEndOfFile on Windows)
+    f.truncate(size)
+
+
+class Extractor:
+    """Parallel zip extraction.
+
+    The central directory is read once; members are then inflated on a
+    thread pool (zlib releases the GIL) with one positional reader per worker.
+    Stored and deflated members are decoded directly from the local header
+    offset; other methods fall back to zipfile with a per-worker ZipFile.
+    """
+
+    def __init__(self, zip_path, workers=None):
+        self.zip_path = zip_path
+        self.workers = workers or min(8, (os.cpu_count() or 1))
+        self.local = threading.local()
+        self.handles = []
+        self.handles_lock = threading.Lock()
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            self.infos = zip_ref.infolist()
+
+    def reader(self):
+        if not hasattr(self.local, "reader"):
+            self.local.reader = PositionalReader(self.zip_path)
+            with self.handles_lock:
+                self.handles.append(self.local.reader)
+        return self.local.reader
+
+    def fallback_zip(self):
+        if not hasattr(self.local, "zip_ref"):
+            self.local.zip_ref = zipfile.ZipFile(self.zip_path, 'r')
+            with self.handles_lock:
+                self.handles.append(self.local.zip_ref)
+        return self.local.zip_ref
+
+    def data_offset(self, info):
+        header = self.reader().read_at(info.header_offset, LOCAL_HEADER.size)
+        fields = LOCAL_HEADER.unpack(header)
+        if fields[0] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = fields[-2], fields[-1]
+        return info.header_offset + LOCAL_HEADER.size + name_length + extra_length
+
+    def iter_chunks(self, info):
+        """Yield the decompressed data of a member in chunks"""
+        if info.flag_bits & 0x1:
+            raise RuntimeError(f"{info.filename} is encrypted")
+        if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with self.fallback_zip().open(info) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    yield chunk
+            return
+
+        reader = self.reader()
+        offset = self.data_offset(info)
+        remaining = info.compress_size
+        decompressor = zlib.decompressobj(-15) if info.compress_type == zipfile.ZIP_DEFLATED else None
+        while remaining > 0:
+            size = min(CHUNK_SIZE, remaining)
+            data = reader.read_at(offset, size)
+            offset += size
+            remaining -= size
+            yield decompressor.decompress(data) if decompressor else data
+        if decompressor:
+            yield decompressor.flush()
+
+    def extract_member(self, info, target):
+        crc = 0
+        written = 0
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(target, 'wb') as f:
+            preallocate(f, info.file_size)
+            for chunk in self.iter_chunks(info):
+                if chunk:
+                    f.write(chunk)
+                    crc = zlib.crc32(chunk, crc)
+                    written += len(chunk)
+            if written != info.file_size:
+                f.truncate(written)
+        if written != info.file_size or crc != info.CRC:
+            os.remove(target)
+            raise zipfile.BadZipFile(f"CRC check failed for {info.filename}")
+        timestamp = member_timestamp(info)
+        if timestamp is not None:
+            os.utime(target, (timestamp, timestamp))
+        return target
+
+    def plan(self, target_dir, destination=None):
+        """(info, output path) of the files to write; destination maps a member name to a relative path or None"""
+        jobs = []
+        for info in self.infos:
+            if info.is_dir():
+                continue
+            relative = destination(info.filename.replace('\\', '/')) if destination else info.filename
+            if not relative:
+                continue
+            relative = safe_member_path(relative)
+            if relative:
+                jobs.append((info, os.path.join(target_dir, relative)))
+        return jobs
+
+    def extract(self, target_dir, destination=None):
+        """Extract the members into target_dir and return the written paths"""
+        jobs = self.plan(target_dir, destination)
+        # Create folders up front so workers don't race on makedirs
+        for directory in sorted({os.path.dirname(path) for info, path in jobs}):
+            os.makedirs(directory, exist_ok=True)
+        # Largest first so one big member doesn't finish last on its own
+        jobs.sort(key=lambda job: job[0].file_size, reverse=True)
+
+        try:
+            if self.workers <= 1 or len(jobs) < 2:
+                return [self.extract_member(*job) for job in jobs]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                return list(executor.map(lambda job: self.extract_member(*job), jobs))
+        finally:
+            self.close()
+
+    def close(self):
+        """Close the per-worker archive handles"""
+        with self.handles_lock:
+            handles, self.handles = self.handles, []
+        for handle in handles:
+            handle.close()
+        self.local = threading.local()
+
+
+def extract(zip_path, target_dir, destination=None, workers=None):
+    return Extractor(zip_path, workers).extract(target_dir, destination)
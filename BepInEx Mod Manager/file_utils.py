@@ -0,0 +1,35 @@
+import os
+import stat
+import tempfile
+
+# mkstemp creates files 0600; new files get the mode open() would give them
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+
+def atomic_write_bytes(path, data):
+    """Write data to path through a temp file in the same folder and an atomic rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            mode = NEW_FILE_MODE
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    atomic_write_bytes(path, text.encode(encoding))
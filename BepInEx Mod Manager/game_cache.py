@@ -0,0 +1,63 @@
+import time
+from state_store import get_store, path_key
+
+
+def load_games(manual):
+    rows = get_store().query("SELECT name, path, platform, source FROM games WHERE manual = ? ORDER BY name",
+                             (1 if manual else 0,))
+    return {name: {'path': path, 'platform': platform, 'source': source} for name, path, platform, source in rows}
+
+
+def load_cached_games():
+    """Games found by the last scan, so the window can be filled before a new scan finishes"""
+    return load_games(manual=False)
+
+
+def save_cached_games(games):
+    now = time.time()
+    store = get_store()
+    with store.transaction() as connection:
+        connection.execute("DELETE FROM games WHERE manual = 0")
+        connection.executemany(
+            "INSERT OR IGNORE INTO games (key, name, path, platform, source, manual, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, 0, ?)",
+            [(path_key(info['path']), name, info['path'], info['platform'], info['source'], now)
+             for name, info in games.items()])
+
+
+def load_manual_games():
+    """Games the user added by hand, as {path key: info with its 'name'}; two games may share a folder name"""
+    rows = get_store().query("SELECT key, name, path, platform, source FROM games WHERE manual = 1 ORDER BY name")
+    return {key: {'name': name, 'path': path, 'platform': platform, 'source': source}
+            for key, name, path, platform, source in rows}
+
+
+def save_manual_games(games):
+    store = get_store()
+    with store.transaction() as connection:
+        connection.execute("DELETE FROM games WHERE manual = 1")
+        connection.executemany(
+            "INSERT OR REPLACE INTO games (key, name, path, platform, source, manual) VALUES (?, ?, ?, ?, ?, 1)",
+            [(path_key(info['path']), info['name'], info['path'], info['platform'], info['source'])
+             for info in games.values()])
+
+
+def save_plugins(game_path, folders, rows):
+    """Replace the recorded plugin files of the given folders (all when None) with rows of
+    (folder, file, enabled, size, mtime_ns)"""
+    key = path_key(game_path)
+    with get_store().transaction() as connection:
+        if folders is None:
+            connection.execute("DELETE FROM plugins WHERE game_key = ?", (key,))
+        else:
+            connection.executemany("DELETE FROM plugins WHERE game_key = ? AND folder = ?",
+                                   [(key, folder) for folder in folders])
+        connection.executemany(
+            "INSERT OR REPLACE INTO plugins (game_key, folder, file, enabled, size, mtime_ns) "
+            "VALUES (?, ?, ?, ?, ?, ?)", [(key, *row) for row in rows])
+
+
+def plugin_counts():
+    """{game key: (plugin files, enabled files)} as of the last time each game was opened"""
+    rows = get_store().query("SELECT game_key, COUNT(*), SUM(enabled) FROM plugins GROUP BY game_key")
+    return {key: (total, enabled) for key, total, enabled in rows}
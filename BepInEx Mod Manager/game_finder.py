@@ -1,7 +1,11 @@
 import os
 import sys
 import platform
-import winreg
+try:
+    import winreg
+except ImportError:
+    # Registry lookups only exist on Windows; the other platforms use fixed paths
+    winreg = None
 import json
 from PyQt5.QtCore import QObject
 
@@ -17,36 +21,23 @@ class GameFinder(QObject):
         super().__init__()
 
     def find_unity_games(self):
-        games = {}
-        
-        steam_games = self.find_steam_games()
-        for game_name, game_path in steam_games.items():
-            if self.is_unity_game(game_path):
-                games[game_name] = {
-                    'path': game_path,
-                    'platform': self.get_unity_platform(game_path),
-                    'source': 'Steam'
-                }
-        
-        epic_games = self.find_epic_games()
-        for game_name, game_path in epic_games.items():
-            if self.is_unity_game(game_path):
-                games[game_name] = {
-                    'path': game_path,
-                    'platform': self.get_unity_platform(game_path),
-                    'source': 'Epic Games'
-                }
-        
-        ms_store_games = self.find_ms_store_games()
-        for game_name, game_path in ms_store_games.items():
-            if self.is_unity_game(game_path):
-                games[game_name] = {
-                    'path': game_path,
-                    'platform': self.get_unity_platform(game_path),
-                    'source': 'Microsoft Store'
-                }
-        
-        return games
+        return dict(self.iter_unity_games())
+
+    def iter_unity_games(self):
+        """Yield (name, info) for each Unity game as soon as it has been checked"""
+        sources = [
+            (self.find_steam_games, 'Steam'),
+            (self.find_epic_games, 'Epic Games'),
+            (self.find_ms_store_games, 'Microsoft Store'),
+        ]
+        for find_games, source in sources:
+            for game_name, game_path in find_games().items():
+                if self.is_unity_game(game_path):
+                    yield game_name, {
+                        'path': game_path,
+                        'platform': self.get_unity_platform(game_path),
+                        'source': source
+                    }
 
     def is_unity_game(self, game_path):
         for root, dirs, files in os.walk(game_path):
@@ -0,0 +1,74 @@
+import re
+import bisect
+
+WORD_PATTERN = re.compile(r'[0-9a-z]+')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class GameSearchIndex:
+    """Search index over game name and source.
+
+    Terms of three or more characters are looked up through a trigram index
+    and then checked as substrings; shorter terms match word prefixes through
+    a sorted word list.  Games can be added and removed one at a time as
+    discovery streams in.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.trigram_keys = {}
+        self.words = []
+
+    def add(self, key, *fields):
+        self.remove(key)
+        text = " ".join(fields).lower()
+        self.texts[key] = text
+        for trigram in trigrams(text):
+            self.trigram_keys.setdefault(trigram, set()).add(key)
+        for word in set(WORD_PATTERN.findall(text)):
+            bisect.insort(self.words, (word, key))
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for trigram in trigrams(text):
+            keys = self.trigram_keys[trigram]
+            keys.discard(key)
+            if not keys:
+                del self.trigram_keys[trigram]
+        for word in set(WORD_PATTERN.findall(text)):
+            i = bisect.bisect_left(self.words, (word, key))
+            if i < len(self.words) and self.words[i] == (word, key):
+                del self.words[i]
+
+    def prefix_matches(self, prefix):
+        keys = set()
+        for i in range(bisect.bisect_left(self.words, (prefix, "")), len(self.words)):
+            word, key = self.words[i]
+            if not word.startswith(prefix):
+                break
+            keys.add(key)
+        return keys
+
+    def search(self, query):
+        """Keys of the games matching every term of the query, or None for an empty query"""
+        terms = query.lower().split()
+        if not terms:
+            return None
+
+        result = None
+        for term in terms:
+            if len(term) < 3:
+                matches = self.prefix_matches(term)
+            else:
+                sets = sorted((self.trigram_keys.get(t, set()) for t in trigrams(term)), key=len)
+                candidates = set.intersection(*sets) if sets else set()
+                matches = {key for key in candidates if term in self.texts[key]}
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result
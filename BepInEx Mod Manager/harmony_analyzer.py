@@ -0,0 +1,653 @@
+import os
+import json
+import bisect
+import struct
+import sqlite3
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from state_store import get_store
+from transfer_scheduler import get_scheduler, BACKGROUND
+
+# Reads just enough of the PE file and the ECMA-335 metadata of a plugin
+# assembly to find its Harmony patches, without loading it into a runtime.
+
+HARMONY_NAMESPACES = ("HarmonyLib", "Harmony")
+PATCH_KINDS = ("Prefix", "Postfix", "Transpiler", "Finalizer", "ILManipulator")
+
+# Unity messages called every frame; several plugins patching one of these is a likely slowdown
+HOT_METHODS = ("Update", "LateUpdate", "FixedUpdate", "OnGUI")
+
+# AccessTools / System.Type methods that look a method up by type and name
+METHOD_LOOKUPS = {
+    "Method": "", "DeclaredMethod": "", "GetMethod": "", "GetDeclaredMethods": "",
+    "PropertyGetter": "get_", "DeclaredPropertyGetter": "get_",
+    "PropertySetter": "set_", "DeclaredPropertySetter": "set_",
+    "Constructor": ".ctor", "DeclaredConstructor": ".ctor",
+}
+METHOD_TYPE_NAMES = {1: "get_", 2: "set_", 3: ".ctor", 4: ".cctor"}
+
+# Fewer uncached assemblies than this are parsed in-process; starting workers would cost more
+PARALLEL_THRESHOLD = 8
+
+# Table numbers
+MODULE, TYPE_REF, TYPE_DEF, FIELD_PTR, FIELD, METHOD_PTR, METHOD_DEF, PARAM_PTR, PARAM = range(9)
+MEMBER_REF, CUSTOM_ATTRIBUTE, TYPE_SPEC, METHOD_SPEC = 0x0A, 0x0C, 0x1B, 0x2B
+
+# Coded index kinds: the tables they can point to, in tag order (None = unused tag)
+CODED = {
+    "TypeDefOrRef": (TYPE_DEF, TYPE_REF, TYPE_SPEC),
+    "HasConstant": (FIELD, PARAM, 0x17),
+    "HasCustomAttribute": (METHOD_DEF, FIELD, TYPE_REF, TYPE_DEF, PARAM, 0x09, MEMBER_REF, MODULE, 0x0E,
+                           0x17, 0x14, 0x11, 0x1A, TYPE_SPEC, 0x20, 0x23, 0x26, 0x27, 0x28, 0x2A, 0x2C,
+                           METHOD_SPEC),
+    "HasFieldMarshal": (FIELD, PARAM),
+    "HasDeclSecurity": (TYPE_DEF, METHOD_DEF, 0x20),
+    "MemberRefParent": (TYPE_DEF, TYPE_REF, 0x1A, METHOD_DEF, TYPE_SPEC),
+    "HasSemantics": (0x14, 0x17),
+    "MethodDefOrRef": (METHOD_DEF, MEMBER_REF),
+    "MemberForwarded": (FIELD, METHOD_DEF),
+    "Implementation": (0x26, 0x23, 0x27),
+    "CustomAttributeType": (None, None, METHOD_DEF, MEMBER_REF, None),
+    "ResolutionScope": (MODULE, 0x1A, 0x23, TYPE_REF),
+    "TypeOrMethodDef": (TYPE_DEF, METHOD_DEF),
+}
+
+# Column layout of every table (ECMA-335 II.22): fixed sizes in bytes, heap
+# indexes ("string", "guid", "blob"), table indexes (an int in a tuple) or coded indexes
+SCHEMA = {
+    0x00: [2, "string", "guid", "guid", "guid"],
+    0x01: ["ResolutionScope", "string", "string"],
+    0x02: [4, "string", "string", "TypeDefOrRef", (FIELD,), (METHOD_DEF,)],
+    0x03: [(FIELD,)],
+    0x04: [2, "string", "blob"],
+    0x05: [(METHOD_DEF,)],
+    0x06: [4, 2, 2, "string", "blob", (PARAM,)],
+    0x07: [(PARAM,)],
+    0x08: [2, 2, "string"],
+    0x09: [(TYPE_DEF,), "TypeDefOrRef"],
+    0x0A: ["MemberRefParent", "string", "blob"],
+    0x0B: [2, "HasConstant", "blob"],
+    0x0C: ["HasCustomAttribute", "CustomAttributeType", "blob"],
+    0x0D: ["HasFieldMarshal", "blob"],
+    0x0E: [2, "HasDeclSecurity", "blob"],
+    0x0F: [2, 4, (TYPE_DEF,)],
+    0x10: [4, (FIELD,)],
+    0x11: ["blob"],
+    0x12: [(TYPE_DEF,), (0x14,)],
+    0x13: [(0x14,)],
+    0x14: [2, "string", "TypeDefOrRef"],
+    0x15: [(TYPE_DEF,), (0x17,)],
+    0x16: [(0x17,)],
+    0x17: [2, "string", "blob"],
+    0x18: [2, (METHOD_DEF,), "HasSemantics"],
+    0x19: [(TYPE_DEF,), "MethodDefOrRef", "MethodDefOrRef"],
+    0x1A: ["string"],
+    0x1B: ["blob"],
+    0x1C: [2, "MemberForwarded", "string", (0x1A,)],
+    0x1D: [4, (FIELD,)],
+    0x1E: [4, 4],
+    0x1F: [4],
+    0x20: [4, 2, 2, 2, 2, 4, "blob", "string", "string"],
+    0x21: [4],
+    0x22: [4, 4, 4],
+    0x23: [2, 2, 2, 2, 4, "blob", "string", "string", "blob"],
+    0x24: [4, (0x23,)],
+    0x25: [4, 4, 4, (0x23,)],
+    0x26: [4, "string", "blob"],
+    0x27: [4, 4, "string", "string", "Implementation"],
+    0x28: [4, 4, "string", "Implementation"],
+    0x29: [(TYPE_DEF,), (TYPE_DEF,)],
+    0x2A: [2, 2, "TypeOrMethodDef", "string"],
+    0x2B: ["MethodDefOrRef", "blob"],
+    0x2C: [(0x2A,), "TypeDefOrRef"],
+}
+
+# IL operand sizes of the one-byte opcodes that have one; everything else has none
+OPERAND_SIZES = {0x0E: 1, 0x0F: 1, 0x10: 1, 0x11: 1, 0x12: 1, 0x13: 1, 0x1F: 1, 0x20: 4, 0x21: 8, 0x22: 4,
+                 0x23: 8, 0x27: 4, 0x28: 4, 0x29: 4, 0x6F: 4, 0xDD: 4, 0xDE: 1}
+OPERAND_SIZES.update({opcode: 1 for opcode in range(0x2B, 0x38)})
+OPERAND_SIZES.update({opcode: 4 for opcode in range(0x38, 0x45)})
+OPERAND_SIZES.update({opcode: 4 for opcode in (0x70, 0x71, 0x72, 0x73, 0x74, 0x75, 0x79, 0x7B, 0x7C, 0x7D, 0x7E,
+                                               0x7F, 0x80, 0x81, 0x8C, 0x8D, 0x8F, 0xA3, 0xA4, 0xA5, 0xC2, 0xC6,
+                                               0xD0)})
+# Two-byte opcodes (0xFE xx)
+EXTENDED_OPERAND_SIZES = {0x06: 4, 0x07: 4, 0x09: 2, 0x0A: 2, 0x0B: 2, 0x0C: 2, 0x0D: 2, 0x0E: 2, 0x12: 1,
+                          0x15: 4, 0x16: 4, 0x19: 1, 0x1C: 4}
+CALL, CALLVIRT, NEWOBJ, LDSTR, LDTOKEN, SWITCH = 0x28, 0x6F, 0x73, 0x72, 0xD0, 0x45
+
+
+class BadAssemblyError(ValueError):
+    pass
+
+
+class Patch:
+    def __init__(self, target, kind, patch_method, source):
+        self.target = target
+        self.kind = kind
+        self.patch_method = patch_method
+        self.source = source
+
+    def to_list(self):
+        return [self.target, self.kind, self.patch_method, self.source]
+
+
+def compressed_uint(data, pos):
+    """ECMA-335 compressed unsigned integer -> (value, next position)"""
+    first = data[pos]
+    if first & 0x80 == 0:
+        return first, pos + 1
+    if first & 0xC0 == 0x80:
+        return ((first & 0x3F) << 8) | data[pos + 1], pos + 2
+    return ((first & 0x1F) << 24) | (data[pos + 1] << 16) | (data[pos + 2] << 8) | data[pos + 3], pos + 4
+
+
+class Assembly:
+    """Metadata tables, heaps and method bodies of a .NET PE file"""
+
+    def __init__(self, data):
+        self.data = data
+        self.method_starts = None
+        try:
+            self.read_pe()
+            self.read_metadata()
+        except (struct.error, IndexError) as e:
+            raise BadAssemblyError(f"Truncated or malformed assembly: {str(e)}")
+
+    def read_pe(self):
+        data = self.data
+        if data[:2] != b"MZ":
+            raise BadAssemblyError("Not a PE file")
+        pe = struct.unpack_from("<I", data, 0x3C)[0]
+        if data[pe:pe + 4] != b"PE\0\0":
+            raise BadAssemblyError("Not a PE file")
+        sections, optional_size = struct.unpack_from("<H12xH", data, pe + 6)
+        optional = pe + 24
+        magic = struct.unpack_from("<H", data, optional)[0]
+        directories = optional + (96 if magic == 0x10B else 112)
+        cli_rva, cli_size = struct.unpack_from("<II", data, directories + 14 * 8)
+        if not cli_rva:
+            raise BadAssemblyError("Not a .NET assembly")
+        self.sections = []
+        table = optional + optional_size
+        for i in range(sections):
+            virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from("<IIII", data, table + i * 40 + 8)
+            self.sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer))
+        metadata_rva = struct.unpack_from("<I", data, self.offset(cli_rva) + 8)[0]
+        self.metadata = self.offset(metadata_rva)
+
+    def offset(self, rva):
+        for virtual_address, size, raw_pointer in self.sections:
+            if virtual_address <= rva < virtual_address + size:
+                return rva - virtual_address + raw_pointer
+        raise BadAssemblyError(f"RVA {rva:#x} is outside every section")
+
+    def read_metadata(self):
+        data, root = self.data, self.metadata
+        if struct.unpack_from("<I", data, root)[0] != 0x424A5342:
+            raise BadAssemblyError("Bad metadata signature")
+        version_length = struct.unpack_from("<I", data, root + 12)[0]
+        pos = root + 16 + version_length
+        stream_count = struct.unpack_from("<H", data, pos + 2)[0]
+        pos += 4
+        self.streams = {}
+        for _ in range(stream_count):
+            offset, size = struct.unpack_from("<II", data, pos)
+            end = data.index(b"\0", pos + 8)
+            name = data[pos + 8:end].decode("ascii")
+            pos = (end + 4) & ~3
+            self.streams[name] = (root + offset, size)
+
+        tables_offset = self.streams.get("#~", self.streams.get("#-"))[0]
+        heap_sizes = data[tables_offset + 6]
+        valid = struct.unpack_from("<Q", data, tables_offset + 8)[0]
+        self.string_size = 4 if heap_sizes & 1 else 2
+        self.guid_size = 4 if heap_sizes & 2 else 2
+        self.blob_size = 4 if heap_sizes & 4 else 2
+        pos = tables_offset + 24
+        self.rows = [0] * 64
+        for table in range(64):
+            if valid >> table & 1:
+                self.rows[table] = struct.unpack_from("<I", data, pos)[0]
+                pos += 4
+        if heap_sizes & 0x40:
+            pos += 4
+
+        self.layouts = {}
+        self.table_offsets = {}
+        for table in range(64):
+            if not self.rows[table]:
+                continue
+            if table not in SCHEMA:
+                raise BadAssemblyError(f"Unknown metadata table {table:#x}")
+            layout = [self.column_size(column) for column in SCHEMA[table]]
+            self.layouts[table] = layout
+            self.table_offsets[table] = pos
+            pos += sum(layout) * self.rows[table]
+
+    def column_size(self, column):
+        if isinstance(column, int):
+            return column
+        if column == "string":
+            return self.string_size
+        if column == "guid":
+            return self.guid_size
+        if column == "blob":
+            return self.blob_size
+        if isinstance(column, tuple):
+            return 2 if self.rows[column[0]] < 0x10000 else 4
+        tables = CODED[column]
+        tag_bits = (len(tables) - 1).bit_length()
+        largest = max(self.rows[table] for table in tables if table is not None)
+        return 2 if largest < (1 << (16 - tag_bits)) else 4
+
+    def row(self, table, index):
+        """Columns of a row (1-based index) as ints; coded indexes come back as (table, row)"""
+        layout = self.layouts[table]
+        pos = self.table_offsets[table] + (index - 1) * sum(layout)
+        values = []
+        for column, size in zip(SCHEMA[table], layout):
+            value = int.from_bytes(self.data[pos:pos + size], "little")
+            pos += size
+            if isinstance(column, str) and column in CODED:
+                tables = CODED[column]
+                tag_bits = (len(tables) - 1).bit_length()
+                value = (tables[value & ((1 << tag_bits) - 1)], value >> tag_bits)
+            values.append(value)
+        return values
+
+    def string(self, index):
+        start = self.streams["#Strings"][0] + index
+        return self.data[start:self.data.index(b"\0", start)].decode("utf-8", "replace")
+
+    def blob(self, index):
+        start = self.streams["#Blob"][0] + index
+        length, start = compressed_uint(self.data, start)
+        return self.data[start:start + length]
+
+    def user_string(self, index):
+        start = self.streams["#US"][0] + index
+        length, start = compressed_uint(self.data, start)
+        # The last byte flags non-ASCII content, it isn't part of the string
+        return self.data[start:start + length - 1].decode("utf-16-le", "replace")
+
+    def type_name(self, table, index):
+        """'Namespace.Type' of a TypeDef or TypeRef (nested types as Outer+Inner for TypeRefs)"""
+        if not index:
+            return ""
+        if table == TYPE_REF:
+            scope, name, namespace = self.row(TYPE_REF, index)
+            if scope[0] == TYPE_REF and scope[1]:
+                return f"{self.type_name(*scope)}+{self.string(name)}"
+            name, namespace = self.string(name), self.string(namespace)
+        elif table == TYPE_DEF:
+            row = self.row(TYPE_DEF, index)
+            name, namespace = self.string(row[1]), self.string(row[2])
+        else:
+            return ""
+        return f"{namespace}.{name}" if namespace else name
+
+    def member(self, table, index):
+        """(declaring type name, member name, signature blob) of a MethodDef, MemberRef or MethodSpec"""
+        if table == METHOD_SPEC:
+            return self.member(*self.row(METHOD_SPEC, index)[0])
+        if table == MEMBER_REF:
+            parent, name, signature = self.row(MEMBER_REF, index)
+            return self.type_name(*parent), self.string(name), self.blob(signature)
+        if table == METHOD_DEF:
+            row = self.row(METHOD_DEF, index)
+            return self.type_name(TYPE_DEF, self.method_owner(index)), self.string(row[3]), self.blob(row[4])
+        return "", "", b""
+
+    def method_owner(self, method_index):
+        """TypeDef row that declares a MethodDef"""
+        if self.method_starts is None:
+            self.method_starts = [self.row(TYPE_DEF, i)[5] for i in range(1, self.rows[TYPE_DEF] + 1)]
+        # Method lists are sorted, the owner is the last type whose list starts at or before the method
+        return bisect.bisect_right(self.method_starts, method_index)
+
+    def method_body(self, method_index):
+        """IL bytes of a MethodDef, or b'' for abstract/extern methods"""
+        rva = self.row(METHOD_DEF, method_index)[0]
+        if not rva:
+            return b""
+        pos = self.offset(rva)
+        header = self.data[pos]
+        if header & 0x3 == 0x2:
+            return self.data[pos + 1:pos + 1 + (header >> 2)]
+        flags_and_size, max_stack, code_size = struct.unpack_from("<HHI", self.data, pos)
+        start = pos + (flags_and_size >> 12) * 4
+        return self.data[start:start + code_size]
+
+
+def iter_il(code):
+    """(offset, opcode, operand) of every instruction; two-byte opcodes come back as 0xFExx"""
+    pos = 0
+    while pos < len(code):
+        offset = pos
+        opcode = code[pos]
+        pos += 1
+        if opcode == 0xFE:
+            opcode = 0xFE00 | code[pos]
+            pos += 1
+            size = EXTENDED_OPERAND_SIZES.get(opcode & 0xFF, 0)
+        elif opcode == SWITCH:
+            count = struct.unpack_from("<I", code, pos)[0]
+            size = 4 + 4 * count
+        else:
+            size = OPERAND_SIZES.get(opcode, 0)
+        operand = int.from_bytes(code[pos:pos + size], "little") if size in (1, 2, 4, 8) else None
+        pos += size
+        yield offset, opcode, operand
+
+
+class CustomAttributeReader:
+    """Decodes the fixed arguments of a custom attribute blob using its constructor signature"""
+
+    def __init__(self, assembly, signature, value):
+        self.assembly = assembly
+        self.signature = signature
+        self.value = value
+        self.sig_pos = 0
+        self.pos = 2  # after the 0x0001 prolog
+
+    def arguments(self):
+        """(argument type, value) pairs; the type is an element type byte, 'type', ('enum', name) or ('array', type)"""
+        self.sig_pos = 1  # calling convention
+        count, self.sig_pos = compressed_uint(self.signature, self.sig_pos)
+        self.read_type()  # return type
+        arguments = []
+        for _ in range(count):
+            element = self.read_type()
+            arguments.append((element, self.read_value(element)))
+        return arguments
+
+    def read_type(self):
+        element = self.signature[self.sig_pos]
+        self.sig_pos += 1
+        if element == 0x1D:  # SZARRAY
+            return ("array", self.read_type())
+        if element in (0x11, 0x12):  # VALUETYPE / CLASS followed by a TypeDefOrRef token
+            coded, self.sig_pos = compressed_uint(self.signature, self.sig_pos)
+            tables = CODED["TypeDefOrRef"]
+            name = self.assembly.type_name(tables[coded & 3], coded >> 2)
+            if name == "System.Type":
+                return "type"
+            return ("enum", name) if element == 0x11 else "object"
+        return element
+
+    def read_string(self):
+        if self.value[self.pos] == 0xFF:
+            self.pos += 1
+            return None
+        length, self.pos = compressed_uint(self.value, self.pos)
+        text = self.value[self.pos:self.pos + length].decode("utf-8", "replace")
+        self.pos += length
+        return text
+
+    def read_value(self, element):
+        if isinstance(element, tuple) and element[0] == "array":
+            count = struct.unpack_from("<I", self.value, self.pos)[0]
+            self.pos += 4
+            if count == 0xFFFFFFFF:
+                return None
+            return [self.read_value(element[1]) for _ in range(count)]
+        if element in ("type", 0x0E):  # System.Type is stored as its name
+            return self.read_string()
+        if isinstance(element, tuple):
+            # Harmony's MethodType and ArgumentType are int enums
+            value = struct.unpack_from("<i", self.value, self.pos)[0]
+            self.pos += 4
+            return value
+        sizes = {0x02: 1, 0x03: 2, 0x04: 1, 0x05: 1, 0x06: 2, 0x07: 2, 0x08: 4, 0x09: 4, 0x0A: 8, 0x0B: 8,
+                 0x0C: 4, 0x0D: 8}
+        if element not in sizes:
+            raise BadAssemblyError(f"Unsupported attribute argument type {element!r}")
+        raw = self.value[self.pos:self.pos + sizes[element]]
+        self.pos += sizes[element]
+        return int.from_bytes(raw, "little")
+
+
+def clean_type_name(name):
+    """'Namespace.Type, Assembly-CSharp, Version=...' -> 'Namespace.Type'"""
+    return (name or "").split(",")[0].strip()
+
+
+def harmony_patch_target(arguments):
+    """(type, method) from the arguments of one [HarmonyPatch(...)]; either may be None"""
+    types = [clean_type_name(value) for element, value in arguments if element == "type" and value]
+    strings = [value for element, value in arguments if element == 0x0E and value is not None]
+    if not types and len(strings) > 1:
+        # HarmonyPatch(string assemblyQualifiedDeclaringType, string methodName)
+        types.append(clean_type_name(strings.pop(0)))
+    method = strings[0] if strings else None
+    for element, value in arguments:
+        if isinstance(element, tuple) and element[0] == "enum" and element[1].endswith("MethodType"):
+            prefix = METHOD_TYPE_NAMES.get(value, "")
+            if prefix in (".ctor", ".cctor"):
+                method = prefix
+            elif method and prefix:
+                method = prefix + method
+    return (types[0] if types else None), method
+
+
+def attribute_patches(assembly):
+    """Patches declared with [HarmonyPatch] on classes and their Prefix/Postfix/... methods"""
+    class_targets, method_targets, method_kinds = {}, {}, {}
+    for index in range(1, assembly.rows[CUSTOM_ATTRIBUTE] + 1):
+        parent, constructor, value = assembly.row(CUSTOM_ATTRIBUTE, index)
+        if parent[0] not in (TYPE_DEF, METHOD_DEF) or constructor[0] is None:
+            continue
+        attribute_type, name, signature = assembly.member(*constructor)
+        namespace, _, attribute = attribute_type.rpartition(".")
+        if namespace not in HARMONY_NAMESPACES:
+            continue
+        if attribute == "HarmonyPatch":
+            try:
+                target = harmony_patch_target(CustomAttributeReader(assembly, signature, assembly.blob(value)).arguments())
+            except (BadAssemblyError, IndexError, struct.error):
+                continue
+            targets = class_targets if parent[0] == TYPE_DEF else method_targets
+            merged = targets.setdefault(parent[1], [None, None])
+            merged[0] = target[0] or merged[0]
+            merged[1] = target[1] or merged[1]
+        elif parent[0] == METHOD_DEF and attribute.startswith("Harmony") and attribute[7:] in PATCH_KINDS:
+            method_kinds[parent[1]] = attribute[7:]
+
+    patches = []
+    # Patch classes, including ones that only put [HarmonyPatch] on their methods
+    for method_index in method_targets:
+        class_targets.setdefault(assembly.method_owner(method_index), [None, None])
+    for type_index, (type_name, method) in class_targets.items():
+        row = assembly.row(TYPE_DEF, type_index)
+        end = assembly.row(TYPE_DEF, type_index + 1)[5] if type_index < assembly.rows[TYPE_DEF] \
+            else assembly.rows[METHOD_DEF] + 1
+        patch_class = assembly.type_name(TYPE_DEF, type_index)
+        for method_index in range(row[5], end):
+            method_name = assembly.string(assembly.row(METHOD_DEF, method_index)[3])
+            kind = method_kinds.get(method_index) or (method_name if method_name in PATCH_KINDS else None)
+            if kind is None:
+                continue
+            own_type, own_method = method_targets.get(method_index, (None, None))
+            target_type, target_method = own_type or type_name, own_method or method
+            if target_type and target_method:
+                patches.append(Patch(f"{target_type}.{target_method}", kind, f"{patch_class}.{method_name}",
+                                     "attribute"))
+    return patches
+
+
+def call_patches(assembly):
+    """Patches applied with harmony.Patch(original, ...) where original is looked up by type and name"""
+    patches = []
+    for method_index in range(1, assembly.rows[METHOD_DEF] + 1):
+        try:
+            code = assembly.method_body(method_index)
+        except (BadAssemblyError, struct.error, IndexError):
+            continue
+        if not code:
+            continue
+        last_type = last_string = None
+        originals = []
+        caller = None
+        try:
+            for offset, opcode, operand in iter_il(code):
+                if opcode == LDTOKEN and operand >> 24 in (TYPE_REF, TYPE_DEF):
+                    last_type = assembly.type_name(operand >> 24, operand & 0xFFFFFF)
+                elif opcode == LDSTR:
+                    last_string = assembly.user_string(operand & 0xFFFFFF)
+                elif opcode in (CALL, CALLVIRT, NEWOBJ) and operand >> 24 in (MEMBER_REF, METHOD_DEF, METHOD_SPEC):
+                    declaring_type, name, signature = assembly.member(operand >> 24, operand & 0xFFFFFF)
+                    declaring_name = declaring_type.rpartition(".")[2]
+                    if declaring_name in ("AccessTools", "Type") and name in METHOD_LOOKUPS:
+                        target = lookup_target(last_type, last_string, METHOD_LOOKUPS[name])
+                        if target:
+                            originals.append(target)
+                        last_type = last_string = None
+                    elif declaring_name in ("Harmony", "HarmonyInstance") and name == "Patch" and originals:
+                        if caller is None:
+                            owner = assembly.type_name(TYPE_DEF, assembly.method_owner(method_index))
+                            caller = f"{owner}.{assembly.string(assembly.row(METHOD_DEF, method_index)[3])}"
+                        # The original is Patch's first argument, so the first lookup since the last Patch;
+                        # later ones found the patch methods for HarmonyMethod
+                        patches.append(Patch(originals[0], "Patch", caller, "call"))
+                        originals.clear()
+        except (struct.error, IndexError):
+            continue
+    return patches
+
+
+def lookup_target(type_name, text, prefix):
+    if text and ":" in text and prefix != ".ctor":
+        # AccessTools.Method("Namespace.Type:Method")
+        type_part, _, method = text.partition(":")
+        return f"{type_part}.{prefix}{method}"
+    if not type_name:
+        return None
+    if prefix == ".ctor":
+        return f"{type_name}..ctor"
+    if text:
+        return f"{type_name}.{prefix}{text}"
+    return None
+
+
+def analyze_assembly(path):
+    """Harmony patches in one assembly as lists of [target, kind, patch method, source]"""
+    with open(path, 'rb') as f:
+        assembly = Assembly(f.read())
+    patches = attribute_patches(assembly) + call_patches(assembly)
+    return [patch.to_list() for patch in patches]
+
+
+def plugin_assemblies(plugins_path):
+    """(plugin folder or file name, DLL path) of the enabled plugin assemblies"""
+    result = []
+    for dirpath, dirnames, filenames in os.walk(plugins_path):
+        for name in filenames:
+            if name.lower().endswith(".dll"):
+                path = os.path.join(dirpath, name)
+                relative = os.path.relpath(path, plugins_path)
+                result.append((relative.split(os.sep)[0], path))
+    return sorted(result)
+
+
+class PatchReport:
+    def __init__(self):
+        # target -> {plugin: [(kind, patch method)]}
+        self.targets = {}
+        self.errors = []
+
+    def add(self, plugin, patches):
+        for target, kind, patch_method, source in patches:
+            self.targets.setdefault(target, {}).setdefault(plugin, []).append((kind, patch_method))
+
+    def overlaps(self):
+        """(target, {plugin: patches}) of the methods patched by more than one plugin, hot methods first"""
+        shared = [(target, plugins) for target, plugins in self.targets.items() if len(plugins) > 1]
+        return sorted(shared, key=lambda item: (not is_hot(item[0]), -len(item[1]), item[0]))
+
+
+def is_hot(target):
+    return target.rpartition(".")[2] in HOT_METHODS
+
+
+def analyze_plugins(plugins_path, store=None, workers=None):
+    """PatchReport for every enabled plugin DLL; unchanged files come from the state store"""
+    store = store or get_store()
+    report = PatchReport()
+    # Every cached scan under this plugins folder in one range query
+    prefix = os.path.join(os.path.abspath(plugins_path), "")
+    cached = {row[0]: row[1:] for row in store.query(
+        "SELECT path, size, mtime_ns, patches FROM harmony_scans WHERE path >= ? AND path < ?",
+        (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))}
+
+    pending = []
+    for plugin, path in plugin_assemblies(plugins_path):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        row = cached.pop(path, None)
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            report.add(plugin, json.loads(row[2]))
+        else:
+            pending.append((plugin, path, st))
+
+    outcomes = []
+    if pending:
+        with get_scheduler().disk_job("Scan Harmony patches", BACKGROUND) as ticket:
+            outcomes = parse_assemblies(pending, workers, ticket)
+
+    results = []
+    for (plugin, path, st), (patches, error) in zip(pending, outcomes):
+        if error is not None:
+            report.errors.append(f"{os.path.basename(path)}: {error}")
+        report.add(plugin, patches)
+        results.append((path, st.st_size, st.st_mtime_ns, json.dumps(patches)))
+    try:
+        store.execute_many("INSERT OR REPLACE INTO harmony_scans (path, size, mtime_ns, patches) VALUES (?, ?, ?, ?)",
+                           results)
+        # Files that were removed or disabled since the last scan
+        store.execute_many("DELETE FROM harmony_scans WHERE path = ?", [(path,) for path in cached])
+    except sqlite3.Error as e:
+        print(f"Failed to save Harmony scan results: {str(e)}")
+    return report
+
+
+def parse_assemblies(pending, workers, ticket):
+    """safe_analyze for each (plugin, path, stat) of pending, in order"""
+    paths = [path for plugin, path, st in pending]
+    workers = workers or min(len(pending), os.cpu_count() or 1)
+    # While a game runs (low-I/O mode) one process reading at the paced rate is enough
+    if workers > 1 and len(pending) >= PARALLEL_THRESHOLD and not ticket.scheduler.low_io:
+        # Parsing is pure Python, so processes rather than threads.  Spawned, not
+        # forked: the caller is usually a thread of the Qt application.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(safe_analyze, paths, chunksize=4))
+    outcomes = []
+    for plugin, path, st in pending:
+        ticket.throttle(st.st_size)
+        outcomes.append(safe_analyze(path))
+    return outcomes
+
+
+def safe_analyze(path):
+    try:
+        return analyze_assembly(path), None
+    except (OSError, BadAssemblyError) as e:
+        # Native DLLs shipped next to plugins end up here too
+        return [], str(e)
+
+
+class HarmonyScanThread(QThread):
+    done = pyqtSignal(object)
+
+    def __init__(self, plugins_path, parent=None):
+        super().__init__(parent)
+        self.plugins_path = plugins_path
+
+    def run(self):
+        try:
+            self.done.emit(analyze_plugins(self.plugins_path))
+        except Exception as e:
+            print(f"Harmony analysis error: {str(e)}")
@@ -0,0 +1,29 @@
+import os
+import sys
+from PyQt5.QtGui import QIcon, QPixmap
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+_icons = {}
+_pixmaps = {}
+
+
+def get_icon(relative_path):
+    """Load an icon from the resources once and share it between all widgets"""
+    icon = _icons.get(relative_path)
+    if icon is None:
+        icon = _icons[relative_path] = QIcon(resource_path(relative_path))
+    return icon
+
+
+def get_pixmap(relative_path):
+    pixmap = _pixmaps.get(relative_path)
+    if pixmap is None:
+        pixmap = _pixmaps[relative_path] = QPixmap(resource_path(relative_path))
+    return pixmap
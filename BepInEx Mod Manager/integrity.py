@@ -0,0 +1,254 @@
+import os
+import json
+import zipfile
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from app_data import app_data_dir, app_data_path, game_key
+from file_utils import atomic_write_bytes, atomic_write_text
+from state_store import get_store
+from transfer_scheduler import get_scheduler, BACKGROUND
+
+CHUNK_SIZE = 1024 * 1024
+
+# Files the installer copies next to the game executable
+ROOT_FILES = ['.doorstop_version', 'doorstop_config.ini', 'winhttp.dll']
+
+# Folders BepInEx and the user change on purpose; shipped files there aren't compared
+USER_PREFIXES = ('BepInEx/config/', 'BepInEx/plugins/', 'BepInEx/patchers/', 'BepInEx/cache/')
+
+# Folders owned by the release, where anything not in the manifest is reported as extra
+CORE_PREFIXES = ('BepInEx/core/',)
+
+
+def archives_dir():
+    """Downloaded release archives are kept here so installs can be repaired offline"""
+    path = os.path.join(app_data_dir(), "archives")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def manifest_path(archive_path):
+    return archive_path + ".manifest.json"
+
+
+def is_installed_member(name):
+    return name in ROOT_FILES or name.startswith('BepInEx/')
+
+
+def hash_stream(f):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    with open(path, 'rb') as f:
+        return hash_stream(f)
+
+
+def build_manifest(archive_path, archive_sha256=None):
+    """Record size and sha256 of every file the installer takes from the archive"""
+    files = {}
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            name = info.filename.replace('\\', '/')
+            if info.is_dir() or not is_installed_member(name):
+                continue
+            with zip_ref.open(info) as f:
+                files[name] = {"size": info.file_size, "sha256": hash_stream(f)}
+    manifest = {
+        "archive": os.path.basename(archive_path),
+        "archive_sha256": archive_sha256 or hash_file(archive_path),
+        "files": files,
+    }
+    atomic_write_text(manifest_path(archive_path), json.dumps(manifest, indent=1))
+    return manifest
+
+
+def load_manifest(archive_path):
+    try:
+        with open(manifest_path(archive_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def install_record_path(game_path):
+    return app_data_path("installs", f"{game_key(game_path)}.json")
+
+
+def record_install(game_path, archive_path):
+    """Remember which archive a game was installed from"""
+    atomic_write_text(install_record_path(game_path),
+                      json.dumps({"game_path": game_path, "archive": os.path.basename(archive_path)}))
+
+
+def installed_archive(game_path):
+    """Path of the cached archive the game was installed from, or None"""
+    try:
+        with open(install_record_path(game_path), 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = os.path.join(archives_dir(), record.get("archive", ""))
+    return path if os.path.isfile(path) else None
+
+
+class HashCache:
+    """sha256 of files keyed by (size, mtime_ns) so unchanged files aren't read again.
+
+    Lookups go to the state store; new hashes are collected in memory and
+    written in one batch by save(), so worker threads don't contend on writes.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def get(self, path, stat_result):
+        path = os.path.abspath(path)
+        with self.lock:
+            entry = self.pending.get(path)
+        if entry is None:
+            entry = self.store.query_one("SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,))
+        if entry and entry[0] == stat_result.st_size and entry[1] == stat_result.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path, stat_result, sha256):
+        with self.lock:
+            self.pending[os.path.abspath(path)] = (stat_result.st_size, stat_result.st_mtime_ns, sha256)
+
+    def hash(self, path):
+        stat_result = os.stat(path)
+        sha256 = self.get(path, stat_result)
+        if sha256 is None:
+            sha256 = hash_file(path)
+            self.put(path, stat_result, sha256)
+        return sha256
+
+    def paths_with_hash(self, sha256):
+        """Paths last seen with this content (indexed lookup; check them before use)"""
+        with self.lock:
+            pending = [path for path, entry in self.pending.items() if entry[2] == sha256]
+        stored = [row[0] for row in self.store.query("SELECT path FROM file_hashes WHERE sha256 = ?", (sha256,))]
+        return pending + [path for path in stored if path not in pending]
+
+    def save(self):
+        with self.lock:
+            rows = [(path, *entry) for path, entry in self.pending.items()]
+            self.pending = {}
+        try:
+            self.store.execute_many("INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) "
+                                    "VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"Failed to save hash cache: {str(e)}")
+
+
+class VerifyReport:
+    def __init__(self):
+        self.missing = []
+        self.modified = []
+        self.extra = []
+        self.checked = 0
+
+    @property
+    def ok(self):
+        return not (self.missing or self.modified or self.extra)
+
+    @property
+    def repairable(self):
+        return sorted(self.missing + self.modified)
+
+    def summary(self):
+        return (f"Checked {self.checked} file(s): {len(self.missing)} missing, "
+                f"{len(self.modified)} modified, {len(self.extra)} extra")
+
+
+def verify(game_path, manifest, cache=None, workers=None):
+    """Compare the installed files of a game with a release manifest; a background disk job"""
+    with get_scheduler().disk_job("Verify BepInEx", BACKGROUND) as ticket:
+        return verify_files(game_path, manifest, cache or HashCache(), workers, ticket)
+
+
+def verify_files(game_path, manifest, cache, workers, ticket):
+    report = VerifyReport()
+
+    def check(name, expected):
+        path = os.path.join(game_path, *name.split('/'))
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return name, "missing"
+        # A size mismatch is enough, no need to read the file
+        if stat_result.st_size != expected["size"]:
+            return name, "modified"
+        sha256 = cache.get(path, stat_result)
+        if sha256 is None:
+            ticket.throttle(stat_result.st_size)
+            sha256 = hash_file(path)
+            cache.put(path, stat_result, sha256)
+        return name, None if sha256 == expected["sha256"] else "modified"
+
+    files = {name: expected for name, expected in manifest["files"].items()
+             if not name.startswith(USER_PREFIXES)}
+    with ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 2)) as executor:
+        for name, problem in executor.map(lambda item: check(*item), files.items()):
+            report.checked += 1
+            if problem == "missing":
+                report.missing.append(name)
+            elif problem == "modified":
+                report.modified.append(name)
+
+    for prefix in CORE_PREFIXES:
+        root = os.path.join(game_path, *prefix.strip('/').split('/'))
+        for dirpath, dirnames, filenames in os.walk(root):
+            for file_name in filenames:
+                relative = os.path.relpath(os.path.join(dirpath, file_name), game_path).replace(os.sep, '/')
+                if relative not in manifest["files"]:
+                    report.extra.append(relative)
+
+    report.missing.sort()
+    report.modified.sort()
+    report.extra.sort()
+    cache.save()
+    return report
+
+
+def repair(game_path, archive_path, names):
+    """Rewrite the given files from the cached archive without touching anything else"""
+    manifest = load_manifest(archive_path)
+    if manifest is None or hash_file(archive_path) != manifest["archive_sha256"]:
+        raise ValueError("The cached BepInEx archive is damaged, reinstall BepInEx instead")
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        members = {info.filename.replace('\\', '/'): info for info in zip_ref.infolist()}
+        for name in names:
+            if name not in manifest["files"] or name not in members:
+                continue
+            target = os.path.join(game_path, *name.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            atomic_write_bytes(target, zip_ref.read(members[name]))
+
+
+class VerifyThread(QThread):
+    verified = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_path, archive_path, parent=None):
+        super().__init__(parent)
+        self.game_path = game_path
+        self.archive_path = archive_path
+
+    def run(self):
+        try:
+            manifest = load_manifest(self.archive_path)
+            if manifest is None:
+                manifest = build_manifest(self.archive_path)
+            self.verified.emit(verify(self.game_path, manifest))
+        except Exception as e:
+            self.failed.emit(str(e))
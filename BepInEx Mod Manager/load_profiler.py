@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+from app_data import app_data_path, game_key
+from file_utils import atomic_write_text
+from bepinex_log import parse_line, parse_timestamp, LOADING_PATTERN
+
+PATCHER_LOADED_PATTERN = re.compile(r'^Loaded \d+ patcher methods? from \[(?P<name>.+?)(?: (?P<version>[\d.]+))?\]$')
+PATCHING_PATTERN = re.compile(r'^Patching \[(?P<target>.+?)\] with \[(?P<name>.+?)\]$')
+
+# Runs kept per game in the history file
+HISTORY_LIMIT = 50
+
+
+class ProfileEntry:
+    def __init__(self, kind, name, version=None, seconds=None):
+        self.kind = kind  # "plugin" or "patcher"
+        self.name = name
+        self.version = version
+        self.seconds = seconds
+
+    def to_json(self):
+        return {"kind": self.kind, "name": self.name, "version": self.version, "seconds": self.seconds}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["kind"], data["name"], data.get("version"), data.get("seconds"))
+
+
+class StartupProfile:
+    def __init__(self, recorded_at=None):
+        self.recorded_at = recorded_at or time.time()
+        self.timed = False
+        self.preloader_seconds = None
+        self.chainloader_seconds = None
+        self.total_seconds = None
+        self.complete = False
+        self.entries = []
+
+    def slowest(self):
+        """Entries ranked by load time, slowest first; untimed entries keep load order at the end"""
+        timed = sorted((e for e in self.entries if e.seconds is not None), key=lambda e: -e.seconds)
+        return timed + [e for e in self.entries if e.seconds is None]
+
+    def to_json(self):
+        return {"recorded_at": self.recorded_at, "timed": self.timed, "complete": self.complete,
+                "preloader_seconds": self.preloader_seconds, "chainloader_seconds": self.chainloader_seconds,
+                "total_seconds": self.total_seconds, "entries": [e.to_json() for e in self.entries]}
+
+    @classmethod
+    def from_json(cls, data):
+        profile = cls(data["recorded_at"])
+        profile.timed = data.get("timed", False)
+        profile.complete = data.get("complete", False)
+        profile.preloader_seconds = data.get("preloader_seconds")
+        profile.chainloader_seconds = data.get("chainloader_seconds")
+        profile.total_seconds = data.get("total_seconds")
+        profile.entries = [ProfileEntry.from_json(e) for e in data.get("entries", [])]
+        return profile
+
+
+def analyze(timed_lines):
+    """Attribute load time to patchers and plugins.
+
+    `timed_lines` is a sequence of (seconds or None, line).  The time between
+    one "Loading [Plugin]" (or "Patching [...] with [Patcher]") line and the
+    next milestone is charged to that plugin (or patcher), which includes
+    whatever it does in Awake.  Lines without a time only give the load order.
+    """
+    profile = StartupProfile()
+    current = None
+    current_start = None
+    first_time = None
+    preloader_start = chainloader_start = None
+    patchers = {}
+
+    def close(now):
+        nonlocal current, current_start
+        if current is not None and now is not None and current_start is not None:
+            current.seconds = (current.seconds or 0) + max(now - current_start, 0)
+        current, current_start = None, None
+
+    previous_time = None
+    for seconds, line in timed_lines:
+        record = parse_line(line)
+        if seconds is None and record is not None and record.timestamp:
+            seconds = parse_timestamp(record.timestamp)
+            # Log timestamps are wall-clock time of day; handle a run across midnight
+            if previous_time is not None and seconds < previous_time - 43200:
+                seconds += 86400
+        if seconds is not None:
+            previous_time = seconds
+            if first_time is None:
+                first_time = seconds
+            profile.timed = True
+        if record is None or record.source != "BepInEx":
+            continue
+
+        message = record.message.strip()
+        if message.startswith("Preloader started"):
+            preloader_start = seconds
+        elif message.startswith("Preloader finished"):
+            close(seconds)
+            if preloader_start is not None and seconds is not None:
+                profile.preloader_seconds = seconds - preloader_start
+        elif message.startswith("Chainloader started") or message.startswith("Chainloader initialized"):
+            close(seconds)
+            chainloader_start = seconds
+        elif message.startswith("Chainloader startup complete"):
+            close(seconds)
+            profile.complete = True
+            if chainloader_start is not None and seconds is not None:
+                profile.chainloader_seconds = seconds - chainloader_start
+            if first_time is not None and seconds is not None:
+                profile.total_seconds = seconds - first_time
+        else:
+            match = LOADING_PATTERN.match(message)
+            if match:
+                close(seconds)
+                current = ProfileEntry("plugin", match.group("name"), match.group("version"))
+                profile.entries.append(current)
+                current_start = seconds
+                continue
+
+            match = PATCHER_LOADED_PATTERN.match(message) or PATCHING_PATTERN.match(message)
+            if match:
+                close(seconds)
+                name = match.group("name")
+                if name not in patchers:
+                    version = match.groupdict().get("version")
+                    patchers[name] = ProfileEntry("patcher", name, version)
+                    profile.entries.append(patchers[name])
+                current = patchers[name]
+                current_start = seconds
+
+    return profile
+
+
+def analyze_log_file(log_path):
+    """Profile a LogOutput.log on disk, using any timestamps it contains"""
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+        return analyze((None, line.rstrip("\r\n")) for line in f)
+
+
+class ProfileHistory:
+    """Startup profiles of one game across launches, stored as JSON lines"""
+
+    def __init__(self, game_path):
+        self.path = app_data_path("startup_profiles", f"{game_key(game_path)}.jsonl")
+
+    def load(self):
+        """Recorded profiles, newest first"""
+        profiles = []
+        if not os.path.exists(self.path):
+            return profiles
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    profiles.append(StartupProfile.from_json(json.loads(line)))
+                except (ValueError, KeyError):
+                    pass
+        profiles.reverse()
+        return profiles
+
+    def add(self, profile):
+        profiles = list(reversed(self.load()[:HISTORY_LIMIT - 1]))
+        profiles.append(profile)
+        atomic_write_text(self.path, "".join(json.dumps(p.to_json()) + "\n" for p in profiles))
+
+    def averages(self):
+        """Average seconds per (kind, name) over all timed runs"""
+        totals = {}
+        for profile in self.load():
+            for entry in profile.entries:
+                if entry.seconds is not None:
+                    total, count = totals.get((entry.kind, entry.name), (0.0, 0))
+                    totals[(entry.kind, entry.name)] = (total + entry.seconds, count + 1)
+        return {key: total / count for key, (total, count) in totals.items()}
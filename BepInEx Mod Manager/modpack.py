@@ -0,0 +1,393 @@
+"""Modpack lockfiles: reproduce a BepInEx setup (release, plugins, enabled state, config) on another machine.
+
+A lockfile is JSON:
+
+    {
+      "format": 1,
+      "artifacts": {"<sha256>": {"url": "...", "path": "...", "size": 123}},
+      "bepinex": {"archive": "BepInEx_win_x64_5.4.23.2.zip", "artifact": "<sha256>"},
+      "plugins": {
+        "<folder>": {"files": {"Plugin.dll": {"sha256": "...", "artifact": "<sha256>", "enabled": true,
+                                              "member": "BepInEx/plugins/Plugin.dll"},
+                               "Plugin.assets": {"sha256": "...", "artifact": "<sha256>"}}}
+      },
+      "config": {"BepInEx.cfg": {"Logging.Console": {"Enabled": "true"}}}
+    }
+
+Artifacts are the downloadable files (a zip or a single DLL) addressed by
+their sha256; "path" is relative to the lockfile.  "member" picks a file out
+of a zip artifact.  "enabled" applies to DLLs only: a disabled DLL is kept as
+<name>.dll.bak (older lockfiles set it once per folder).  Applying only writes what differs from the game folder,
+so re-applying to a synced game is a handful of stat calls.
+
+    python modpack.py apply <lockfile> <game folder> [--prune]
+    python modpack.py export <game folder> <pack folder>
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import zipfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from app_data import app_data_dir
+from file_utils import atomic_write_bytes, atomic_write_text
+from cfg_parser import read_config
+from transfer_scheduler import get_scheduler
+import integrity
+
+FORMAT_VERSION = 1
+LOCKFILE_NAME = "modpack.json"
+FETCH_WORKERS = 4
+
+
+class ModpackError(Exception):
+    pass
+
+
+class ApplyResult:
+    def __init__(self):
+        self.fetched = 0
+        self.written = []
+        self.renamed = []
+        self.removed = []
+        self.config_changes = 0
+
+    @property
+    def changed(self):
+        return bool(self.written or self.renamed or self.removed or self.config_changes)
+
+    def summary(self):
+        if not self.changed:
+            return "Already up to date"
+        return (f"Downloaded {self.fetched} artifact(s), wrote {len(self.written)} file(s), "
+                f"toggled {len(self.renamed)} plugin file(s), removed {len(self.removed)} folder(s), "
+                f"changed {self.config_changes} setting(s)")
+
+
+def safe_relative(name):
+    """Reject names that would escape the folder they are written into"""
+    parts = name.replace('\\', '/').split('/')
+    if not name or name.startswith('/') or ':' in parts[0] or '..' in parts or '' in parts:
+        raise ModpackError(f"Invalid path in lockfile: {name}")
+    return os.path.join(*parts)
+
+
+def load_lockfile(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        lock = json.load(f)
+    if lock.get("format") != FORMAT_VERSION:
+        raise ModpackError(f"Unsupported modpack format: {lock.get('format')}")
+    return lock
+
+
+def save_lockfile(path, lock):
+    atomic_write_text(path, json.dumps(lock, indent=1, sort_keys=True))
+
+
+class ArtifactStore:
+    """Content-addressed cache of modpack artifacts in the app data folder"""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(app_data_dir(), "artifacts")
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def has(self, sha256):
+        return os.path.isfile(self.path(sha256))
+
+    def add_file(self, source_path, sha256=None):
+        sha256 = sha256 or integrity.hash_file(source_path)
+        target = self.path(sha256)
+        if not os.path.isfile(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            partial = f"{target}.{os.getpid()}.part"
+            shutil.copyfile(source_path, partial)
+            os.replace(partial, target)
+        return sha256
+
+    def fetch(self, sha256, spec, base_dir):
+        """Copy or download one artifact, checking its hash before it enters the store"""
+        target = self.path(sha256)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}.part"
+        try:
+            local = os.path.join(base_dir, safe_relative(spec["path"])) if spec.get("path") else None
+            if local and os.path.isfile(local):
+                shutil.copyfile(local, partial)
+            elif spec.get("url"):
+                import requests
+                with get_scheduler().transfer(spec["url"]) as ticket, \
+                        requests.get(spec["url"], stream=True, timeout=60) as response:
+                    response.raise_for_status()
+                    with open(partial, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            ticket.throttle(len(chunk))
+                            f.write(chunk)
+            else:
+                raise ModpackError(f"Artifact {sha256[:12]} has no reachable source")
+
+            actual = integrity.hash_file(partial)
+            if actual != sha256:
+                raise ModpackError(f"Hash mismatch for artifact {spec.get('url') or spec.get('path')}")
+            os.replace(partial, target)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return target
+
+    def fetch_missing(self, lock, base_dir, workers=FETCH_WORKERS):
+        referenced = referenced_artifacts(lock)
+        missing = {sha: spec for sha, spec in lock.get("artifacts", {}).items()
+                   if sha in referenced and not self.has(sha)}
+        unknown = referenced - set(lock.get("artifacts", {}))
+        if unknown:
+            raise ModpackError(f"Lockfile references {len(unknown)} artifact(s) without a source")
+        if not missing:
+            return 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.fetch, sha, spec, base_dir) for sha, spec in missing.items()]
+            for future in futures:
+                future.result()
+        return len(missing)
+
+    def read(self, sha256, member=None):
+        path = self.path(sha256)
+        if member is None:
+            with open(path, 'rb') as f:
+                return f.read()
+        with zipfile.ZipFile(path, 'r') as zip_ref:
+            try:
+                return zip_ref.read(member)
+            except KeyError:
+                raise ModpackError(f"{member} is not in artifact {sha256[:12]}")
+
+
+def referenced_artifacts(lock):
+    shas = set()
+    if lock.get("bepinex"):
+        shas.add(lock["bepinex"]["artifact"])
+    for plugin in lock.get("plugins", {}).values():
+        for spec in plugin["files"].values():
+            shas.add(spec["artifact"])
+    return shas
+
+
+def apply_bepinex(game_path, spec, store, cache, result):
+    """Bring the BepInEx release files in line with the locked archive"""
+    archive_path = os.path.join(integrity.archives_dir(), os.path.basename(spec["archive"]))
+    if not os.path.isfile(archive_path):
+        store_path = store.path(spec["artifact"])
+        shutil.copyfile(store_path, archive_path + ".part")
+        os.replace(archive_path + ".part", archive_path)
+    manifest = integrity.load_manifest(archive_path) or integrity.build_manifest(archive_path, spec["artifact"])
+
+    report = integrity.verify(game_path, manifest, cache)
+    names = report.repairable
+    # Files BepInEx or the user edit (e.g. config) are only created, never reverted
+    names += [name for name in manifest["files"] if name.startswith(integrity.USER_PREFIXES)
+              and not os.path.exists(os.path.join(game_path, safe_relative(name)))]
+    if names:
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            for name in names:
+                target = os.path.join(game_path, safe_relative(name))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                atomic_write_bytes(target, zip_ref.read(name))
+                result.written.append(name)
+    if names or integrity.installed_archive(game_path) != archive_path:
+        integrity.record_install(game_path, archive_path)
+
+
+def plugin_file_paths(folder_path, name, spec, folder_enabled=True):
+    """(where a locked plugin file belongs, where its other enabled state would be or None)"""
+    target = os.path.join(folder_path, safe_relative(name))
+    if not name.endswith(".dll"):
+        # Only DLLs are disabled by renaming; data files stay as they are
+        return target, None
+    if spec.get("enabled", folder_enabled):
+        return target, target + ".bak"
+    return target + ".bak", target
+
+
+def apply_plugin(plugins_path, folder, plugin, store, cache, result):
+    folder_path = os.path.join(plugins_path, safe_relative(folder))
+    for name, spec in plugin["files"].items():
+        wanted, other = plugin_file_paths(folder_path, name, spec, plugin.get("enabled", True))
+
+        # Already in place with the right content
+        if os.path.isfile(wanted) and cache.hash(wanted) == spec["sha256"]:
+            if other and os.path.exists(other):
+                os.remove(other)
+            continue
+        # Right content, only the enabled state differs
+        if other and os.path.isfile(other) and cache.hash(other) == spec["sha256"]:
+            os.replace(other, wanted)
+            result.renamed.append(f"{folder}/{name}")
+            continue
+
+        data = store.read(spec["artifact"], spec.get("member"))
+        if hashlib.sha256(data).hexdigest() != spec["sha256"]:
+            raise ModpackError(f"{folder}/{name} does not match its hash in the lockfile")
+        os.makedirs(os.path.dirname(wanted), exist_ok=True)
+        atomic_write_bytes(wanted, data)
+        if other and os.path.exists(other):
+            os.remove(other)
+        result.written.append(f"{folder}/{name}")
+
+
+def apply_config(config_path, overrides, result):
+    for file_name, sections in overrides.items():
+        path = os.path.join(config_path, safe_relative(file_name))
+        if not os.path.isfile(path):
+            # BepInEx and plugins write their config on first run; the overrides apply after that
+            continue
+        config = read_config(path)
+        for section, values in sections.items():
+            for key, value in values.items():
+                entry = config.get(section, key)
+                if entry is not None and entry.value != value:
+                    entry.value = value
+                    result.config_changes += 1
+        if config.dirty:
+            config.save()
+
+
+def apply(lockfile_path, game_path, prune=False, store=None, cache=None):
+    """Make the game folder match the lockfile, writing only what differs"""
+    lock = load_lockfile(lockfile_path)
+    store = store or ArtifactStore()
+    cache = cache or integrity.HashCache()
+    result = ApplyResult()
+    result.fetched = store.fetch_missing(lock, os.path.dirname(os.path.abspath(lockfile_path)))
+
+    if lock.get("bepinex"):
+        apply_bepinex(game_path, lock["bepinex"], store, cache, result)
+
+    plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+    plugins = lock.get("plugins", {})
+    for folder, plugin in plugins.items():
+        apply_plugin(plugins_path, folder, plugin, store, cache, result)
+
+    if prune and os.path.isdir(plugins_path):
+        for name in os.listdir(plugins_path):
+            if name not in plugins and os.path.isdir(os.path.join(plugins_path, name)):
+                shutil.rmtree(os.path.join(plugins_path, name))
+                result.removed.append(name)
+
+    apply_config(os.path.join(game_path, "BepInEx", "config"), lock.get("config", {}), result)
+    cache.save()
+    return result
+
+
+def export(game_path, pack_dir, store=None, cache=None):
+    """Write a lockfile and its artifacts for the current setup of a game"""
+    store = store or ArtifactStore()
+    cache = cache or integrity.HashCache()
+    artifacts_dir = os.path.join(pack_dir, "artifacts")
+    os.makedirs(artifacts_dir, exist_ok=True)
+    lock = {"format": FORMAT_VERSION, "artifacts": {}, "plugins": {}, "config": {}}
+
+    def add_artifact(source_path):
+        sha256 = cache.hash(source_path)
+        relative = f"artifacts/{sha256}{os.path.splitext(source_path)[1]}"
+        target = os.path.join(pack_dir, relative)
+        if not os.path.exists(target):
+            shutil.copyfile(source_path, target)
+        store.add_file(source_path, sha256)
+        lock["artifacts"][sha256] = {"path": relative, "size": os.path.getsize(source_path)}
+        return sha256
+
+    archive_path = integrity.installed_archive(game_path)
+    if archive_path is not None:
+        lock["bepinex"] = {"archive": os.path.basename(archive_path), "artifact": add_artifact(archive_path)}
+
+    plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+    if os.path.isdir(plugins_path):
+        for folder in sorted(os.listdir(plugins_path)):
+            folder_path = os.path.join(plugins_path, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            files = {}
+            for dirpath, dirnames, filenames in os.walk(folder_path):
+                for file_name in filenames:
+                    path = os.path.join(dirpath, file_name)
+                    name = os.path.relpath(path, folder_path).replace(os.sep, '/')
+                    sha256 = add_artifact(path)
+                    spec = {"sha256": sha256, "artifact": sha256}
+                    if name.endswith(".dll.bak"):
+                        name = name[:-len(".bak")]
+                        spec["enabled"] = False
+                    elif name.endswith(".dll"):
+                        spec["enabled"] = True
+                    # Applying the lockfile to this game must leave every file where it is
+                    if name in files:
+                        raise ModpackError(f"{folder}/{name} is there both enabled and disabled; remove one copy")
+                    if plugin_file_paths(folder_path, name, spec)[0] != path:
+                        raise ModpackError(f"{folder}/{name} can't be reproduced from a lockfile")
+                    files[name] = spec
+            if files:
+                lock["plugins"][folder] = {"files": files}
+
+    config_path = os.path.join(game_path, "BepInEx", "config")
+    if os.path.isdir(config_path):
+        for file_name in sorted(os.listdir(config_path)):
+            if not file_name.endswith(".cfg"):
+                continue
+            overrides = {}
+            for entry in read_config(os.path.join(config_path, file_name)).entries():
+                if entry.default_value is not None and entry.value != entry.default_value:
+                    overrides.setdefault(entry.section, {})[entry.key] = entry.value
+            if overrides:
+                lock["config"][file_name] = overrides
+
+    lockfile_path = os.path.join(pack_dir, LOCKFILE_NAME)
+    save_lockfile(lockfile_path, lock)
+    cache.save()
+    return lockfile_path
+
+
+class ModpackThread(QThread):
+    """Run apply or export off the GUI thread"""
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, function, *args, parent=None):
+        super().__init__(parent)
+        self.function = function
+        self.args = args
+
+    def run(self):
+        try:
+            self.done.emit(self.function(*self.args))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or export BepInEx modpack lockfiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    apply_parser = commands.add_parser("apply", help="make a game match a lockfile")
+    apply_parser.add_argument("lockfile")
+    apply_parser.add_argument("game_path")
+    apply_parser.add_argument("--prune", action="store_true", help="remove plugin folders not in the lockfile")
+    export_parser = commands.add_parser("export", help="write a lockfile for a game")
+    export_parser.add_argument("game_path")
+    export_parser.add_argument("pack_dir")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "apply":
+            print(apply(args.lockfile, args.game_path, prune=args.prune).summary())
+        else:
+            print(f"Wrote {export(args.game_path, args.pack_dir)}")
+    except (OSError, ValueError, ModpackError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+import os
+import re
+import json
+import time
+import codecs
+import shutil
+import tempfile
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QThread, pyqtSignal
+from app_data import app_data_dir
+from state_store import get_store
+from settings import get_setting
+from dedupe import PluginStore
+from file_utils import atomic_write_text
+from transfer_scheduler import get_scheduler, INTERACTIVE
+import fast_extract
+
+CHUNK_SIZE = 256 * 1024
+BATCH_SIZE = 500
+WHITESPACE = re.compile(r'\s*')
+
+# Packages that provide BepInEx itself; the manager installs that on its own
+LOADER_PACKAGES = ("BepInEx-BepInExPack",)
+
+# Files at the top of a package that describe it rather than belong to the mod
+PACKAGE_METADATA = ("icon.png", "readme.md", "changelog.md")
+
+# Written next to a package's manifest.json: the files the installed version put in place
+INSTALLED_FILES = "installed_files.json"
+
+
+def index_url(community=None, base_url=None):
+    base_url = (base_url or get_setting("package_source_url")).rstrip('/')
+    if community:
+        return f"{base_url}/c/{community}/api/v1/package/"
+    return f"{base_url}/api/v1/package/"
+
+
+def iter_json_array(chunks):
+    """Yield the elements of a top-level JSON array from an iterable of byte chunks.
+
+    Only the element being decoded is kept in memory, not the whole document.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Package index is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ',':
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                break
+            if end == len(buffer) and not isinstance(element, (dict, list)):
+                # A number may continue in the next chunk too
+                break
+            pos = end
+            yield element
+    raise ValueError("Package index ended unexpectedly")
+
+
+def package_rows(source, package):
+    """(package row, dependency rows) of the latest version of an index entry"""
+    versions = package.get("versions") or []
+    if not versions:
+        return None, []
+    latest = versions[0]
+    full_name = package["full_name"]
+    row = (source, full_name, package.get("owner", ""), package.get("name", ""),
+           latest.get("version_number", ""), latest.get("description", ""), latest.get("download_url", ""),
+           latest.get("file_size", 0), sum(version.get("downloads", 0) for version in versions),
+           1 if package.get("is_deprecated") else 0)
+    dependencies = {dependency_name(dependency) for dependency in latest.get("dependencies", [])}
+    return row, [(source, full_name, dependency) for dependency in sorted(dependencies)]
+
+
+def dependency_name(dependency):
+    """'Owner-Name-1.2.3' -> 'Owner-Name'; any version of a dependency is accepted"""
+    return dependency.rsplit('-', 1)[0] if dependency.count('-') >= 2 else dependency
+
+
+class Catalog:
+    """Packages of one index, stored in the state store.
+
+    update() downloads the index only when its ETag changed and streams it
+    into temporary tables; the catalog is swapped in one transaction, so
+    searches never see a half-imported index.
+    """
+
+    def __init__(self, source, store=None):
+        self.source = source
+        self.store = store or get_store()
+
+    def fetched_at(self):
+        row = self.store.query_one("SELECT fetched_at FROM catalog_sources WHERE url = ?", (self.source,))
+        return row[0] if row else None
+
+    def update(self, progress=None):
+        """Refresh from the server; returns the number of packages or None when it was unchanged"""
+        row = self.store.query_one("SELECT etag FROM catalog_sources WHERE url = ?", (self.source,))
+        headers = {"If-None-Match": row[0]} if row and row[0] else {}
+        with get_scheduler().transfer(self.source) as ticket, \
+                requests.get(self.source, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                self.store.execute("UPDATE catalog_sources SET fetched_at = ? WHERE url = ?",
+                                   (time.time(), self.source))
+                return None
+            response.raise_for_status()
+            count = self.import_stream(throttled(response.iter_content(chunk_size=CHUNK_SIZE), ticket), progress)
+            etag = response.headers.get("ETag")
+        self.store.execute("INSERT OR REPLACE INTO catalog_sources (url, etag, fetched_at) VALUES (?, ?, ?)",
+                           (self.source, etag, time.time()))
+        return count
+
+    def import_stream(self, chunks, progress=None):
+        connection = self.store.connection()
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS staged_packages AS SELECT * FROM packages WHERE 0")
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS staged_dependencies "
+                           "AS SELECT * FROM package_dependencies WHERE 0")
+        connection.execute("DELETE FROM staged_packages")
+        connection.execute("DELETE FROM staged_dependencies")
+
+        def flush(packages, dependencies):
+            # Only the temp database is written, so this doesn't block other writers
+            connection.execute("BEGIN")
+            connection.executemany("INSERT INTO staged_packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   packages)
+            connection.executemany("INSERT INTO staged_dependencies VALUES (?, ?, ?)", dependencies)
+            connection.execute("COMMIT")
+
+        count = 0
+        packages, dependencies = [], []
+        for package in iter_json_array(chunks):
+            row, rows = package_rows(self.source, package)
+            if row is None:
+                continue
+            packages.append(row)
+            dependencies += rows
+            count += 1
+            if len(packages) >= BATCH_SIZE:
+                flush(packages, dependencies)
+                packages, dependencies = [], []
+                if progress:
+                    progress(count)
+        flush(packages, dependencies)
+
+        with self.store.transaction() as transaction:
+            transaction.execute("DELETE FROM packages WHERE source = ?", (self.source,))
+            transaction.execute("DELETE FROM package_dependencies WHERE source = ?", (self.source,))
+            transaction.execute("INSERT OR REPLACE INTO packages SELECT * FROM staged_packages")
+            transaction.execute("INSERT OR IGNORE INTO package_dependencies SELECT * FROM staged_dependencies")
+        connection.execute("DELETE FROM staged_packages")
+        connection.execute("DELETE FROM staged_dependencies")
+        return count
+
+    def search(self, text="", owner=None, depends_on=None, include_deprecated=False, limit=200):
+        """Packages whose name or author contains text, most downloaded first"""
+        sql = ["SELECT full_name, owner, name, version, description, downloads FROM packages WHERE source = ?"]
+        parameters = [self.source]
+        if text:
+            sql.append("AND (name LIKE ? OR owner LIKE ?)")
+            parameters += [f"%{text}%", f"%{text}%"]
+        if owner:
+            sql.append("AND owner = ? COLLATE NOCASE")
+            parameters.append(owner)
+        if depends_on:
+            sql.append("AND full_name IN (SELECT package FROM package_dependencies "
+                       "WHERE source = ? AND dependency = ? COLLATE NOCASE)")
+            parameters += [self.source, depends_on]
+        if not include_deprecated:
+            sql.append("AND NOT deprecated")
+        sql.append("ORDER BY downloads DESC LIMIT ?")
+        parameters.append(limit)
+        return self.store.query(" ".join(sql), parameters)
+
+    def package(self, full_name):
+        return self.store.query_one("SELECT full_name, version, download_url, file_size FROM packages "
+                                    "WHERE source = ? AND full_name = ?", (self.source, full_name))
+
+    def dependencies(self, full_name):
+        return [row[0] for row in self.store.query(
+            "SELECT dependency FROM package_dependencies WHERE source = ? AND package = ?", (self.source, full_name))]
+
+    def resolve(self, full_names):
+        """The packages to install for full_names, with all their dependencies, and the unknown dependencies"""
+        resolved, missing = {}, []
+        pending = list(full_names)
+        while pending:
+            full_name = pending.pop()
+            if full_name in resolved or full_name.startswith(LOADER_PACKAGES):
+                continue
+            package = self.package(full_name)
+            if package is None:
+                missing.append(full_name)
+                continue
+            resolved[package[0]] = package
+            pending += self.dependencies(package[0])
+        return list(resolved.values()), sorted(set(missing))
+
+
+def plain_name(value, what):
+    """A name or version from the index that is safe to use as a single path component"""
+    if not isinstance(value, str) or not value or value in (".", "..") or \
+            os.path.basename(value) != value or "/" in value or "\\" in value:
+        raise ValueError(f"Invalid {what} in the package index: {value!r}")
+    return value
+
+
+def packages_dir():
+    path = os.path.join(app_data_dir(), "packages")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def throttled(chunks, ticket):
+    """Pass chunks through, pacing them with a transfer scheduler ticket"""
+    for chunk in chunks:
+        ticket.throttle(len(chunk))
+        yield chunk
+
+
+def download_package(full_name, version, download_url, priority=INTERACTIVE):
+    """Path of the package archive, downloaded unless an earlier download is still there"""
+    path = os.path.join(packages_dir(), f"{plain_name(full_name, 'package name')}-{plain_name(version, 'version')}.zip")
+    if os.path.exists(path):
+        return path
+    partial_path = f"{path}.{os.getpid()}.part"
+    with get_scheduler().transfer(download_url, priority, name=full_name) as ticket, \
+            requests.get(download_url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(partial_path, 'wb') as f:
+            for chunk in throttled(response.iter_content(chunk_size=CHUNK_SIZE), ticket):
+                f.write(chunk)
+    os.replace(partial_path, path)
+    return path
+
+
+def installed_version(game_path, full_name):
+    try:
+        with open(os.path.join(game_path, "BepInEx", "plugins", full_name, "manifest.json"), 'r',
+                  encoding='utf-8-sig') as f:
+            return json.load(f).get("version_number")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def installed_versions(game_path):
+    """{full name: version} of the packages installed in a game"""
+    versions = {}
+    plugins_path = os.path.join(game_path, "BepInEx", "plugins")
+    try:
+        names = os.listdir(plugins_path)
+    except OSError:
+        return versions
+    for name in names:
+        if os.path.isfile(os.path.join(plugins_path, name, "manifest.json")):
+            version = installed_version(game_path, name)
+            if version is not None:
+                versions[name] = version
+    return versions
+
+
+def package_destination(full_name, name):
+    """Where a package member goes under BepInEx/, following the Thunderstore layout"""
+    parts = [part for part in name.split('/') if part]
+    if parts and parts[0].lower() == "bepinex":
+        parts = parts[1:]
+    if not parts or name.endswith('/'):
+        return None
+    if len(parts) == 1 and parts[0].lower() in PACKAGE_METADATA:
+        return None
+    folder = parts[0].lower()
+    if folder in ("plugins", "patchers") and len(parts) > 1:
+        return os.path.join(folder, full_name, *parts[1:])
+    if folder == "config" and len(parts) > 1:
+        return os.path.join("config", *parts[1:])
+    return os.path.join("plugins", full_name, *parts)
+
+
+def install_package(game_path, full_name, archive_path, store):
+    """Install a package archive into the game's BepInEx folder; returns the number of files written"""
+    plain_name(full_name, "package name")
+    with get_scheduler().disk_job(f"Install {full_name}"):
+        return install_package_files(game_path, full_name, archive_path, store)
+
+
+def installed_files_path(bepinex_path, full_name):
+    return os.path.join(bepinex_path, "plugins", full_name, INSTALLED_FILES)
+
+
+def load_installed_files(bepinex_path, full_name):
+    """Paths under BepInEx/ (with '/') the installed version of a package wrote; empty if unknown"""
+    try:
+        with open(installed_files_path(bepinex_path, full_name), 'r', encoding='utf-8') as f:
+            files = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if not isinstance(files, list):
+        return []
+    # Only ever files in the package's own folders, whatever the record says
+    owned = (f"plugins/{full_name}/", f"patchers/{full_name}/")
+    return [name for name in files if isinstance(name, str) and name.startswith(owned)
+            and "\\" not in name and ":" not in name and not {"", ".", ".."} & set(name.split('/'))]
+
+
+def install_package_files(game_path, full_name, archive_path, store):
+    bepinex_path = os.path.join(game_path, "BepInEx")
+    previous = load_installed_files(bepinex_path, full_name)
+    temp_dir = tempfile.mkdtemp(prefix="bepinex_package_")
+    try:
+        fast_extract.extract(archive_path, temp_dir, lambda name: package_destination(full_name, name), workers=2)
+        written = []
+        for dirpath, dirnames, filenames in os.walk(temp_dir):
+            for file_name in filenames:
+                source = os.path.join(dirpath, file_name)
+                relative = os.path.relpath(source, temp_dir)
+                target = os.path.join(bepinex_path, relative)
+                if relative.split(os.sep)[0] == "config" and os.path.exists(target):
+                    # Keep the user's settings
+                    continue
+                # A plugin the user disabled stays disabled after an update
+                if os.path.exists(target + ".bak"):
+                    target += ".bak"
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                store.import_file(source, target)
+                written.append(relative.replace(os.sep, '/'))
+
+        # Files the previous version installed that the new one no longer ships; files the mod
+        # or the user created in the package folders are left alone
+        current = {os.path.normcase(name) for name in written}
+        for name in previous:
+            if os.path.normcase(name) in current:
+                continue
+            path = os.path.join(bepinex_path, *name.split('/'))
+            for stale in (path, path + ".bak"):
+                if os.path.isfile(stale):
+                    os.remove(stale)
+        record_path = installed_files_path(bepinex_path, full_name)
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+        atomic_write_text(record_path, json.dumps(sorted(written), indent=1))
+        return len(written)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class InstallReport:
+    def __init__(self):
+        self.installed = []
+        self.skipped = []
+        self.missing = []
+        self.errors = []
+
+
+def install_packages(game_path, catalog, full_names, workers=4, progress=None):
+    """Install packages and their dependencies, downloading and extracting several at once"""
+    report = InstallReport()
+    packages, report.missing = catalog.resolve(full_names)
+    store = PluginStore()
+
+    def install(package):
+        full_name, version, download_url, file_size = package
+        if installed_version(game_path, full_name) == version:
+            return full_name, "skipped", None
+        try:
+            archive_path = download_package(full_name, version, download_url)
+            install_package(game_path, full_name, archive_path, store)
+            return full_name, "installed", None
+        except Exception as e:
+            return full_name, "error", str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for full_name, outcome, error in executor.map(install, packages):
+            if outcome == "installed":
+                report.installed.append(full_name)
+            elif outcome == "skipped":
+                report.skipped.append(full_name)
+            else:
+                report.errors.append(f"{full_name}: {error}")
+            if progress:
+                progress(full_name)
+    store.save()
+    return report
+
+
+class CatalogThread(QThread):
+    progress = pyqtSignal(int)
+    updated = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+
+    def run(self):
+        try:
+            self.updated.emit(Catalog(self.source).update(self.progress.emit))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class PackageInstallThread(QThread):
+    progress = pyqtSignal(str)
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, game_path, source, full_names, parent=None):
+        super().__init__(parent)
+        self.game_path = game_path
+        self.source = source
+        self.full_names = list(full_names)
+
+    def run(self):
+        try:
+            self.done.emit(install_packages(self.game_path, Catalog(self.source), self.full_names,
+                                            progress=self.progress.emit))
+        except Exception as e:
+            self.failed.emit(str(e))
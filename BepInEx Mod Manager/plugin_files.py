@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import fast_extract
+
+# The file side of the Plugins tab, shared with the daemon: plugins live in
+# BepInEx/plugins/<folder>/, a disabled DLL is renamed to <name>.dll.bak.
+
+
+def plugin_folders(plugins_path):
+    """[(folder, [(file name, enabled)])] sorted like the Plugins tab"""
+    try:
+        names = sorted((f for f in os.listdir(plugins_path) if os.path.isdir(os.path.join(plugins_path, f))),
+                       key=str.lower)
+    except OSError:
+        return []
+    folders = []
+    for name in names:
+        try:
+            files = sorted((f for f in os.listdir(os.path.join(plugins_path, name))
+                            if f.endswith(".dll") or f.endswith(".bak")), key=str.lower)
+        except OSError:
+            files = []
+        folders.append((name, [(f, f.endswith(".dll")) for f in files]))
+    return folders
+
+
+def folder_records(plugins_path, folder):
+    """(folder, file, enabled, size, mtime_ns) of a folder's plugin files, as game_cache.save_plugins takes them"""
+    records = []
+    try:
+        names = os.listdir(os.path.join(plugins_path, folder))
+    except OSError:
+        return records
+    for file_name in names:
+        if not (file_name.endswith(".dll") or file_name.endswith(".bak")):
+            continue
+        try:
+            st = os.stat(os.path.join(plugins_path, folder, file_name))
+        except OSError:
+            continue
+        records.append((folder, file_name, file_name.endswith(".dll"), st.st_size, st.st_mtime_ns))
+    return records
+
+
+def set_plugin_enabled(path, enabled):
+    """Enable (Name.dll.bak -> Name.dll) or disable a plugin file; returns its new path"""
+    if enabled and path.endswith(".bak"):
+        new_path = path[:-len(".bak")]
+    elif not enabled and path.endswith(".dll"):
+        new_path = path + ".bak"
+    else:
+        return path
+    os.rename(path, new_path)
+    return new_path
+
+
+def import_plugin_files(plugins_path, plugin_name, files, store):
+    """Install .dll files and the DLLs inside .zip files into plugins/<plugin_name>.
+
+    Returns (number of DLLs installed, warnings for archives that failed or had no DLLs).
+    """
+    plugin_folder = os.path.join(plugins_path, plugin_name)
+    os.makedirs(plugin_folder, exist_ok=True)
+
+    dll_count = 0
+    warnings = []
+    for file_path in files:
+        if file_path.endswith('.dll'):
+            store.import_file(file_path, os.path.join(plugin_folder, os.path.basename(file_path)))
+            dll_count += 1
+        elif file_path.endswith('.zip'):
+            count, warning = import_zip(file_path, plugin_folder, store)
+            dll_count += count
+            if warning:
+                warnings.append(warning)
+    return dll_count, warnings
+
+
+def import_zip(zip_path, plugin_folder, store):
+    """Install the DLLs of a zip (including those in subfolders); returns (count, warning or None)"""
+    extracted_count = 0
+    temp_dir = tempfile.mkdtemp(prefix="bepinex_plugin_")
+
+    try:
+        # Extract all DLL files in parallel
+        dll_paths = fast_extract.extract(zip_path, temp_dir,
+                                         lambda name: name if name.endswith('.dll') else None)
+
+        if not dll_paths:
+            return 0, f"No DLL files found in {os.path.basename(zip_path)}"
+
+        for temp_path in sorted(dll_paths):
+            # Get just the filename without any path
+            dll_filename = os.path.basename(temp_path)
+            dest_path = os.path.join(plugin_folder, dll_filename)
+
+            # If the file already exists, add a number to the filename
+            if os.path.exists(dest_path):
+                base_name, ext = os.path.splitext(dll_filename)
+                counter = 1
+                while os.path.exists(os.path.join(plugin_folder, f"{base_name}_{counter}{ext}")):
+                    counter += 1
+                dest_path = os.path.join(plugin_folder, f"{base_name}_{counter}{ext}")
+
+            store.import_file(temp_path, dest_path)
+            extracted_count += 1
+
+        return extracted_count, None
+
+    except Exception as e:
+        return extracted_count, f"Failed to extract ZIP file: {str(e)}"
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
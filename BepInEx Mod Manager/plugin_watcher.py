@@ -0,0 +1,131 @@
+import os
+import time
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+
+class PluginWatcher(QObject):
+    """Watch BepInEx/plugins and report which plugin folders changed.
+
+    Events are collected into a set of dirty folder names and flushed after
+    the directory has been quiet for `debounce_ms`, or after `max_delay_ms`
+    at the latest so a long batch import still shows progress.  When the
+    native watcher (inotify / ReadDirectoryChangesW) can't be used, the
+    directory mtimes are polled instead.
+    """
+    folders_changed = pyqtSignal(list)
+
+    def __init__(self, plugins_path, debounce_ms=250, max_delay_ms=2000, poll_interval_ms=2000, parent=None):
+        super().__init__(parent)
+        self.plugins_path = os.path.normpath(plugins_path)
+        self.max_delay_ms = max_delay_ms
+        self.pending = set()
+        self.pending_since = None
+        self.known_folders = set()
+        self.snapshot = {}
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(debounce_ms)
+        self.debounce_timer.timeout.connect(self.flush)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(poll_interval_ms)
+        self.poll_timer.timeout.connect(self.poll)
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+        self.polling = False
+
+    def start(self):
+        """Start watching; falls back to polling if the native watcher refuses the path"""
+        self.known_folders = set(self.list_folders())
+        if self.watcher.addPath(self.plugins_path):
+            for name in self.known_folders:
+                self.watch_folder(name)
+        else:
+            self.start_polling()
+
+    def stop(self):
+        self.debounce_timer.stop()
+        self.poll_timer.stop()
+        paths = self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def start_polling(self):
+        self.polling = True
+        paths = self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.snapshot = self.take_snapshot()
+        self.poll_timer.start()
+
+    def list_folders(self):
+        try:
+            with os.scandir(self.plugins_path) as entries:
+                return [entry.name for entry in entries if entry.is_dir()]
+        except OSError:
+            return []
+
+    def watch_folder(self, name):
+        # Running out of inotify watches is the usual reason this fails
+        if not self.watcher.addPath(os.path.join(self.plugins_path, name)):
+            self.start_polling()
+
+    def on_directory_changed(self, path):
+        path = os.path.normpath(path)
+        if path == self.plugins_path:
+            current = set(self.list_folders())
+            added = current - self.known_folders
+            removed = self.known_folders - current
+            self.known_folders = current
+            if not self.polling:
+                for name in added:
+                    self.watch_folder(name)
+            self.mark_dirty(added | removed)
+        else:
+            self.mark_dirty({os.path.basename(path)})
+
+    def take_snapshot(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.plugins_path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        snapshot[entry.name] = entry.stat().st_mtime_ns
+        except OSError:
+            pass
+        return snapshot
+
+    def poll(self):
+        """Compare folder mtimes with the previous poll; a changed mtime means entries were added/removed/renamed"""
+        snapshot = self.take_snapshot()
+        changed = {name for name in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(name) != self.snapshot.get(name)}
+        self.snapshot = snapshot
+        self.known_folders = set(snapshot)
+        if changed:
+            self.mark_dirty(changed)
+
+    def mark_dirty(self, names):
+        if not names:
+            return
+        self.pending.update(names)
+        now = time.monotonic()
+        if self.pending_since is None:
+            self.pending_since = now
+
+        if (now - self.pending_since) * 1000 >= self.max_delay_ms:
+            self.flush()
+        else:
+            self.debounce_timer.start()
+
+    def flush(self):
+        self.debounce_timer.stop()
+        if not self.pending:
+            return
+        names = sorted(self.pending)
+        self.pending = set()
+        self.pending_since = None
+        self.folders_changed.emit(names)
@@ -0,0 +1,37 @@
+import json
+from state_store import get_store
+
+DEFAULTS = {
+    # How long an uninstalled BepInEx stays in the game's trash folder before it is deleted
+    "trash_grace_seconds": 600,
+    # Thunderstore-compatible server the package catalog is fetched from
+    "package_source_url": "https://thunderstore.io",
+    # Transfer scheduler: concurrent downloads overall and per server, concurrent disk-heavy jobs
+    "max_connections": 8,
+    "connections_per_host": 4,
+    "disk_jobs": 2,
+    # Download bandwidth limit in KiB/s, 0 for none
+    "bandwidth_limit_kbps": 0,
+    # While a game launched from the manager runs, background work is paced to this rate (KiB/s)
+    # and disk jobs run one at a time
+    "low_io_while_playing": True,
+    "low_io_rate_kbps": 4096,
+}
+
+# Settings the running transfer scheduler picks up as soon as they are saved
+SCHEDULER_SETTINGS = ("max_connections", "connections_per_host", "disk_jobs", "bandwidth_limit_kbps",
+                      "low_io_while_playing", "low_io_rate_kbps")
+
+
+def get_setting(key, default=None):
+    row = get_store().query_one("SELECT value FROM settings WHERE key = ?", (key,))
+    if row is not None:
+        return json.loads(row[0])
+    return DEFAULTS.get(key, default)
+
+
+def set_setting(key, value):
+    get_store().execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+    if key in SCHEDULER_SETTINGS:
+        from transfer_scheduler import reload_settings
+        reload_settings()
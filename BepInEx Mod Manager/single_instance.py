@@ -0,0 +1,99 @@
+import os
+import json
+import getpass
+import hashlib
+from PyQt5.QtCore import QObject, QLockFile, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+from app_data import app_data_path
+
+
+def instance_name():
+    """Per-user socket/pipe name so different accounts don't share an instance"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = os.environ.get("USERNAME", "")
+    return "BepInExManager-" + hashlib.sha1(user.encode("utf-8")).hexdigest()[:12]
+
+
+class SingleInstance(QObject):
+    """Make the first process the only one; later launches hand it their arguments.
+
+    The primary instance is elected with a lock file (stale locks of crashed
+    processes are taken over) and listens on a QLocalServer.  Secondary
+    launches connect, send their arguments as one JSON line and exit.
+    """
+    arguments_received = pyqtSignal(list)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or instance_name()
+        self.lock = QLockFile(app_data_path(f"{self.name}.lock"))
+        self.lock.setStaleLockTime(0)
+        self.server = None
+        self.buffers = {}
+
+    def acquire(self):
+        """Return True if this process is the primary instance"""
+        return self.lock.tryLock(0)
+
+    def forward(self, arguments, timeout_ms=2000):
+        """Send arguments to the primary instance; returns False if it can't be reached"""
+        # The primary may still be starting up, give it a few tries
+        for _ in range(5):
+            socket = QLocalSocket()
+            socket.connectToServer(self.name)
+            if socket.waitForConnected(timeout_ms // 5):
+                payload = json.dumps([os.path.abspath(a) if os.path.exists(a) else a for a in arguments])
+                socket.write(payload.encode("utf-8") + b"\n")
+                socket.waitForBytesWritten(timeout_ms)
+                # Wait for the acknowledgement so the message isn't lost if we exit early
+                socket.waitForReadyRead(timeout_ms)
+                socket.disconnectFromServer()
+                return True
+            socket.abort()
+            if self.lock.tryLock(timeout_ms // 5):
+                # The primary went away in the meantime
+                return False
+        return False
+
+    def listen(self):
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)
+        # A crashed primary can leave its socket file behind on Unix
+        QLocalServer.removeServer(self.name)
+        if not self.server.listen(self.name):
+            print(f"Single instance server error: {self.server.errorString()}")
+            return False
+        self.server.newConnection.connect(self.on_new_connection)
+        return True
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self.on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self.on_disconnected(s))
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def on_ready_read(self, socket):
+        self.buffers[socket] = self.buffers.get(socket, b"") + bytes(socket.readAll())
+        if b"\n" not in self.buffers[socket]:
+            return
+        line, self.buffers[socket] = self.buffers[socket].split(b"\n", 1)
+        socket.write(b"ok\n")
+        socket.flush()
+        try:
+            arguments = json.loads(line.decode("utf-8"))
+        except ValueError:
+            return
+        if isinstance(arguments, list):
+            self.arguments_received.emit([str(a) for a in arguments])
+
+    def release(self):
+        if self.server is not None:
+            self.server.close()
+        self.lock.unlock()
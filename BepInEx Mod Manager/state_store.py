@@ -0,0 +1,234 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app_data import app_data_path
+
+# Each entry upgrades the schema by one version (PRAGMA user_version).
+# Never edit a released step; append a new one instead.
+MIGRATIONS = [
+    """
+    CREATE TABLE games (
+        key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        path TEXT NOT NULL,
+        platform TEXT NOT NULL,
+        source TEXT NOT NULL,
+        manual INTEGER NOT NULL DEFAULT 0,
+        last_seen REAL
+    );
+    CREATE INDEX games_manual ON games (manual);
+
+    CREATE TABLE settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    CREATE TABLE file_hashes (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL
+    );
+    CREATE INDEX file_hashes_sha256 ON file_hashes (sha256);
+
+    CREATE TABLE folder_usage (
+        path TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        dirs TEXT NOT NULL,
+        volatile TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE plugins (
+        game_key TEXT NOT NULL,
+        folder TEXT NOT NULL,
+        file TEXT NOT NULL,
+        enabled INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        PRIMARY KEY (game_key, folder, file)
+    );
+    """,
+    """
+    CREATE TABLE catalog_sources (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        fetched_at REAL
+    );
+
+    CREATE TABLE packages (
+        source TEXT NOT NULL,
+        full_name TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        name TEXT NOT NULL,
+        version TEXT NOT NULL,
+        description TEXT NOT NULL,
+        download_url TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        downloads INTEGER NOT NULL,
+        deprecated INTEGER NOT NULL,
+        PRIMARY KEY (source, full_name)
+    );
+    CREATE INDEX packages_name ON packages (source, name COLLATE NOCASE);
+    CREATE INDEX packages_owner ON packages (source, owner COLLATE NOCASE);
+
+    CREATE TABLE package_dependencies (
+        source TEXT NOT NULL,
+        package TEXT NOT NULL,
+        dependency TEXT NOT NULL,
+        PRIMARY KEY (source, package, dependency)
+    );
+    CREATE INDEX package_dependencies_dependency ON package_dependencies (source, dependency);
+    """,
+    """
+    CREATE TABLE harmony_scans (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        patches TEXT NOT NULL
+    );
+    """,
+    """
+    -- Cached folder sizes counted .dat and .cfg files as stable; they are re-stat'ed now
+    DELETE FROM folder_usage;
+    """,
+]
+
+# JSON files written by earlier versions, imported once after the first migration
+LEGACY_FILES = ["games.json", "manual_games.json", "settings.json", "hash_cache.json", "disk_usage.json"]
+
+
+class StateStore:
+    """The manager's persistent state in one SQLite database.
+
+    WAL mode lets worker threads read while another thread writes.  Every
+    thread gets its own connection; writes are serialized through one lock
+    and grouped into a transaction per batch.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or app_data_path("state.sqlite3")
+        self.local = threading.local()
+        self.write_lock = threading.RLock()
+        with self.write_lock:
+            self.migrate()
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.local.connection = connection
+        return connection
+
+    def query(self, sql, parameters=()):
+        return self.connection().execute(sql, parameters).fetchall()
+
+    def query_one(self, sql, parameters=()):
+        return self.connection().execute(sql, parameters).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        """Serialized write transaction on this thread's connection"""
+        with self.write_lock:
+            connection = self.connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def execute(self, sql, parameters=()):
+        with self.transaction() as connection:
+            connection.execute(sql, parameters)
+
+    def execute_many(self, sql, rows):
+        """Write a batch of rows in one transaction"""
+        rows = list(rows)
+        if not rows:
+            return
+        with self.transaction() as connection:
+            connection.executemany(sql, rows)
+
+    def migrate(self):
+        created = False
+        while True:
+            # Read the version inside the write transaction in case another process migrates too
+            with self.transaction() as transaction:
+                version = transaction.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    break
+                for statement in split_statements(MIGRATIONS[version]):
+                    transaction.execute(statement)
+                transaction.execute(f"PRAGMA user_version = {version + 1}")
+                created = created or version == 0
+        if created:
+            self.import_legacy_files()
+
+    def import_legacy_files(self):
+        """Carry over the JSON state files of earlier versions"""
+        directory = os.path.dirname(self.path)
+
+        def load(name):
+            try:
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                return data if isinstance(data, dict) else {}
+            except (OSError, ValueError):
+                return {}
+
+        games = [(path_key(info['path']), name, info['path'], info.get('platform', 'Unknown'), info['source'], 0)
+                 for name, info in load("games.json").items()]
+        games += [(path_key(info['path']), name, info['path'], info.get('platform', 'Unknown'), 'Manual', 1)
+                  for name, info in load("manual_games.json").items()]
+        self.execute_many("INSERT OR REPLACE INTO games (key, name, path, platform, source, manual) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", games)
+        self.execute_many("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                          [(key, json.dumps(value)) for key, value in load("settings.json").items()])
+        self.execute_many("INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                          [(path, *entry) for path, entry in load("hash_cache.json").items()])
+        self.execute_many("INSERT OR REPLACE INTO folder_usage (path, mtime_ns, size, dirs, volatile) "
+                          "VALUES (?, ?, ?, ?, ?)",
+                          [(path, e["mtime_ns"], e["size"], json.dumps(e["dirs"]), json.dumps(e["volatile"]))
+                           for path, e in load("disk_usage.json").items()])
+        for name in LEGACY_FILES:
+            try:
+                os.replace(os.path.join(directory, name), os.path.join(directory, name + ".migrated"))
+            except OSError:
+                pass
+
+
+def split_statements(script):
+    """Split a migration script into statements (executescript would commit our transaction)"""
+    statements, current = [], ""
+    for line in script.splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    if current.strip():
+        statements.append(current.strip())
+    return statements
+
+
+def path_key(game_path):
+    return os.path.normcase(os.path.abspath(game_path))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+        return _store
@@ -0,0 +1,263 @@
+"""Admission and pacing for downloads and disk-heavy jobs.
+
+Every transfer or disk job takes a ticket first:
+
+    with get_scheduler().transfer(url) as ticket:          # blocks until admitted
+        for chunk in response.iter_content(...):
+            ticket.throttle(len(chunk))
+    async with get_scheduler().disk_job("extract", BACKGROUND) as ticket:
+        await ticket.throttle_async(member_size)
+
+Tickets are admitted within the connection caps (all transfers, transfers
+per host, disk jobs), best priority class first.  A waiting ticket gains
+one class per AGING_SECONDS, so background work still runs behind a steady
+stream of interactive work.  throttle() paces bytes with token buckets: the
+bandwidth limit for transfers and, while a game launched by the manager is
+running, a shared low-I/O rate for background work, with disk jobs one at a
+time.
+"""
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+from PyQt5.QtCore import Qt
+from settings import get_setting
+
+# Priority classes; lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+AGING_SECONDS = 10.0
+
+
+class TokenBucket:
+    """Paces a byte stream at rate bytes/s with one second of burst; rate 0 means unlimited"""
+
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def reserve(self, amount):
+        """Take amount tokens, going into debt if needed; returns the seconds to wait before using them"""
+        if not self.rate:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class Ticket:
+    """A transfer or disk job's place in the scheduler; use it as a (sync or async) context manager"""
+
+    def __init__(self, scheduler, kind, host, priority, name):
+        self.scheduler = scheduler
+        self.kind = kind
+        self.host = host
+        self.priority = priority
+        self.name = name
+        self.queued_at = None
+        self.sequence = None
+        self.nested = False
+        self.wake = None
+
+    def rank(self, now):
+        return self.priority - (now - self.queued_at) / AGING_SECONDS, self.sequence
+
+    def __enter__(self):
+        held = self.scheduler.held_kinds()
+        if self.kind in held:
+            # A job inside a job of the same kind on this thread would wait for its own slot
+            self.nested = True
+            return self
+        admitted = threading.Event()
+        self.scheduler.enqueue(self, admitted.set)
+        admitted.wait()
+        held.add(self.kind)
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.nested:
+            self.scheduler.held_kinds().discard(self.kind)
+            self.scheduler.release(self)
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        self.scheduler.enqueue(self, wake)
+        try:
+            await admitted
+        except BaseException:
+            # Cancelled while queued (or just after admission): give the place back
+            self.scheduler.release(self)
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.scheduler.release(self)
+
+    def throttle(self, amount):
+        delay = self.scheduler.delay(self, amount)
+        if delay:
+            time.sleep(delay)
+
+    async def throttle_async(self, amount):
+        delay = self.scheduler.delay(self, amount)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class TransferScheduler:
+    def __init__(self, max_connections=8, connections_per_host=4, disk_jobs=2, bandwidth=0, low_io_rate=0,
+                 low_io_while_playing=True):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.waiting = []
+        self.running = []
+        self.sequence = 0
+        self.games_running = 0
+        self.game_jobs = set()
+        self.configure(max_connections, connections_per_host, disk_jobs, bandwidth, low_io_rate,
+                       low_io_while_playing)
+
+    def configure(self, max_connections, connections_per_host, disk_jobs, bandwidth, low_io_rate,
+                  low_io_while_playing):
+        """Caps are counts, rates bytes/s (0 = unlimited); applies to queued tickets right away"""
+        with self.lock:
+            self.max_connections = max(1, max_connections)
+            self.connections_per_host = max(1, connections_per_host)
+            self.disk_jobs = max(1, disk_jobs)
+            self.bandwidth = TokenBucket(bandwidth)
+            self.low_io_bucket = TokenBucket(low_io_rate)
+            self.low_io_while_playing = low_io_while_playing
+            wake = self.dispatch()
+        self.call(wake)
+
+    def transfer(self, url, priority=INTERACTIVE, name=None):
+        return Ticket(self, "transfer", urlsplit(url).hostname or "", priority, name or url)
+
+    def disk_job(self, name, priority=INTERACTIVE):
+        return Ticket(self, "disk", None, priority, name)
+
+    @property
+    def low_io(self):
+        return self.low_io_while_playing and self.games_running > 0
+
+    def held_kinds(self):
+        held = getattr(self.local, "held", None)
+        if held is None:
+            held = self.local.held = set()
+        return held
+
+    def enqueue(self, ticket, wake):
+        with self.lock:
+            self.sequence += 1
+            ticket.sequence = self.sequence
+            ticket.queued_at = time.monotonic()
+            ticket.wake = wake
+            self.waiting.append(ticket)
+            wake = self.dispatch()
+        self.call(wake)
+
+    def release(self, ticket):
+        with self.lock:
+            if ticket in self.running:
+                self.running.remove(ticket)
+            elif ticket in self.waiting:
+                self.waiting.remove(ticket)
+            wake = self.dispatch()
+        self.call(wake)
+
+    def fits(self, ticket):
+        if ticket.kind == "disk":
+            return sum(t.kind == "disk" for t in self.running) < (1 if self.low_io else self.disk_jobs)
+        transfers = [t for t in self.running if t.kind == "transfer"]
+        return len(transfers) < self.max_connections and \
+            sum(t.host == ticket.host for t in transfers) < self.connections_per_host
+
+    def dispatch(self):
+        """Admit waiting tickets, best rank first; returns their wake callbacks (call them outside the lock)"""
+        wake = []
+        now = time.monotonic()
+        for ticket in sorted(self.waiting, key=lambda t: t.rank(now)):
+            # A ticket that doesn't fit yet keeps its place; others may use capacity it can't
+            if self.fits(ticket):
+                self.waiting.remove(ticket)
+                self.running.append(ticket)
+                wake.append(ticket.wake)
+        return wake
+
+    def call(self, callbacks):
+        for callback in callbacks:
+            callback()
+
+    def delay(self, ticket, amount):
+        delays = []
+        if ticket.kind == "transfer":
+            delays.append(self.bandwidth.reserve(amount))
+        if ticket.priority >= BACKGROUND and self.low_io:
+            delays.append(self.low_io_bucket.reserve(amount))
+        return max(delays, default=0.0)
+
+    def track_game(self, process):
+        """Hold the low-I/O mode until a launched game's process exits"""
+        from async_runtime import get_runtime, wait_process
+        job = get_runtime().job(wait_process, process, name="Game session")
+        # The runtime thread calls game_exited directly, a GUI event loop isn't needed
+        for signal in (job.done, job.failed, job.cancelled):
+            signal.connect(lambda *args, job=job: self.game_exited(job), Qt.DirectConnection)
+        with self.lock:
+            self.games_running += 1
+            self.game_jobs.add(job)
+        job.start()
+
+    def game_exited(self, job):
+        with self.lock:
+            if job not in self.game_jobs:
+                return
+            self.game_jobs.discard(job)
+            self.games_running -= 1
+            wake = self.dispatch()
+        self.call(wake)
+
+    def snapshot(self):
+        with self.lock:
+            def describe(tickets):
+                return [{"kind": t.kind, "name": t.name, "priority": t.priority} for t in tickets]
+            return {"running": describe(self.running), "waiting": describe(self.waiting), "low_io": self.low_io}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def settings_arguments():
+    kbps = 1024
+    return (get_setting("max_connections"), get_setting("connections_per_host"), get_setting("disk_jobs"),
+            get_setting("bandwidth_limit_kbps") * kbps, get_setting("low_io_rate_kbps") * kbps,
+            get_setting("low_io_while_playing"))
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TransferScheduler(*settings_arguments())
+        return _scheduler
+
+
+def reload_settings():
+    """Apply changed scheduler settings to the running scheduler; called by set_setting"""
+    with _scheduler_lock:
+        scheduler = _scheduler
+    # One that doesn't exist yet reads the settings when it is created
+    if scheduler is not None:
+        scheduler.configure(*settings_arguments())
@@ -0,0 +1,187 @@
+import os
+import stat
+import json
+import time
+import shutil
+from PyQt5.QtCore import QThread, pyqtSignal
+from file_utils import atomic_write_text
+from settings import get_setting
+
+TRASH_DIR_NAME = ".bepinex_trash"
+MANIFEST_NAME = "trash.json"
+
+# Everything a BepInEx install puts in the game folder
+BEPINEX_ITEMS = [
+    "BepInEx",
+    ".doorstop_version",
+    "doorstop_config.ini",
+    "winhttp.dll",
+    "run_bepinex.sh",
+    "libdoorstop.so",
+    "libdoorstop.dylib",
+]
+
+
+class TrashEntry:
+    def __init__(self, game_path, path, trashed_at, items):
+        self.game_path = game_path
+        self.path = path
+        self.trashed_at = trashed_at
+        self.items = items
+
+    def age(self):
+        return time.time() - self.trashed_at
+
+    def expired(self, grace_seconds):
+        return self.age() >= grace_seconds
+
+
+def trash_root(game_path):
+    return os.path.join(game_path, TRASH_DIR_NAME)
+
+
+def move_to_trash(game_path):
+    """Move BepInEx out of the game folder with renames only.
+
+    The trash folder lives inside the game folder so every move is a rename on
+    the same volume, however large the plugin set is.  If any rename fails
+    (e.g. winhttp.dll is locked by a running game) the ones already done are
+    rolled back and the error is raised.
+    """
+    items = [name for name in BEPINEX_ITEMS if os.path.lexists(os.path.join(game_path, name))]
+    if not items:
+        return None
+
+    root = trash_root(game_path)
+    base = os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+    entry_path = base
+    suffix = 1
+    while os.path.exists(entry_path):
+        suffix += 1
+        entry_path = f"{base}-{suffix}"
+    os.makedirs(entry_path)
+
+    moved = []
+    try:
+        for name in items:
+            os.rename(os.path.join(game_path, name), os.path.join(entry_path, name))
+            moved.append(name)
+    except OSError:
+        for name in reversed(moved):
+            try:
+                os.rename(os.path.join(entry_path, name), os.path.join(game_path, name))
+            except OSError:
+                pass
+        shutil.rmtree(entry_path, ignore_errors=True)
+        raise
+
+    trashed_at = time.time()
+    atomic_write_text(os.path.join(entry_path, MANIFEST_NAME),
+                      json.dumps({"trashed_at": trashed_at, "items": moved}))
+    return TrashEntry(game_path, entry_path, trashed_at, moved)
+
+
+def read_entry(game_path, entry_path):
+    try:
+        with open(os.path.join(entry_path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return TrashEntry(game_path, entry_path, float(manifest["trashed_at"]), list(manifest["items"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        # Interrupted before the manifest was written, go by what is there
+        try:
+            trashed_at = os.stat(entry_path).st_mtime
+            items = [name for name in os.listdir(entry_path) if name != MANIFEST_NAME]
+        except OSError:
+            return None
+        return TrashEntry(game_path, entry_path, trashed_at, items)
+
+
+def list_trash(game_path):
+    """Trash entries of a game, newest first"""
+    root = trash_root(game_path)
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    entries = [read_entry(game_path, os.path.join(root, name)) for name in names]
+    return sorted((e for e in entries if e is not None), key=lambda e: e.trashed_at, reverse=True)
+
+
+def restorable_entry(game_path, grace_seconds=None):
+    """The newest entry that is still inside the grace period, if any"""
+    if grace_seconds is None:
+        grace_seconds = get_setting("trash_grace_seconds")
+    for entry in list_trash(game_path):
+        if not entry.expired(grace_seconds):
+            return entry
+    return None
+
+
+def restore(entry):
+    """Move a trashed install back into the game folder"""
+    conflicts = [name for name in entry.items if os.path.lexists(os.path.join(entry.game_path, name))]
+    if conflicts:
+        raise FileExistsError(f"{', '.join(conflicts)} already exists in the game folder")
+    for name in entry.items:
+        source = os.path.join(entry.path, name)
+        if os.path.lexists(source):
+            os.rename(source, os.path.join(entry.game_path, name))
+    delete_entry(entry)
+
+
+def _remove_readonly(func, path, exc_info):
+    # Windows refuses to delete read-only files
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def delete_entry(entry):
+    shutil.rmtree(entry.path, onerror=_remove_readonly)
+    try:
+        os.rmdir(trash_root(entry.game_path))
+    except OSError:
+        pass
+
+
+def purge_expired(game_path, grace_seconds=None):
+    """Delete the entries past the grace period and return the bytes freed"""
+    if grace_seconds is None:
+        grace_seconds = get_setting("trash_grace_seconds")
+    freed = 0
+    for entry in list_trash(game_path):
+        if not entry.expired(grace_seconds):
+            continue
+        size = tree_size(entry.path)
+        try:
+            delete_entry(entry)
+            freed += size
+        except OSError as e:
+            print(f"Failed to purge {entry.path}: {str(e)}")
+    return freed
+
+
+def tree_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class PurgeThread(QThread):
+    """Delete expired trash of the given games off the GUI thread"""
+    purged = pyqtSignal(int)
+
+    def __init__(self, game_paths, parent=None):
+        super().__init__(parent)
+        self.game_paths = list(game_paths)
+
+    def run(self):
+        freed = 0
+        for game_path in self.game_paths:
+            if os.path.isdir(trash_root(game_path)):
+                freed += purge_expired(game_path)
+        self.purged.emit(freed)